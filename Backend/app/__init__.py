@@ -1,9 +1,15 @@
-from flask import Flask
+import math
+import os
+import weakref
+
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from config import Config
 from flask_migrate import Migrate
+from app.services.db_pool import engine_options
+from app.services.json_provider import OrjsonProvider
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -13,6 +19,10 @@ migrate = Migrate()
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    )
+    app.json = OrjsonProvider(app)
 
     db.init_app(app)
     bcrypt.init_app(app)
@@ -25,7 +35,53 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
 
-    with app.app_context():
-        db.create_all()
+    from app.commands import register_commands
+    register_commands(app)
+
+    from app.services.external import init_external_clients
+    init_external_clients(app)
+
+    from app.services.images import init_images
+    init_images(app)
+
+    from app.services.jobs import init_jobs
+    init_jobs(app)
+
+    from app.services.token_blocklist import init_blocklist
+    init_blocklist(app)
+
+    from app.services.realtime import init_realtime
+    init_realtime(app)
+
+    from app.services.clinic_index import init_clinic_index
+    init_clinic_index(app)
+
+    from app.services.response_cache import init_response_cache
+    init_response_cache(app)
+
+    from app.services.compression import init_compression
+    init_compression(app)
+
+    from app.services.pagination import InvalidCursor
+    app.register_error_handler(InvalidCursor, lambda e: (jsonify({'error': str(e)}), 400))
+
+    from app.services.external import ServiceUnavailable
+    app.register_error_handler(ServiceUnavailable, lambda e: (
+        jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, math.ceil(e.retry_after)))}
+    ))
+
+    # Startup leaves the schema alone: `flask db upgrade`, or `flask create-db` for a scratch database.
+    # Connections opened before a fork (preloading servers, `flask run-jobs`) stay with the parent
+    app_ref = weakref.ref(app)
+    os.register_at_fork(after_in_child=lambda: _dispose_engines(app_ref))
 
     return app
+
+
+def _dispose_engines(app_ref):
+    app = app_ref()
+    if app is None or 'sqlalchemy' not in app.extensions:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,189 @@
+import sys
+from datetime import date
+
+import click
+from sqlalchemy import select, text
+
+from app import db
+from app.models import Appointment, AppointmentSlotClaim, FavoriteVeterinarian, Notification, Review, UserActivity, VetSearchTerm
+from app.services.accounts import ROLE_MODELS, resolve_missing_account, users_without_account
+from app.services.helpdesk import rebuild_post_counts
+from app.services.jobs import purge_finished, requeue_dead, run_workers
+from app.services.notifications import rebuild_unread_counters
+from app.services.slots import rebuild_slot_claims
+from app.services.token_blocklist import get_blocklist
+from app.services.vet_search import rebuild_search_index
+from app.services.vet_stats import rebuild_vet_stats
+
+
+def hot_path_queries():
+    """The query shapes the API runs on every list screen, with sample parameters."""
+    return {
+        'vet appointments': (
+            select(Appointment.id)
+            .where(Appointment.veterinarian_id == 1, Appointment.date >= date.today())
+            .order_by(Appointment.date, Appointment.time)
+        ),
+        'animal appointment history': (
+            select(Appointment.id)
+            .where(Appointment.animal_id == 1)
+            .order_by(Appointment.date.desc())
+        ),
+        'vet reviews': (
+            select(Review.id)
+            .where(Review.veterinarian_id == 1)
+            .order_by(Review.created_at.desc())
+        ),
+        'unread notifications': (
+            select(Notification.id)
+            .where(Notification.user_id == 1, Notification.is_read.is_(False))
+            .order_by(Notification.timestamp.desc())
+        ),
+        'user activity': (
+            select(UserActivity.id)
+            .where(UserActivity.user_id == 1, UserActivity.activity_type == 'animal_registration')
+            .order_by(UserActivity.timestamp.desc())
+        ),
+        'favorite lookup': (
+            select(FavoriteVeterinarian.id)
+            .where(FavoriteVeterinarian.owner_id == 1, FavoriteVeterinarian.veterinarian_id == 1)
+        ),
+        'vet slot claims': (
+            select(AppointmentSlotClaim.minute)
+            .where(
+                AppointmentSlotClaim.veterinarian_id == 1,
+                AppointmentSlotClaim.date >= date.today(),
+                AppointmentSlotClaim.date <= date.today()
+            )
+        ),
+        'vet search prefix': (
+            select(VetSearchTerm.veterinarian_id)
+            .where(VetSearchTerm.term >= 'do', VetSearchTerm.term <= 'do'.ljust(50, 'z'))
+        ),
+    }
+
+
+def _full_scans(connection, statement):
+    """Return the tables the planner would read with a full scan."""
+    dialect = connection.dialect.name
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+
+    if dialect == 'sqlite':
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).mappings().all()
+        # "SCAN <table>" without an index is a full scan, "SEARCH ... USING INDEX" is not
+        return [
+            row['detail'] for row in rows
+            if row['detail'].startswith('SCAN') and 'USING' not in row['detail']
+        ]
+
+    rows = connection.execute(text(f"EXPLAIN {sql}")).mappings().all()
+    return [row['table'] for row in rows if (row.get('type') or '').upper() == 'ALL']
+
+
+def register_commands(app):
+
+    @app.cli.command('create-db')
+    def create_db():
+        """Create any missing tables from the models, for a scratch or test database.
+
+        Existing databases are migrated with `flask db upgrade` instead.
+        """
+        db.create_all()
+        click.echo(f"Tables created in {db.engine.url.render_as_string(hide_password=True)}")
+
+    @app.cli.command('account-conflicts')
+    def account_conflicts():
+        """List users without an account row because another user holds their email."""
+        missing = users_without_account()
+        for role, user, (account, holder) in missing:
+            held_by = f"account {account.id} ({account.role} {holder.id})" if account else "nobody"
+            click.echo(f"{role} {user.id}  {user.email}  held by {held_by}")
+        click.echo(f"{len(missing)} user(s) cannot log in; give each a free email with resolve-account-conflict")
+
+    @app.cli.command('resolve-account-conflict')
+    @click.argument('role', type=click.Choice(list(ROLE_MODELS)))
+    @click.argument('user_id', type=int)
+    @click.argument('email')
+    def resolve_account_conflict(role, user_id, email):
+        """Move a user listed by account-conflicts to EMAIL and create their account."""
+        try:
+            account = resolve_missing_account(role, user_id, email)
+            db.session.commit()
+        except ValueError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+        click.echo(f"{role} {user_id} now logs in as {email} (account {account.id})")
+
+    @app.cli.command('check-indexes')
+    def check_indexes():
+        """EXPLAIN every hot-path query and fail if any falls back to a full scan."""
+        failures = 0
+
+        with db.engine.connect() as connection:
+            for name, statement in hot_path_queries().items():
+                scans = _full_scans(connection, statement)
+                if scans:
+                    failures += 1
+                    click.echo(f"FULL SCAN  {name}: {', '.join(scans)}")
+                else:
+                    click.echo(f"ok         {name}")
+
+        if failures:
+            click.echo(f"{failures} hot-path quer{'y' if failures == 1 else 'ies'} without a usable index")
+            sys.exit(1)
+
+    @app.cli.command('rebuild-vet-stats')
+    def rebuild_vet_stats_command():
+        """Recompute review counts and rating aggregates for every vet from scratch."""
+        vet_count = rebuild_vet_stats()
+        click.echo(f"Rebuilt review stats for {vet_count} veterinarians")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Re-tokenize every vet into the search index."""
+        vet_count = rebuild_search_index()
+        click.echo(f"Indexed {vet_count} veterinarians for search")
+
+    @app.cli.command('rebuild-helpdesk-counts')
+    def rebuild_helpdesk_counts():
+        """Recompute comment and like counts on every help desk post from scratch."""
+        posts = rebuild_post_counts()
+        click.echo(f"Rebuilt counts for {posts} help desk post(s)")
+
+    @app.cli.command('rebuild-notification-counters')
+    def rebuild_notification_counters():
+        """Recompute every user's unread notification count from scratch."""
+        recipients = rebuild_unread_counters()
+        click.echo(f"Rebuilt unread counters for {recipients} recipient(s)")
+
+    @app.cli.command('rebuild-slot-claims')
+    def rebuild_slot_claims_command():
+        """Recompute the slots taken by every appointment, e.g. after importing old bookings."""
+        claimed, skipped = rebuild_slot_claims()
+        click.echo(f"Claimed slots for {claimed} appointment(s), skipped {skipped} unparseable or overlapping")
+
+    @app.cli.command('run-jobs')
+    @click.option('--processes', default=1, show_default=True, help='Worker processes to start.')
+    @click.option('--burst', is_flag=True, help='Exit once no job is due instead of polling.')
+    def run_jobs(processes, burst):
+        """Run background job workers until interrupted."""
+        run_workers(processes, burst=burst)
+
+    @app.cli.command('requeue-dead-jobs')
+    @click.option('--task', 'task_name', default=None, help='Only jobs of this task.')
+    def requeue_dead_jobs(task_name):
+        """Move jobs from the dead letter table back onto the queue."""
+        requeued = requeue_dead(task_name)
+        click.echo(f"Requeued {requeued} dead job(s)")
+
+    @app.cli.command('purge-finished-jobs')
+    def purge_finished_jobs():
+        """Delete done jobs older than JOB_RETENTION_HOURS."""
+        removed = purge_finished(app.config['JOB_RETENTION_HOURS'])
+        click.echo(f"Removed {removed} finished job(s)")
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens():
+        """Delete blocklist entries for tokens that have expired anyway."""
+        removed = get_blocklist().purge()
+        click.echo(f"Removed {removed} expired token(s) from the blocklist")
@@ -1,8 +1,5 @@
 from datetime import datetime
 from . import db
-import pytz
-
-LOCAL_TZ = pytz.timezone("Africa/Nairobi")
 
 class AnimalOwner(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -28,6 +25,27 @@ class Veterinarian(db.Model):
     profile_image = db.Column(db.String(300), nullable=True)
     reset_token_expiry = db.Column(db.DateTime, nullable=True)
     firebase_uid = db.Column(db.String(255), unique=True, nullable=True)
+    # Clinic location for the map, see app/services/clinic_index.py
+    clinic_name = db.Column(db.String(200), nullable=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    location_updated_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Length of one bookable slot, see app/services/slots.py (None: APPOINTMENT_SLOT_MINUTES)
+    slot_minutes = db.Column(db.Integer, nullable=True)
+    # Lists that show vet fields (favorites, appointments) version on this too
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Account(db.Model):
+    # One row per login, across both user tables. `id` is the global account ID,
+    # (role, user_id) points at the AnimalOwner or Veterinarian row.
+    __table_args__ = (
+        db.UniqueConstraint('role', 'user_id', name='uq_account_role_user'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # 'animal_owner' or 'veterinarian'
+    user_id = db.Column(db.Integer, nullable=False)
 
 class Animal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -43,14 +61,25 @@ class Animal(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class FavoriteVeterinarian(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('owner_id', 'veterinarian_id', name='uq_favorite_owner_vet'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('animal_owner.id'), nullable=False)
     veterinarian_id = db.Column(db.Integer, db.ForeignKey('veterinarian.id'), nullable=False)
 
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     owner = db.relationship('AnimalOwner', backref='favorite_veterinarians')
     veterinarian = db.relationship('Veterinarian', backref='favorited_by')
 
 class Appointment(db.Model):
+    __table_args__ = (
+        db.Index('ix_appointment_vet_date_time', 'veterinarian_id', 'date', 'time'),
+        db.Index('ix_appointment_animal_date', 'animal_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey('animal_owner.id'), nullable=False)
     animal_id = db.Column(db.Integer, db.ForeignKey('animal.id'), nullable=False)
@@ -61,23 +90,197 @@ class Appointment(db.Model):
     status = db.Column(db.String(20), default="Pending", nullable=False)
     notes = db.Column(db.Text, default="")
     prescription = db.Column(db.Text, default="")
+    duration_minutes = db.Column(db.Integer, nullable=True)  # None on bookings made before slots existed
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     owner = db.relationship('AnimalOwner', backref='appointments')
     animal = db.relationship('Animal', backref='appointments')
     veterinarian = db.relationship('Veterinarian', backref='appointments')
 
+class VetWorkingHours(db.Model):
+    # One bookable interval of a vet's week, minutes after midnight local time.
+    # A weekday may have several (a morning and an afternoon session).
+    __table_args__ = (
+        db.Index('ix_vet_working_hours_vet_weekday', 'veterinarian_id', 'weekday'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    veterinarian_id = db.Column(db.Integer, db.ForeignKey('veterinarian.id', ondelete='CASCADE'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday
+    start_minute = db.Column(db.Integer, nullable=False)
+    end_minute = db.Column(db.Integer, nullable=False)
+
+class AppointmentSlotClaim(db.Model):
+    # The grid units of a vet's day taken by an appointment, see app/services/slots.py.
+    # The primary key is what makes overlapping bookings impossible: a second
+    # booking for any taken unit fails on insert, whichever worker makes it.
+    __table_args__ = (
+        db.Index('ix_appointment_slot_claim_appointment_id', 'appointment_id'),
+    )
+
+    veterinarian_id = db.Column(db.Integer, db.ForeignKey('veterinarian.id', ondelete='CASCADE'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    minute = db.Column(db.Integer, primary_key=True)  # Start of the unit, minutes after midnight
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointment.id', ondelete='CASCADE'), nullable=False)
+
 class Review(db.Model):
+    __table_args__ = (
+        db.Index('ix_review_vet_created_at', 'veterinarian_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     veterinarian_id = db.Column(db.Integer, db.ForeignKey('veterinarian.id'), nullable=False)
     owner_id = db.Column(db.Integer, db.ForeignKey('animal_owner.id'), nullable=False)
     review_text = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(LOCAL_TZ))
+    rating = db.Column(db.SmallInteger, nullable=True)  # 1-5 stars, NULL for reviews left before ratings existed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     veterinarian = db.relationship('Veterinarian', backref='reviews')
     owner = db.relationship('AnimalOwner', backref='reviews')
 
+class VeterinarianStats(db.Model):
+    # Review aggregates kept up to date on every review write, see app/services/vet_stats.py
+    veterinarian_id = db.Column(db.Integer, db.ForeignKey('veterinarian.id'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0)
+
+    veterinarian = db.relationship('Veterinarian', backref=db.backref('stats', uselist=False))
+
+    @property
+    def average_rating(self):
+        return round(self.rating_sum / self.rating_count, 2) if self.rating_count else 0.0
+
+    @property
+    def rating_histogram(self):
+        return {str(stars): getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
+class RevokedToken(db.Model):
+    # JWT blocklist shared by all workers, see app/services/token_blocklist.py
+    jti = db.Column(db.String(64), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # The token's own exp, after which the row is purged
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+class Conversation(db.Model):
+    # One row per pair of accounts, participant_a_id is always the lower account ID.
+    # The last_* and unread_* columns are denormalized on every send so the chat
+    # list never has to touch the message table.
+    __table_args__ = (
+        db.UniqueConstraint('participant_a_id', 'participant_b_id', name='uq_conversation_participants'),
+        db.Index('ix_conversation_a_last_message_time', 'participant_a_id', 'last_message_time'),
+        db.Index('ix_conversation_b_last_message_time', 'participant_b_id', 'last_message_time'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    participant_a_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
+    participant_b_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
+    last_message = db.Column(db.Text, nullable=True)
+    last_message_time = db.Column(db.DateTime, nullable=True)
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_sender_id = db.Column(db.Integer, nullable=True)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    unread_count_a = db.Column(db.Integer, nullable=False, default=0)
+    unread_count_b = db.Column(db.Integer, nullable=False, default=0)
+    last_read_id_a = db.Column(db.Integer, nullable=False, default=0)
+    last_read_id_b = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def chat_id(self):
+        return f"{self.participant_a_id}_{self.participant_b_id}"
+
+class Message(db.Model):
+    __table_args__ = (
+        db.Index('ix_message_conversation_id', 'conversation_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    image_url = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class RealtimeEvent(db.Model):
+    # Outbox for the server-push channel, see app/services/realtime.py
+    __table_args__ = (
+        db.Index('ix_realtime_event_account_id', 'account_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(30), nullable=False)  # 'message', 'read', 'notification'
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ImageAsset(db.Model):
+    # One ingested upload and its resized copies, see app/services/images.py
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), unique=True, nullable=False)  # SHA-256 of the uploaded bytes
+    url = db.Column(db.String(500), nullable=False, index=True)  # The full-size copy, what image_url columns hold
+    variants = db.Column(db.Text, nullable=False)  # JSON {'full': url, 'small': url, 'medium': url}
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    upload_bytes = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    # Background work queued by requests and run by `flask run-jobs`, see app/services/jobs.py.
+    # Rows are written in the same transaction as the change that needs them.
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'running' or 'done'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Not before, pushed back on every retry
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)  # A running job past this is taken over by another worker
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True, index=True)
+
+class DeadLetterJob(db.Model):
+    # Jobs that failed permanently or ran out of attempts, kept for inspection and
+    # `flask requeue-dead-jobs`
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(100), nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=False)
+    idempotency_key = db.Column(db.String(200), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=True)  # When the original job was queued
+    failed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class VetSearchTerm(db.Model):
+    # Inverted index for vet search: one row per distinct token per field of a vet,
+    # see app/services/vet_search.py. The primary key doubles as the term index.
+    __table_args__ = (
+        db.Index('ix_vet_search_term_veterinarian_id', 'veterinarian_id'),
+    )
+
+    term = db.Column(db.String(50), primary_key=True)
+    veterinarian_id = db.Column(db.Integer, db.ForeignKey('veterinarian.id', ondelete='CASCADE'), primary_key=True)
+    field = db.Column(db.String(20), primary_key=True)  # 'name', 'specialization' or 'clinic'
+    weight = db.Column(db.Integer, nullable=False)
+
 class HelpDeskPost(db.Model):
+    __table_args__ = (
+        db.Index('ix_help_desk_post_timestamp', 'timestamp', 'id'),
+        db.Index('ix_help_desk_post_animal_type_timestamp', 'animal_type', 'timestamp', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
     user_type = db.Column(db.String(20), nullable=False)
@@ -87,10 +290,15 @@ class HelpDeskPost(db.Model):
     image_url = db.Column(db.String(500), nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     likes = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)  # Kept up to date on every comment, see app/services/helpdesk.py
     
     comments = db.relationship('HelpDeskComment', backref='post', lazy=True, cascade='all, delete-orphan')
 
 class HelpDeskComment(db.Model):
+    __table_args__ = (
+        db.Index('ix_help_desk_comment_post_id', 'post_id', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('help_desk_post.id'), nullable=False)
     user_id = db.Column(db.Integer, nullable=False)
@@ -98,7 +306,23 @@ class HelpDeskComment(db.Model):
     comment = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+class HelpDeskLike(db.Model):
+    # One row per user who liked a post, so a like can only be counted once
+    __table_args__ = (
+        db.UniqueConstraint('post_id', 'user_type', 'user_id', name='uq_help_desk_like_post_user'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('help_desk_post.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    user_type = db.Column(db.String(20), nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
 class Notification(db.Model):
+    __table_args__ = (
+        db.Index('ix_notification_user_read_timestamp', 'user_id', 'is_read', 'timestamp'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
     user_type = db.Column(db.String(20), nullable=False)
@@ -106,9 +330,16 @@ class Notification(db.Model):
     body = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(50), nullable=False)  # 'message', 'appointment', 'review', etc.
     related_id = db.Column(db.String(100), nullable=True)  # ID of the related entity
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
 
+class NotificationCounter(db.Model):
+    # Unread badge count per recipient, kept up to date on every notification write,
+    # see app/services/notifications.py
+    user_type = db.Column(db.String(20), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+
 class ReviewReply(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     review_id = db.Column(db.Integer, db.ForeignKey('review.id'), nullable=False)
@@ -121,13 +352,16 @@ class ReviewReply(db.Model):
 
 class UserActivity(db.Model):
     __tablename__ = 'user_activity'
+    __table_args__ = (
+        db.Index('ix_user_activity_user_type_timestamp', 'user_id', 'activity_type', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)  # Can be an owner or veterinarian
     user_type = db.Column(db.String(20), nullable=False)  # 'owner' or 'veterinarian'
     activity_type = db.Column(db.String(50))  # e.g., 'animal_registration'
     description = db.Column(db.String(255))   # A description of the activity
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     def __repr__(self):
         return f"<UserActivity {self.activity_type} for {self.user_type} {self.user_id}>"
@@ -1,23 +1,32 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request
 from flask_cors import CORS
-from app.models import AnimalOwner, Veterinarian, Animal, Appointment, Review
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from app.models import AnimalOwner, Veterinarian, Animal, Appointment, Review, VeterinarianStats
 from app import db
-import datetime
+from app.services import chat
+from app.services.accounts import (
+    admin_required, request_account_id, resolve_by_account_id, resolve_by_email, resolve_by_user,
+    resolve_many_by_account_id, resolve_request_account_id
+)
+from app.services.db_pool import pool_stats
+from app.services.external import service_stats
+from app.services.jobs import queue_stats
+from app.services import helpdesk, images, notifications, slots
+from app.services.clinic_index import get_clinic_index, set_clinic_location, valid_coordinates
+from app.services.pagination import keyset_page, page_params, paginated_list
+from app.services.passwords import upgrade_hash_if_needed, verify_password
+from app.services.realtime import event_stream, get_broker, replay
+from app.services.response_cache import cached, get_response_cache, invalidate_on_commit
+from app.services.vet_search import index_vet, search
+from app.services.vet_stats import get_vet_stats, parse_rating, record_review
 import secrets
 import json
+from datetime import datetime
 from sqlalchemy import desc, func
 
 api_bp = Blueprint('api_bp', __name__)
 CORS(api_bp)
 
-# Helper function to convert database objects to JSON-serializable dictionaries
-def to_dict(obj):
-    if isinstance(obj, datetime.datetime):
-        return obj.isoformat()
-    elif isinstance(obj, datetime.date):
-        return obj.isoformat()
-    return str(obj)
-
 # Authentication endpoints
 @api_bp.route('/auth/login', methods=['POST'])
 def login():
@@ -25,16 +34,14 @@ def login():
     email = data.get('email')
     password = data.get('password')
 
-    # Try to find user in AnimalOwner table
-    user = AnimalOwner.query.filter_by(email=email).first()
-    user_type = "animal_owner"
+    # One lookup in the account directory finds the user in either table
+    account, user = resolve_by_email(email)
 
-    # If user is not found, try the Veterinarian table
-    if not user:
-        user = Veterinarian.query.filter_by(email=email).first()
-        user_type = "veterinarian"
+    if user and verify_password(password, user.password):
+        # Bring hashes from older schemes or costs up to the current policy
+        if upgrade_hash_if_needed(user, password):
+            db.session.commit()
 
-    if user and user.check_password(password):
         # Generate token
         token = secrets.token_hex(32)
         
@@ -44,9 +51,10 @@ def login():
             'token': token,
             'user': {
                 'id': user.id,
+                'account_id': account.id,
                 'name': user.name,
                 'email': user.email,
-                'user_type': user_type
+                'user_type': account.role
             }
         }), 200
     
@@ -59,20 +67,20 @@ def login():
 def get_current_user():
     # In a real implementation, you would get the user ID from the token
     # For now, we'll use a query parameter for testing
+    account_id = request.args.get('account_id', type=int)
     user_id = request.args.get('user_id')
     user_type = request.args.get('user_type')
     
-    if not user_id or not user_type:
+    if account_id is not None:
+        account, user = resolve_by_account_id(account_id)
+    elif user_id and user_type:
+        account, user = resolve_by_user(user_type, user_id)
+    else:
         return jsonify({
             'success': False,
-            'message': 'Missing user_id or user_type'
+            'message': 'Missing account_id, or user_id and user_type'
         }), 400
     
-    if user_type == 'animal_owner':
-        user = AnimalOwner.query.get(user_id)
-    else:
-        user = Veterinarian.query.get(user_id)
-    
     if not user:
         return jsonify({
             'success': False,
@@ -80,8 +88,10 @@ def get_current_user():
         }), 404
     
     # Return user data
+    user_type = account.role
     user_data = {
         'id': user.id,
+        'account_id': account.id,
         'name': user.name,
         'email': user.email,
         'user_type': user_type
@@ -104,83 +114,73 @@ def get_current_user():
 @api_bp.route('/chats', methods=['GET'])
 def get_chat_rooms():
     # In a real implementation, you would get the user ID from the token
-    user_id = request.args.get('user_id')
-    user_type = request.args.get('user_type')
+    me = request_account_id()
     
-    if not user_id or not user_type:
+    if me is None:
         return jsonify({
             'success': False,
-            'message': 'Missing user_id or user_type'
+            'message': 'Missing account_id, or user_id and user_type'
         }), 400
     
-    # For now, return mock data
-    # In a real implementation, you would query your database
+    # Conversations carry their own summary, so this is one indexed query
+    limit, after = page_params()
+    conversations, next_key = chat.list_conversations(me, limit, after)
+    
+    thumbnails = images.thumbnail_urls(conversation.vet_image for conversation in conversations)
     chats = []
+    for conversation in conversations:
+        chats.append({
+            'id': f"{conversation.participant_a_id}_{conversation.participant_b_id}",
+            'other_user_id': str(conversation.other_user_id),
+            'other_account_id': str(conversation.other_account_id),
+            'other_user_name': conversation.owner_name or conversation.vet_name,
+            'last_message': conversation.last_message or 'No messages yet',
+            'last_message_time': conversation.last_message_time,
+            'unread_count': conversation.unread_count,
+            'other_user_image_url': conversation.vet_image,
+            'other_user_thumbnail_url': thumbnails.get(conversation.vet_image, conversation.vet_image)
+        })
     
-    # If user is an animal owner, get chats with vets
-    if user_type == 'animal_owner':
-        vets = Veterinarian.query.all()
-        for vet in vets:
-            # Create a chat ID by combining user IDs
-            ids = sorted([int(user_id), vet.id])
-            chat_id = f"{ids[0]}_{ids[1]}"
-            
-            chats.append({
-                'id': chat_id,
-                'other_user_id': str(vet.id),
-                'other_user_name': vet.name,
-                'last_message': 'No messages yet',
-                'last_message_time': datetime.datetime.now().isoformat(),
-                'unread_count': 0,
-                'other_user_image_url': vet.profile_image
-            })
-    # If user is a vet, get chats with animal owners
-    else:
-        owners = AnimalOwner.query.all()
-        for owner in owners:
-            # Create a chat ID by combining user IDs
-            ids = sorted([int(user_id), owner.id])
-            chat_id = f"{ids[0]}_{ids[1]}"
-            
-            chats.append({
-                'id': chat_id,
-                'other_user_id': str(owner.id),
-                'other_user_name': owner.name,
-                'last_message': 'No messages yet',
-                'last_message_time': datetime.datetime.now().isoformat(),
-                'unread_count': 0,
-                'other_user_image_url': None
-            })
-    
-    return jsonify(chats), 200
+    return paginated_list(chats, next_key), 200
 
 @api_bp.route('/chats/<chat_id>/messages', methods=['GET'])
 def get_messages(chat_id):
-    # In a real implementation, you would query your database for messages
-    # For now, return mock data
-    messages = []
-    
-    # Parse the chat ID to get user IDs
-    user_ids = chat_id.split('_')
-    if len(user_ids) != 2:
+    # Parse the chat ID to get the two account IDs
+    participants_ids = chat.parse_chat_id(chat_id)
+    if not participants_ids:
         return jsonify({
             'success': False,
             'message': 'Invalid chat_id format'
         }), 400
     
-    # Get the users
-    user1 = AnimalOwner.query.get(user_ids[0]) or Veterinarian.query.get(user_ids[0])
-    user2 = AnimalOwner.query.get(user_ids[1]) or Veterinarian.query.get(user_ids[1])
+    # Get both users in one directory lookup
+    a, b = participants_ids
+    participants = resolve_many_by_account_id([a, b])
     
-    if not user1 or not user2:
+    if a not in participants or b not in participants:
         return jsonify({
             'success': False,
             'message': 'One or both users not found'
         }), 404
     
-    # Return empty list for now
-    # In a real implementation, you would query your database for messages
-    return jsonify(messages), 200
+    limit, after = page_params()
+    rows, next_key = chat.get_messages(a, b, limit, after)
+    
+    messages = []
+    for row in rows:
+        receiver_id = b if row.sender_id == a else a
+        messages.append({
+            'id': str(row.id),
+            'sender_id': str(row.sender_id),
+            'receiver_id': str(receiver_id),
+            'content': row.content,
+            'image_url': row.image_url,
+            'timestamp': row.created_at,
+            'is_read': chat.is_read(row, a),
+            'sender_name': participants[row.sender_id][1].name
+        })
+    
+    return paginated_list(messages, next_key), 200
 
 @api_bp.route('/chats/<chat_id>/messages', methods=['POST'])
 def send_message(chat_id):
@@ -193,17 +193,55 @@ def send_message(chat_id):
             'message': 'Missing content'
         }), 400
     
-    # In a real implementation, you would save the message to your database
-    # For now, just return success
+    participants_ids = chat.parse_chat_id(chat_id)
+    if not participants_ids:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid chat_id format'
+        }), 400
+    
+    a, b = participants_ids
+    sender_id = resolve_request_account_id()
+    if sender_id not in (a, b):
+        return jsonify({
+            'success': False,
+            'message': 'Sender is not part of this chat'
+        }), 403
+    
+    participants = resolve_many_by_account_id([a, b])
+    if a not in participants or b not in participants:
+        return jsonify({
+            'success': False,
+            'message': 'One or both users not found'
+        }), 404
+    
+    message = chat.send_message(a, b, sender_id, content, data.get('imageUrl'))
+    
     return jsonify({
         'success': True,
-        'message': 'Message sent'
+        'message': 'Message sent',
+        'message_id': str(message.id)
     }), 201
 
 @api_bp.route('/chats/<chat_id>/read', methods=['PUT'])
 def mark_messages_as_read(chat_id):
-    # In a real implementation, you would mark messages as read in your database
-    # For now, just return success
+    participants_ids = chat.parse_chat_id(chat_id)
+    if not participants_ids:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid chat_id format'
+        }), 400
+    
+    a, b = participants_ids
+    reader_id = resolve_request_account_id()
+    if reader_id not in (a, b):
+        return jsonify({
+            'success': False,
+            'message': 'Reader is not part of this chat'
+        }), 403
+    
+    chat.mark_read(a, b, reader_id)
+    
     return jsonify({
         'success': True,
         'message': 'Messages marked as read'
@@ -211,35 +249,90 @@ def mark_messages_as_read(chat_id):
 
 @api_bp.route('/chats/<chat_id>/count', methods=['GET'])
 def get_message_count(chat_id):
-    # In a real implementation, you would count messages in your database
-    # For now, return a mock count
+    participants_ids = chat.parse_chat_id(chat_id)
+    if not participants_ids:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid chat_id format'
+        }), 400
+    
+    # Read from the conversation summary instead of counting messages
+    a, b = participants_ids
+    reader_id = request.args.get('account_id', type=int)
+    count, unread_count = chat.get_counts(a, b, reader_id if reader_id in (a, b) else None)
+    
     return jsonify({
-        'count': 3
+        'count': count,
+        'unread_count': unread_count
     }), 200
 
+# Server push endpoint
+@api_bp.route('/events', methods=['GET'])
+def stream_events():
+    # One stream per client carrying chat messages, read receipts and notifications.
+    # Clients resume with the Last-Event-ID header (or ?last_event_id=) after a reconnect.
+    # The account comes from the token; EventSource cannot set headers, so ?jwt= is accepted too.
+    verify_jwt_in_request(locations=['headers', 'query_string'])
+    account_id = json.loads(get_jwt_identity()).get('account_id')
+    if account_id is None:
+        return jsonify({
+            'success': False,
+            'message': 'Token has no account'
+        }), 403
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    
+    # Subscribe before reading the backlog so nothing published in between is lost
+    broker = get_broker()
+    subscriber = broker.subscribe(account_id)
+    
+    backlog = []
+    resync = False
+    if last_event_id and last_event_id.isdigit():
+        replay_limit = current_app.config['REALTIME_REPLAY_LIMIT']
+        events = replay(account_id, int(last_event_id), replay_limit)
+        backlog = [(event.id, event.event_type, event.payload) for event in events]
+        # More was missed than we are willing to replay, the client should refetch
+        resync = len(events) == replay_limit
+    
+    stream = event_stream(
+        broker, subscriber, backlog, current_app.config['REALTIME_HEARTBEAT_SECONDS'], resync=resync
+    )
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 # Reviews endpoints
 @api_bp.route('/vets/<vet_id>/reviews', methods=['GET'])
 def get_vet_reviews(vet_id):
-    # Get reviews for a specific vet
-    reviews = Review.query.filter_by(veterinarian_id=vet_id).order_by(desc(Review.created_at)).all()
+    limit, after = page_params()
+
+    # Get reviews for a specific vet together with the reviewer names in one query, newest first
+    query = (
+        db.session.query(
+            Review.id, Review.owner_id, Review.review_text, Review.rating, Review.created_at, AnimalOwner.name
+        )
+        .outerjoin(AnimalOwner, Review.owner_id == AnimalOwner.id)
+        .filter(Review.veterinarian_id == vet_id)
+    )
+    reviews, next_key = keyset_page(query, [Review.created_at, Review.id], limit, after, descending=True)
     
     review_list = []
     for review in reviews:
-        owner = AnimalOwner.query.get(review.owner_id)
-        
         review_data = {
             'id': str(review.id),
             'user_id': str(review.owner_id),
-            'user_name': owner.name if owner else 'Unknown',
+            'user_name': review.name or 'Unknown',
             'review_text': review.review_text,
-            'rating': 5.0,  # Add rating field to your Review model
-            'timestamp': review.created_at.isoformat(),
+            'rating': float(review.rating) if review.rating is not None else 0.0,
+            'timestamp': review.created_at,
             'replies': []  # Add replies functionality to your database
         }
         
         review_list.append(review_data)
     
-    return jsonify(review_list), 200
+    return paginated_list(review_list, next_key), 200
 
 @api_bp.route('/vets/<vet_id>/reviews', methods=['POST'])
 def add_review(vet_id):
@@ -255,6 +348,14 @@ def add_review(vet_id):
             'success': False,
             'message': 'Missing required fields'
         }), 400
+
+    try:
+        rating = parse_rating(rating)
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'Rating must be a number between 1 and 5'
+        }), 400
     
     # Check if vet exists
     vet = Veterinarian.query.get(vet_id)
@@ -268,11 +369,13 @@ def add_review(vet_id):
     new_review = Review(
         veterinarian_id=vet_id,
         owner_id=owner_id,
-        review_text=review_text
-        # Add rating field to your Review model
+        review_text=review_text,
+        rating=rating
     )
     
     db.session.add(new_review)
+    # Keep the vet's rating aggregates in the same transaction as the review
+    record_review(vet.id, rating)
     db.session.commit()
     
     return jsonify({
@@ -309,16 +412,29 @@ def add_reply_to_review(vet_id, review_id):
         'message': 'Reply added successfully'
     }), 201
 
+def request_user():
+    # ?user_id=&user_type= when given, otherwise the identity in the bearer token
+    user_id = request.args.get('user_id', type=int)
+    user_type = request.args.get('user_type')
+    if user_id is not None and user_type:
+        return user_type, user_id
+    
+    verify_jwt_in_request(optional=True)
+    identity = get_jwt_identity()
+    if not identity:
+        return None, None
+    identity = json.loads(identity)
+    return identity.get('user_type'), identity.get('user_id')
+
 # Help desk endpoints
 @api_bp.route('/helpdesk', methods=['GET'])
 def get_helpdesk_posts():
-    # In a real implementation, you would query your database for help desk posts
-    # For now, return mock data
-    posts = []
+    # Newest first, optionally only one ?animal_type=; ?limit=&cursor= pages through the feed
+    animal_type = request.args.get('animal_type')
+    limit, after = page_params()
     
-    # Return empty list for now
-    # In a real implementation, you would query your database for help desk posts
-    return jsonify(posts), 200
+    posts, next_key = helpdesk.get_feed(animal_type, limit, after)
+    return paginated_list(posts, next_key), 200
 
 @api_bp.route('/helpdesk', methods=['POST'])
 def add_helpdesk_post():
@@ -326,75 +442,168 @@ def add_helpdesk_post():
     title = data.get('title')
     content = data.get('content')
     animal_type = data.get('animalType')
+    image_url = data.get('imageUrl')
     
-    # In a real implementation, you would get the user ID from the token
-    user_id = request.args.get('user_id')
+    user_type, user_id = request_user()
     
-    if not user_id or not title or not content or not animal_type:
+    if not user_id or not user_type or not title or not content or not animal_type:
         return jsonify({
             'success': False,
             'message': 'Missing required fields'
         }), 400
     
-    # In a real implementation, you would save the post to your database
-    # For now, just return success
+    post = helpdesk.create_post(user_type, user_id, title, content, animal_type, image_url)
+    
     return jsonify({
         'success': True,
-        'message': 'Post added successfully'
+        'message': 'Post added successfully',
+        'post_id': str(post.id)
     }), 201
 
-@api_bp.route('/helpdesk/<post_id>/comments', methods=['POST'])
+@api_bp.route('/helpdesk/<int:post_id>/comments', methods=['GET'])
+def get_helpdesk_comments(post_id):
+    limit, after = page_params()
+    comments, next_key = helpdesk.get_comments(post_id, limit, after)
+    return paginated_list(comments, next_key), 200
+
+@api_bp.route('/helpdesk/<int:post_id>/comments', methods=['POST'])
 def add_comment_to_helpdesk(post_id):
     data = request.get_json()
     comment = data.get('comment')
     
-    # In a real implementation, you would get the user ID from the token
-    user_id = request.args.get('user_id')
+    user_type, user_id = request_user()
     
-    if not user_id or not comment:
+    if not user_id or not user_type or not comment:
         return jsonify({
             'success': False,
             'message': 'Missing required fields'
         }), 400
     
-    # In a real implementation, you would save the comment to your database
-    # For now, just return success
+    new_comment = helpdesk.add_comment(post_id, user_type, user_id, comment)
+    if new_comment is None:
+        return jsonify({
+            'success': False,
+            'message': 'Post not found'
+        }), 404
+    
     return jsonify({
         'success': True,
-        'message': 'Comment added successfully'
+        'message': 'Comment added successfully',
+        'comment_id': str(new_comment.id)
     }), 201
 
+@api_bp.route('/helpdesk/<int:post_id>/like', methods=['POST', 'DELETE'])
+def like_helpdesk_post(post_id):
+    user_type, user_id = request_user()
+    
+    if not user_id or not user_type:
+        return jsonify({
+            'success': False,
+            'message': 'Missing user_id or user_type'
+        }), 400
+    
+    if request.method == 'POST':
+        likes = helpdesk.like_post(post_id, user_type, user_id)
+    else:
+        likes = helpdesk.unlike_post(post_id, user_type, user_id)
+    
+    if likes is None:
+        return jsonify({
+            'success': False,
+            'message': 'Post not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'likes': likes
+    }), 200
+
 # Notifications endpoints
 @api_bp.route('/notifications', methods=['GET'])
 def get_notifications():
-    # In a real implementation, you would get the user ID from the token
-    user_id = request.args.get('user_id')
+    user_type, user_id = request_user()
     
-    if not user_id:
+    if not user_id or not user_type:
         return jsonify({
             'success': False,
-            'message': 'Missing user_id'
+            'message': 'Missing user_id or user_type'
         }), 400
     
-    # In a real implementation, you would query your database for notifications
-    # For now, return mock data
-    notifications = []
+    # Unread first, then newest; ?limit=&cursor= pages through the feed
+    limit, after = page_params()
+    rows, next_key = notifications.get_feed(user_type, user_id, limit, after)
     
-    # Return empty list for now
-    # In a real implementation, you would query your database for notifications
-    return jsonify(notifications), 200
+    response = paginated_list([notifications.notification_to_dict(n) for n in rows], next_key)
+    response.headers['X-Unread-Count'] = str(notifications.unread_count(user_type, user_id))
+    response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor, X-Unread-Count'
+    return response, 200
+
+@api_bp.route('/notifications/unread_count', methods=['GET'])
+def get_unread_notification_count():
+    user_type, user_id = request_user()
+    
+    if not user_id or not user_type:
+        return jsonify({
+            'success': False,
+            'message': 'Missing user_id or user_type'
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'unread_count': notifications.unread_count(user_type, user_id)
+    }), 200
 
-@api_bp.route('/notifications/<notification_id>/read', methods=['PUT'])
+@api_bp.route('/notifications/<int:notification_id>/read', methods=['PUT'])
 def mark_notification_as_read(notification_id):
-    # In a real implementation, you would mark the notification as read in your database
-    # For now, just return success
+    user_type, user_id = request_user()
+    
+    if not user_id or not user_type:
+        return jsonify({
+            'success': False,
+            'message': 'Missing user_id or user_type'
+        }), 400
+    
+    notifications.mark_read(user_type, user_id, notification_id=notification_id)
+    
+    return jsonify({
+        'success': True,
+        'message': 'Notification marked as read',
+        'unread_count': notifications.unread_count(user_type, user_id)
+    }), 200
+
+@api_bp.route('/notifications/read', methods=['PUT'])
+def mark_notifications_as_read():
+    # Marks everything, or with {"up_to_id": N} every notification up to N, in one UPDATE
+    user_type, user_id = request_user()
+    
+    if not user_id or not user_type:
+        return jsonify({
+            'success': False,
+            'message': 'Missing user_id or user_type'
+        }), 400
+    
+    data = request.get_json(silent=True) or {}
+    up_to_id = data.get('up_to_id')
+    if up_to_id is not None:
+        try:
+            up_to_id = int(up_to_id)
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'message': 'up_to_id must be an integer'
+            }), 400
+    
+    marked = notifications.mark_read(user_type, user_id, up_to_id=up_to_id)
+    
     return jsonify({
         'success': True,
-        'message': 'Notification marked as read'
+        'message': f'{marked} notification(s) marked as read',
+        'unread_count': notifications.unread_count(user_type, user_id)
     }), 200
 
 # Vet profile endpoints
 @api_bp.route('/vets/<vet_id>', methods=['GET'])
+@cached(tags=lambda vet_id: ['vets', f'vet:{vet_id}'])
 def get_vet_profile(vet_id):
     # Get vet profile
     vet = Veterinarian.query.get(vet_id)
@@ -405,13 +614,11 @@ def get_vet_profile(vet_id):
             'message': 'Veterinarian not found'
         }), 404
     
-    # Get average rating
-    reviews = Review.query.filter_by(veterinarian_id=vet_id).all()
-    review_count = len(reviews)
-    
-    # In a real implementation, you would calculate the average rating
-    # For now, use a mock value
-    average_rating = 4.5
+    # Review aggregates are maintained on write, so this is a single primary key lookup
+    stats = get_vet_stats(vet.id)
+    review_count = stats.review_count if stats else 0
+    average_rating = stats.average_rating if stats else 0.0
+    rating_histogram = stats.rating_histogram if stats else {str(stars): 0 for stars in range(1, 6)}
     
     # Return vet profile data
     vet_data = {
@@ -423,6 +630,7 @@ def get_vet_profile(vet_id):
         'profile_image_url': vet.profile_image,
         'average_rating': average_rating,
         'review_count': review_count,
+        'rating_histogram': rating_histogram,
         'bio': 'Professional veterinarian with years of experience.',  # Add bio field to your Veterinarian model
         'phone': '0712345678',  # Add phone field to your Veterinarian model
         'education': 'University of Veterinary Medicine',  # Add education field to your Veterinarian model
@@ -449,48 +657,85 @@ def get_vet_profile(vet_id):
 def search_vets():
     query = request.args.get('query', '')
     specialization = request.args.get('specialization', '')
+    limit = min(
+        request.args.get('limit', current_app.config['SEARCH_RESULT_LIMIT'], type=int),
+        current_app.config['MAX_PAGE_SIZE']
+    )
     
-    # Build the query
-    vet_query = Veterinarian.query
-    
-    if query:
-        vet_query = vet_query.filter(Veterinarian.name.ilike(f'%{query}%'))
-    
-    if specialization:
-        vet_query = vet_query.filter(Veterinarian.specialization.ilike(f'%{specialization}%'))
-    
-    vets = vet_query.all()
+    if query or specialization:
+        # Ranked matches from the search index, every word of the query may be a prefix
+        vets = [(vet, stats) for vet, stats, score in search(query, specialization, limit)]
+    else:
+        # No filter: every vet, the rating aggregates come along in the same row
+        vets = db.session.query(Veterinarian, VeterinarianStats).outerjoin(
+            VeterinarianStats, VeterinarianStats.veterinarian_id == Veterinarian.id
+        ).all()
     
+    thumbnails = images.thumbnail_urls(vet.profile_image for vet, stats in vets)
     vet_list = []
-    for vet in vets:
+    for vet, stats in vets:
         vet_list.append({
             'id': vet.id,
             'name': vet.name,
             'clinic': vet.clinic,
             'specialization': vet.specialization,
-            'profile_image': vet.profile_image
+            'profile_image': vet.profile_image,
+            'profile_thumbnail': thumbnails.get(vet.profile_image, vet.profile_image),
+            'average_rating': stats.average_rating if stats else 0.0,
+            'review_count': stats.review_count if stats else 0
         })
     
     return jsonify(vet_list), 200
 
+@api_bp.route('/vets/autocomplete', methods=['GET'])
+def autocomplete_vets():
+    # Suggestions for the search box, cheap enough to call on every keystroke
+    query = request.args.get('query', '')
+    
+    suggestions = [{
+        'id': vet.id,
+        'name': vet.name,
+        'clinic': vet.clinic,
+        'specialization': vet.specialization
+    } for vet, stats, score in search(query, limit=current_app.config['AUTOCOMPLETE_LIMIT'])]
+    
+    return jsonify(suggestions), 200
+
 @api_bp.route('/vets/clinics', methods=['GET'])
+@cached(tags=['vets'])
 def get_vet_clinics():
-    # Get all vets with their clinic information
-    vets = Veterinarian.query.all()
-    
-    clinics = []
-    for vet in vets:
-        # In a real implementation, you would have latitude and longitude stored
-        # For now, use mock values
-        clinics.append({
-            'id': str(vet.id),
-            'name': f"{vet.name}'s Clinic",
-            'address': vet.clinic,
-            'latitude': -1.286389 + (vet.id * 0.01),  # Mock values
-            'longitude': 36.817223 + (vet.id * 0.01),  # Mock values
-            'vet_name': vet.name
-        })
+    # ?near=lat,lon with radius_km= (clinics in range) and/or k= (the k nearest),
+    # nearest first; without near every clinic with a location is returned
+    clinic_index = get_clinic_index()
+    near = request.args.get('near')
+    
+    if not near:
+        return jsonify(clinic_index.all()), 200
+    
+    try:
+        latitude, longitude = (float(part) for part in near.split(','))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'near must be lat,lon'
+        }), 400
+    radius_km = request.args.get('radius_km', type=float)
+    k = request.args.get('k', type=int)
     
+    if not valid_coordinates(latitude, longitude) or (radius_km is not None and radius_km <= 0) or (k is not None and k < 1):
+        return jsonify({
+            'success': False,
+            'message': 'Invalid near, radius_km or k'
+        }), 400
+    
+    max_results = current_app.config['CLINIC_MAX_RESULTS']
+    if k is not None:
+        found = clinic_index.nearest(latitude, longitude, min(k, max_results), radius_km)
+    else:
+        radius_km = radius_km or current_app.config['CLINIC_DEFAULT_RADIUS_KM']
+        found = clinic_index.within(latitude, longitude, radius_km)[:max_results]
+    
+    clinics = [dict(entry, distance_km=round(distance, 3)) for distance, entry in found]
     return jsonify(clinics), 200
 
 @api_bp.route('/vets/<vet_id>/clinic', methods=['PUT'])
@@ -507,6 +752,16 @@ def update_clinic_location(vet_id):
             'message': 'Missing required fields'
         }), 400
     
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        latitude = longitude = None
+    if latitude is None or not valid_coordinates(latitude, longitude):
+        return jsonify({
+            'success': False,
+            'message': 'Invalid latitude or longitude'
+        }), 400
+    
     # Check if vet exists
     vet = Veterinarian.query.get(vet_id)
     if not vet:
@@ -516,15 +771,136 @@ def update_clinic_location(vet_id):
         }), 404
     
     # Update clinic information
-    # In a real implementation, you would update the latitude and longitude
-    vet.clinic = address
+    set_clinic_location(vet, name, address, latitude, longitude)
+    index_vet(vet)
+    invalidate_on_commit('vets')
     db.session.commit()
     
+    # This worker sees the move at once, the others on their next sync
+    get_clinic_index().update(vet)
+    
     return jsonify({
         'success': True,
         'message': 'Clinic location updated successfully'
     }), 200
 
+@api_bp.route('/vets/<vet_id>/availability', methods=['GET'])
+def get_vet_availability(vet_id):
+    # Free slots per day for ?days= days from ?from= (YYYY-MM-DD, default today)
+    vet = Veterinarian.query.get(vet_id)
+    if not vet:
+        return jsonify({
+            'success': False,
+            'message': 'Veterinarian not found'
+        }), 404
+    
+    max_days = current_app.config['AVAILABILITY_MAX_DAYS']
+    days = request.args.get('days', 7, type=int)
+    first_day = request.args.get('from')
+    try:
+        first_day = datetime.strptime(first_day, '%Y-%m-%d').date() if first_day else slots.local_now().date()
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid from date. Use YYYY-MM-DD.'
+        }), 400
+    if not 1 <= days <= max_days:
+        return jsonify({
+            'success': False,
+            'message': f'days must be between 1 and {max_days}'
+        }), 400
+    
+    available = slots.free_slots(vet, first_day, days)
+    return jsonify({
+        'success': True,
+        'data': {
+            'slot_minutes': slots.slot_minutes(vet),
+            'days': [
+                {'date': day, 'slots': [slots.format_minute(start) for start in starts]}
+                for day, starts in available
+            ]
+        }
+    }), 200
+
+@api_bp.route('/vets/<vet_id>/working_hours', methods=['GET'])
+def get_working_hours(vet_id):
+    vet = Veterinarian.query.get(vet_id)
+    if not vet:
+        return jsonify({
+            'success': False,
+            'message': 'Veterinarian not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'slot_minutes': slots.slot_minutes(vet),
+            'hours': slots.working_hours_to_list(slots.working_hours(vet.id))
+        }
+    }), 200
+
+@api_bp.route('/vets/<vet_id>/working_hours', methods=['PUT'])
+def update_working_hours(vet_id):
+    # Replaces the whole week: {"slot_minutes": 30, "hours": [{"weekday": 0, "start": "08:00", "end": "12:30"}, ...]}
+    data = request.get_json(silent=True) or {}
+    hours = data.get('hours')
+    if not isinstance(hours, list):
+        return jsonify({
+            'success': False,
+            'message': 'Missing required fields'
+        }), 400
+    
+    vet = Veterinarian.query.get(vet_id)
+    if not vet:
+        return jsonify({
+            'success': False,
+            'message': 'Veterinarian not found'
+        }), 404
+    
+    try:
+        intervals = slots.set_working_hours(vet, hours, data.get('slot_minutes'))
+    except slots.SlotError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Working hours updated successfully',
+        'data': {
+            'slot_minutes': slots.slot_minutes(vet),
+            'hours': slots.working_hours_to_list(intervals)
+        }
+    }), 200
+
+# System endpoints
+@api_bp.route('/system/db_pool', methods=['GET'])
+@admin_required
+def get_db_pool_stats():
+    # Per-worker view of the connection pool, used to size DB_POOL_SIZE / workers
+    return jsonify(pool_stats(db.engine)), 200
+
+@api_bp.route('/system/cache', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    # Per-worker hit/miss counts of the response cache
+    return jsonify(get_response_cache().stats()), 200
+
+@api_bp.route('/system/jobs', methods=['GET'])
+@admin_required
+def get_job_stats():
+    # Background job queue depth and dead letter count
+    return jsonify(queue_stats()), 200
+
+@api_bp.route('/system/services', methods=['GET'])
+@admin_required
+def get_service_stats():
+    # Per-worker circuit state and calls in flight for Firebase and Cloudinary
+    return jsonify(service_stats()), 200
+
 # Payment endpoints
 @api_bp.route('/payments/mpesa', methods=['POST'])
 def initiate_payment():
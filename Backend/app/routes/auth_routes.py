@@ -1,53 +1,27 @@
 from datetime import datetime, timedelta
-import bcrypt
-from firebase_admin import auth
 import json
-from flask import Blueprint, Config, Flask, jsonify, request, session, url_for
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity, JWTManager
-from werkzeug.security import check_password_hash
+from flask import Blueprint, jsonify, request, session, url_for
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_jwt_identity
 from flask_cors import CORS
 from app.models import Animal, AnimalOwner, Appointment, FavoriteVeterinarian, Notification, Review, UserActivity, Veterinarian
 from app.services.auth_service import register_user, login_user
-from app import db
+from app.services.external import ServiceUnavailable
+from app.services.tasks import queue_firebase_sync, queue_password_reset_link
+from app.services import bulk, images, slots
+from app.services.conditional import collection_version, is_fresh, make_validators, not_modified, with_validators
+from app import db, jwt as jwt_manager
+from app.services.accounts import resolve_by_email
+from app.services.pagination import InvalidCursor, encode_cursor, keyset_page, page_params, paginated_list
+from app.services.passwords import hash_password, upgrade_hash_if_needed, verify_password
+from app.services.response_cache import cached
+from app.services.notifications import notify
+from app.services.token_blocklist import get_blocklist
+from app.services.vet_stats import parse_rating, record_review
 import secrets
-import mysql.connector
-import pytz
-from pytz import timezone
-import cloudinary
-import cloudinary.uploader
 
 auth_bp = Blueprint('auth_bp', __name__)
 CORS(auth_bp)
 
-blacklisted_tokens = set()
-
-app = Flask(__name__)
-app.config.from_object(Config)
-
-app.config['SECRET_KEY'] = 'your_secret_key_here'
-app.config['JWT_SECRET_KEY'] = 'your_jwt_secret_key_here'
-jwt = JWTManager(app)
-
-def get_mysql_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="arish",
-        database="vetconnect_db"
-    )
-
-# Cloudinary Configuration
-cloudinary.config(
-    cloud_name="dhlrkwvoz",
-    api_key="622252338293132",
-    api_secret="sLoZrrBF3BQ6WJGwYV2YbXg6d38"
-)
-
-LOCAL_TZ = timezone("Africa/Nairobi")
-
-def utc_to_local(utc_dt):
-    return utc_dt.replace(tzinfo=pytz.utc).astimezone(LOCAL_TZ)
-
 
 @auth_bp.route('/register/animal_owner', methods=['POST', 'OPTIONS'])
 def register_animal_owner():
@@ -66,21 +40,7 @@ def register_animal_owner():
             if field not in data:
                 return jsonify({'message': f'Missing field: {field}'}), 400
 
-        response, status_code = register_user('animal_owner')
-
-        if status_code == 201:
-            try:
-                user = auth.create_user(
-                    email=data['email'],
-                    password=data['password'],
-                    display_name=data['name']
-                )
-                print(f"Firebase user created: {user.uid}")
-            except Exception as e:
-                print(f"Error creating Firebase user: {e}")
-                return jsonify({'message': f'Firebase error: {str(e)}'}), 500
-
-        return response, status_code
+        return register_user('animal_owner')
 
     except Exception as e:
         print(f"Error in register_animal_owner: {e}")
@@ -92,62 +52,47 @@ def register_veterinarian():
     if request.method == 'OPTIONS':
         return _build_cors_preflight_response()
 
-    data = request.get_json()
-    response, status_code = register_user('veterinarian')
-
-    if status_code == 201:
-        try:
-            user = auth.create_user(
-                email=data['email'],
-                password=data['password'],
-                display_name=data['name']
-            )
-            print(f"Firebase user created: {user.uid}")
-        except Exception as e:
-            print(f"Error creating Firebase user: {e}")
-
-    return response, status_code
+    return register_user('veterinarian')
 
 
 @auth_bp.route('/get_veterinarians', methods=['GET'])
+@cached(tags=['vets'])
 def get_veterinarians():
-    try:
-        connection = get_mysql_connection()
-        cursor = connection.cursor(dictionary=True)
+    limit, after = page_params()
 
-        query = "SELECT id, name, email, clinic, specialization FROM Veterinarian"
-        cursor.execute(query)
-        veterinarians = cursor.fetchall()
-
-        cursor.close()
-        connection.close()
+    try:
+        query = db.session.query(
+            Veterinarian.id, Veterinarian.name, Veterinarian.email,
+            Veterinarian.clinic, Veterinarian.specialization
+        )
+        veterinarians, next_key = keyset_page(query, [Veterinarian.id], limit, after)
 
-        return jsonify(veterinarians), 200
+        return paginated_list([dict(vet._mapping) for vet in veterinarians], next_key), 200
 
+    except InvalidCursor:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @auth_bp.route('/get_vet_name', methods=['GET'])
+@cached(tags=['vets'])
 def get_vet_name():
     vet_email = request.args.get('vet_id')
     if not vet_email:
         return jsonify({"error": "Missing vet_id"}), 400
 
-    conn = get_mysql_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("SELECT id, name, specialization FROM Veterinarian WHERE email = %s", (vet_email,))
-    vet = cursor.fetchone()
-    conn.close()
-
-    print("Fetched vet:", vet)
+    vet = (
+        db.session.query(Veterinarian.id, Veterinarian.name, Veterinarian.specialization)
+        .filter(Veterinarian.email == vet_email)
+        .first()
+    )
 
     if vet:
         return jsonify({
-            "id": vet["id"],
-            "name": vet["name"],
-            "specialization": vet["specialization"].split(",") if vet["specialization"] else []
+            "id": vet.id,
+            "name": vet.name,
+            "specialization": vet.specialization.split(",") if vet.specialization else []
         })
     else:
         return jsonify({"error": "Vet not found"}), 404
@@ -172,22 +117,22 @@ def login_user():
     email = data.get('email')
     password = data.get('password')
 
-    # Try to find the user in AnimalOwner table
-    user = AnimalOwner.query.filter_by(email=email).first()
-    user_type = "animal_owner"
+    # One lookup in the account directory finds the user in either table
+    account, user = resolve_by_email(email)
 
-    # If user is not found, check the Veterinarian table
-    if not user:
-        user = Veterinarian.query.filter_by(email=email).first()
-        user_type = "veterinarian"
+    if user and verify_password(password, user.password):
+        # Bring hashes from older schemes or costs up to the current policy
+        if upgrade_hash_if_needed(user, password):
+            db.session.commit()
 
-    if user and check_password_hash(user.password, password):
-        identity_str = json.dumps({'user_id': user.id, 'user_type': user_type})  
+        user_type = account.role
+        identity_str = json.dumps({'user_id': user.id, 'user_type': user_type, 'account_id': account.id})
         access_token = create_access_token(identity=identity_str)  
 
         return jsonify({
             'message': 'Login successful',
             'access_token': access_token,
+            'account_id': account.id,
             'user_id': user.id,
             'user_type': user_type,
             'name': user.name
@@ -196,10 +141,10 @@ def login_user():
     return jsonify({'message': 'Invalid credentials. Please try again'}), 401
 
 
-@jwt.token_in_blocklist_loader
+@jwt_manager.token_in_blocklist_loader
 def check_if_token_is_revoked(jwt_header, jwt_payload):
     jti = jwt_payload['jti']
-    return jti in blacklisted_tokens
+    return get_blocklist().is_revoked(jti)
 
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -209,8 +154,11 @@ def logout():
         identity = get_jwt_identity()
         identity_dict = json.loads(identity)
 
-        jti = get_jwt()["jti"]
-        blacklisted_tokens.add(jti)
+        token = get_jwt()
+        jti = token["jti"]
+        # Keep the entry only as long as the token itself would have been valid
+        expires_at = datetime.utcfromtimestamp(token["exp"]) if "exp" in token else None
+        get_blocklist().revoke(jti, expires_at)
 
         print(f"User {identity_dict} logged out, JTI: {jti}")
         return jsonify({'message': 'Successfully logged out'}), 200
@@ -235,23 +183,14 @@ def get_user():
     if not email:
         return jsonify({"error": "Missing email parameter"}), 400
 
-    connection = get_mysql_connection()
-    cursor = connection.cursor(dictionary=True)
-
-    # Check if the email belongs to an animal owner
-    cursor.execute("SELECT id, name, 'animal_owner' AS user_type FROM animal_owner WHERE email = %s", (email,))
-    user = cursor.fetchone()
-
-    # If not found in AnimalOwner, check Veterinarian table
-    if not user:
-        cursor.execute("SELECT id, name, clinic, specialization, 'veterinarian' AS user_type FROM Veterinarian WHERE email = %s", (email,))
-        user = cursor.fetchone()
-
-    cursor.close()
-    connection.close()
+    account, user = resolve_by_email(email)
 
     if user:
-        return jsonify(user), 200
+        user_data = {"id": user.id, "account_id": account.id, "name": user.name, "user_type": account.role}
+        if account.role == 'veterinarian':
+            user_data["clinic"] = user.clinic
+            user_data["specialization"] = user.specialization
+        return jsonify(user_data), 200
     else:
         return jsonify({"error": "User not found"}), 404
 
@@ -260,19 +199,15 @@ def get_user():
 def forgot_password():
     data = request.get_json()
     email = data.get('email')
-    user = AnimalOwner.query.filter_by(email=email).first() or Veterinarian.query.filter_by(email=email).first()
+    account, user = resolve_by_email(email)
     if not user:
         return jsonify({"message": "Email is not registered"}), 200
     reset_token = secrets.token_urlsafe(32)
     user.reset_token = reset_token
     user.reset_token_expiry = datetime.utcnow() + timedelta(minutes=30)
+    queue_password_reset_link(user.email, reset_token)
     db.session.commit()
     print(f"Reset link: http://192.168.1.100:8000/reset-password?token={reset_token}")
-    try:
-        auth.generate_password_reset_link(email)
-        print("Firebase password reset link sent.")
-    except Exception as e:
-        print(f"Error sending Firebase password reset email: {e}")
     return jsonify({"message": "Password reset link sent! Check your email."}), 200
 
 
@@ -281,24 +216,19 @@ def reset_password():
     data = request.get_json()
     token = data.get('token')
     new_password = data.get('new_password')
-    user = AnimalOwner.query.filter_by(reset_token=token).first()
+    user, user_type = AnimalOwner.query.filter_by(reset_token=token).first(), 'animal_owner'
     if not user:
-        user = Veterinarian.query.filter_by(reset_token=token).first()
+        user, user_type = Veterinarian.query.filter_by(reset_token=token).first(), 'veterinarian'
     if not user:
         return jsonify({"message": "Invalid token"}), 400
     if user.reset_token_expiry and datetime.utcnow() > user.reset_token_expiry:
         return jsonify({"message": "Reset token has expired"}), 400
-    hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    user.password = hashed_password
+    user.password = hash_password(new_password)
     user.reset_token = None
     user.reset_token_expiry = None
+    # The new password reaches Firebase through a job worker
+    queue_firebase_sync(user, user_type, set_password=True)
     db.session.commit()
-    try:
-        firebase_user = auth.get_user_by_email(user.email)
-        auth.update_user(firebase_user.uid, password=new_password)
-        print("Firebase password updated.")
-    except Exception as e:
-        print(f"Error updating Firebase password: {e}")
     return jsonify({"message": "Password reset successful!"}), 200
 
 
@@ -306,40 +236,20 @@ def reset_password():
 @auth_bp.route('/register_animal', methods=['POST'])
 def register_animal():
     data = request.json
-    owner_id = data.get('owner_id') # Foreign key to AnimalOwner
-    name = data.get('name')
-    breed = data.get('breed')
-    species = data.get('species')
-    gender = data.get('gender')
-    color = data.get('color')
-    date_of_birth_str = data.get('date_of_birth')
-    image_url = data.get('image_url', '')
-
-    # Check required fields
-    if not owner_id or not name or not species or not gender or not color or not date_of_birth_str:
-        return jsonify({"message": "Missing required fields", "success": False}), 400
 
+    # Same rules and types as /register_animals
     try:
-        date_of_birth = datetime.strptime(date_of_birth_str, "%Y-%m-%d")
-    except ValueError:
-        return jsonify({"message": "Invalid date format. Use YYYY-MM-DD.", "success": False}), 400
+        fields = bulk.parse_animal(data)
+    except ValueError as e:
+        return jsonify({"message": str(e), "success": False}), 400
 
     # Ensure the owner exists
-    owner = AnimalOwner.query.get(owner_id)
+    owner = AnimalOwner.query.get(fields["owner_id"]) if fields["owner_id"] is not None else None
     if not owner:
         return jsonify({"message": "Owner not found", "success": False}), 404
 
     try:
-        new_animal = Animal(
-            owner_id=owner_id,
-            name=name,
-            breed=breed,
-            species=species,
-            gender=gender,
-            color=color,
-            date_of_birth=date_of_birth,
-            image_url=image_url
-        )
+        new_animal = Animal(**fields)
         db.session.add(new_animal)
         db.session.commit()
         
@@ -349,17 +259,34 @@ def register_animal():
         return jsonify({"message": "An error occurred", "error": str(e), "success": False}), 500
 
 
+@auth_bp.route('/register_animals', methods=['POST'])
+def register_animals():
+    try:
+        items = bulk.batch_items(request.get_json(silent=True), 'animals')
+    except bulk.BulkRequestError as e:
+        return jsonify({"message": str(e), "success": False}), 400
+
+    try:
+        results = bulk.register_animals(items)
+    except Exception as e:
+        return jsonify({"message": "An error occurred", "error": str(e), "success": False}), 500
+
+    return jsonify({"success": True, **bulk.summarize(results)}), 200
+
+
 @auth_bp.route('/upload_image', methods=['POST'])
 def upload_image():
     if 'image' not in request.files:
         return jsonify({"error": "No image uploaded"}), 400
 
-    image = request.files['image']
-    
+    # A photo uploaded before answers from its hash, new ones are resized with thumbnails
     try:
-        upload_result = cloudinary.uploader.upload(image)
-        image_url = upload_result["secure_url"]
-        return jsonify({"image_url": image_url}), 200
+        asset, deduplicated = images.ingest(request.files['image'].stream)
+        return jsonify(images.asset_to_dict(asset, deduplicated)), 200
+    except images.ImageRejected as e:
+        return jsonify({"error": str(e)}), 400
+    except ServiceUnavailable:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -380,9 +307,17 @@ def get_animals():
         else:
             return f"{age_years} years"
 
-    animals = Animal.query.filter_by(owner_id=owner_id).all()
+    # Ages in the body move with the calendar, so today's date is part of the version
+    version = collection_version(Animal.query.filter_by(owner_id=owner_id), Animal.updated_at)
+    etag, last_modified = make_validators(*version, datetime.utcnow().date().isoformat())
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    limit, after = page_params()
+    animals, next_key = keyset_page(Animal.query.filter_by(owner_id=owner_id), [Animal.id], limit, after)
+    thumbnails = images.thumbnail_urls(animal.image_url for animal in animals)
     
-    return jsonify([{
+    return with_validators(paginated_list([{
         "id": animal.id,
         "name": animal.name,
         "breed": animal.breed,
@@ -390,8 +325,9 @@ def get_animals():
         "species": animal.species,
         "gender": animal.gender,
         "color": animal.color,
-        "image_url": animal.image_url
-    } for animal in animals]), 200
+        "image_url": animal.image_url,
+        "thumbnail_url": thumbnails.get(animal.image_url, animal.image_url)
+    } for animal in animals], next_key), etag, last_modified)
 
 @auth_bp.route('/get_specific_animal', methods=['GET'])
 def get_specific_animal():
@@ -403,14 +339,18 @@ def get_specific_animal():
     if not animal:
         return jsonify({"error": "Animal not found"}), 404
 
-    return jsonify({
+    etag, last_modified = make_validators(animal.id, animal.updated_at)
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    return with_validators(jsonify({
         "name": animal.name,
-        "date_of_birth": animal.date_of_birth.strftime("%Y-%m-%d"),
+        "date_of_birth": animal.date_of_birth,
         "breed": animal.breed,
         "color": animal.color,
         "gender": animal.gender,
         "species": animal.species
-    }), 200
+    }), etag, last_modified)
 
 
 @auth_bp.route('/update_animal/<int:animal_id>', methods=['PUT'])
@@ -424,7 +364,7 @@ def update_animal(animal_id):
     date_of_birth_str = data.get("date_of_birth")
     if date_of_birth_str:
         try:
-            animal.date_of_birth = datetime.strptime(date_of_birth_str, "%Y-%m-%d")
+            animal.date_of_birth = datetime.strptime(date_of_birth_str, "%Y-%m-%d").date()
         except ValueError:
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
@@ -456,8 +396,11 @@ def delete_animal(animal_id):
 
 
 @auth_bp.route('/veterinarians', methods=['GET'])
+@cached(tags=['vets'])
 def get_all_veterinarians():
-    veterinarians = Veterinarian.query.all()
+    limit, after = page_params()
+    veterinarians, next_key = keyset_page(Veterinarian.query, [Veterinarian.id], limit, after)
+    thumbnails = images.thumbnail_urls(vet.profile_image for vet in veterinarians)
     vet_list = []
     
     for vet in veterinarians:
@@ -469,10 +412,11 @@ def get_all_veterinarians():
             "id": vet.id,
             "name": vet.name,
             "clinic": vet.clinic,
-            "profile_image": profile_image
+            "profile_image": profile_image,
+            "profile_thumbnail": thumbnails.get(profile_image, profile_image)
         })
 
-    return jsonify({"veterinarians": vet_list})
+    return paginated_list({"veterinarians": vet_list}, next_key)
 
 
 @auth_bp.route('/add_favorite', methods=['POST'])
@@ -485,31 +429,23 @@ def add_favorite():
         if not owner_id or not veterinarian_id:
             return jsonify({"error": "Missing owner_id or veterinarian_id"}), 400
 
-        connection = get_mysql_connection()
-        cursor = connection.cursor()
-
         # Check if the veterinarian is already favorited
-        cursor.execute(
-            "SELECT * FROM favorite_veterinarian WHERE owner_id = %s AND veterinarian_id = %s",
-            (owner_id, veterinarian_id),
+        existing_fav = (
+            db.session.query(FavoriteVeterinarian.id)
+            .filter_by(owner_id=owner_id, veterinarian_id=veterinarian_id)
+            .first()
         )
-        existing_fav = cursor.fetchone()
 
         if existing_fav:
             return jsonify({"message": "Already bookmarked"}), 409
 
-        cursor.execute(
-            "INSERT INTO favorite_veterinarian (owner_id, veterinarian_id) VALUES (%s, %s)",
-            (owner_id, veterinarian_id),
-        )
-        connection.commit()
-
-        cursor.close()
-        connection.close()
+        db.session.add(FavoriteVeterinarian(owner_id=owner_id, veterinarian_id=veterinarian_id))
+        db.session.commit()
 
         return jsonify({"message": "Veterinarian bookmarked successfully"}), 201
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
     
 
@@ -523,34 +459,23 @@ def remove_favorite():
         if not owner_id or not veterinarian_id:
             return jsonify({"error": "Missing owner_id or veterinarian_id"}), 400
 
-        connection = get_mysql_connection()
-        cursor = connection.cursor()
-
-        # Check if the favorite exists
-        cursor.execute(
-            "SELECT * FROM favorite_veterinarian WHERE owner_id = %s AND veterinarian_id = %s",
-            (owner_id, veterinarian_id)
+        # Delete the favorite record, the row count tells us whether it existed
+        deleted = (
+            FavoriteVeterinarian.query
+            .filter_by(owner_id=owner_id, veterinarian_id=veterinarian_id)
+            .delete(synchronize_session=False)
         )
-        favorite = cursor.fetchone()
 
-        if not favorite:
-            cursor.close()
-            connection.close()
-            return jsonify({"error": "Favorite not found"}), 4042
+        if not deleted:
+            db.session.rollback()
+            return jsonify({"error": "Favorite not found"}), 404
 
-        # Delete the favorite record
-        cursor.execute(
-            "DELETE FROM favorite_veterinarian WHERE owner_id = %s AND veterinarian_id = %s",
-            (owner_id, veterinarian_id)
-        )
-        connection.commit()
-
-        cursor.close()
-        connection.close()
+        db.session.commit()
 
         return jsonify({"message": "Favorite removed successfully"}), 200
 
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
@@ -561,22 +486,27 @@ def get_favorites():
     if not owner_id:
         return jsonify({"error": "Missing owner_id"}), 400
 
-    connection = get_mysql_connection()
-    cursor = connection.cursor(dictionary=True)
-
-    query = """
-    SELECT v.id, v.name, v.clinic, v.profile_image
-    FROM favorite_veterinarian fv
-    JOIN veterinarian v ON fv.veterinarian_id = v.id
-    WHERE fv.owner_id = %s
-    """
-    cursor.execute(query, (owner_id,))
-    favorites = cursor.fetchall()
-
-    cursor.close()
-    connection.close()
+    version = collection_version(
+        FavoriteVeterinarian.query.filter_by(owner_id=owner_id)
+        .join(Veterinarian, FavoriteVeterinarian.veterinarian_id == Veterinarian.id),
+        FavoriteVeterinarian.updated_at, Veterinarian.updated_at
+    )
+    etag, last_modified = make_validators(*version)
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    favorites = (
+        db.session.query(Veterinarian.id, Veterinarian.name, Veterinarian.clinic, Veterinarian.profile_image)
+        .join(FavoriteVeterinarian, FavoriteVeterinarian.veterinarian_id == Veterinarian.id)
+        .filter(FavoriteVeterinarian.owner_id == owner_id)
+        .all()
+    )
 
-    return jsonify(favorites), 200
+    thumbnails = images.thumbnail_urls(fav.profile_image for fav in favorites)
+    return with_validators(jsonify([
+        dict(fav._mapping, profile_thumbnail=thumbnails.get(fav.profile_image, fav.profile_image))
+        for fav in favorites
+    ]), etag, last_modified)
 
 
 @auth_bp.route('/book_appointment', methods=['POST'])
@@ -595,49 +525,116 @@ def book_appointment():
     animal = Animal.query.get(animal_id)
     if not animal:
         return jsonify({"error": "Animal not found"}), 404
+    vet = Veterinarian.query.get(veterinarian_id)
+    if not vet:
+        return jsonify({"error": "Veterinarian not found"}), 404
+
+    try:
+        appointment_date = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    # The slot must be inside the vet's working hours and not overlap another booking
+    length = slots.slot_minutes(vet)
+    try:
+        start = slots.parse_time(time)
+        slots.check_bookable(vet, appointment_date, start, length)
+    except slots.SlotError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         new_appointment = Appointment(
             owner_id=owner_id,
             animal_id=animal_id,
             veterinarian_id=veterinarian_id,
-            date=datetime.strptime(date, "%Y-%m-%d"),
-            time=time,
+            date=appointment_date,
+            time=slots.format_minute(start),
+            duration_minutes=length,
             appointment_type=appointment_type,
             status="Pending", # Default status
             notes="",
             prescription=""
         )
         db.session.add(new_appointment)
+        db.session.flush()
+        slots.claim(new_appointment, start, length)
+        notify('veterinarian', veterinarian_id, 'New appointment request',
+               f"{animal.name}: {appointment_type} on {date} at {new_appointment.time}", 'appointment', new_appointment.id)
         db.session.commit() # Commit the new appointment to the database
         return jsonify({
             "message": "Appointment booked successfully and is now Pending.",
             "appointment_id": new_appointment.id
         }), 201
+    except slots.SlotConflict as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
+def _filter_appointments(query):
+    """Apply the optional from_date, to_date and status query params in SQL."""
+    from_date = request.args.get('from_date')
+    to_date = request.args.get('to_date')
+    status = request.args.get('status')
+
+    if from_date:
+        query = query.filter(Appointment.date >= datetime.strptime(from_date, "%Y-%m-%d").date())
+    if to_date:
+        query = query.filter(Appointment.date <= datetime.strptime(to_date, "%Y-%m-%d").date())
+    if status:
+        # Accepts a single status or a comma-separated list, e.g. status=Pending,Upcoming
+        query = query.filter(Appointment.status.in_(status.split(",")))
+
+    return query
+
+
 @auth_bp.route('/get_appointments', methods=['GET'])
 def get_appointments():
     animal_id = request.args.get('animal_id', type=int)
     if animal_id is None:
         return jsonify({"error": "Missing animal_id"}), 400
 
-    appointments = Appointment.query.filter_by(animal_id=animal_id).all()
+    # Versioned over all of the animal's appointments, the filters are part of the URL
+    version = collection_version(
+        Appointment.query.filter_by(animal_id=animal_id)
+        .join(Veterinarian, Appointment.veterinarian_id == Veterinarian.id),
+        Appointment.updated_at, Veterinarian.updated_at
+    )
+    etag, last_modified = make_validators(*version)
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    query = (
+        db.session.query(
+            Appointment.id, Appointment.date, Appointment.time, Appointment.appointment_type,
+            Appointment.status, Veterinarian.name, Veterinarian.profile_image
+        )
+        .join(Veterinarian, Appointment.veterinarian_id == Veterinarian.id)
+        .filter(Appointment.animal_id == animal_id)
+    )
+
+    try:
+        query = _filter_appointments(query)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
-    return jsonify([
+    appointments = query.all()
+    thumbnails = images.thumbnail_urls(appointment.profile_image for appointment in appointments)
+
+    return with_validators(jsonify([
         {
             "id": appointment.id,
-            "date": appointment.date.strftime("%Y-%m-%d"),
+            "date": appointment.date,
             "time": appointment.time,
-            "vet_name": appointment.veterinarian.name,
+            "vet_name": appointment.name,
             "appointment_type": appointment.appointment_type,
             "status": appointment.status,
-            "profile_image": appointment.veterinarian.profile_image
+            "profile_image": appointment.profile_image,
+            "profile_thumbnail": thumbnails.get(appointment.profile_image, appointment.profile_image)
         }
         for appointment in appointments
-    ]), 200
+    ]), etag, last_modified)
 
 
 @auth_bp.route('/get_vet_appointments', methods=['GET'])
@@ -646,14 +643,20 @@ def get_vet_appointments():
     if not veterinarian_id:
         return jsonify({"error": "Missing veterinarian_id"}), 400
 
+    limit, after = page_params()
+
     try:
-        appointments = (
+        query = (
             db.session.query(Appointment, Animal.name, Animal.species, Animal.image_url)
             .join(Animal, Appointment.animal_id == Animal.id)
             .filter(Appointment.veterinarian_id == veterinarian_id, Appointment.date >= datetime.today().date())
-            .order_by(Appointment.date, Appointment.time)
-            .all()
         )
+        appointments, next_key = keyset_page(
+            query, [Appointment.date, Appointment.time, Appointment.id], limit, after,
+            key=lambda row: [row.Appointment.date, row.Appointment.time, row.Appointment.id]
+        )
+
+        thumbnails = images.thumbnail_urls(appointment.image_url for appointment in appointments)
 
         appointment_list = [
             {
@@ -661,12 +664,13 @@ def get_vet_appointments():
                 "owner_id": appointment.Appointment.owner_id,
                 "animal_id": appointment.Appointment.animal_id,
                 "veterinarian_id": appointment.Appointment.veterinarian_id,
-                "date": appointment.Appointment.date.strftime("%Y-%m-%d"),
+                "date": appointment.Appointment.date,
                 "time": appointment.Appointment.time,
                 "appointment_type": appointment.Appointment.appointment_type,
                 "animal_name": appointment.name,
                 "animal_species": appointment.species,
                 "animal_image": appointment.image_url if appointment.image_url else "",
+                "animal_thumbnail": thumbnails.get(appointment.image_url, appointment.image_url or ""),
                 "status": getattr(appointment.Appointment, 'status', 'Pending'),
                 "notes": getattr(appointment.Appointment, 'notes', ''),
                 "prescription": getattr(appointment.Appointment, 'prescription', '')
@@ -674,12 +678,22 @@ def get_vet_appointments():
             for appointment in appointments
         ]
 
-        return jsonify(appointment_list), 200
+        return paginated_list(appointment_list, next_key), 200
 
+    except InvalidCursor:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _update_claim(appointment, new_status):
+    """Release or take back the appointment's slot when the status change calls for it."""
+    if slots.holds_claim(appointment.status) and not slots.holds_claim(new_status):
+        slots.release([appointment.id])
+    elif not slots.holds_claim(appointment.status) and slots.holds_claim(new_status):
+        slots.reclaim(appointment)
+
+
 @auth_bp.route('/update_appointment_status', methods=['POST'])
 def update_appointment_status():
     data = request.get_json()
@@ -698,10 +712,17 @@ def update_appointment_status():
         return jsonify({"error": "Appointment not found"}), 404
 
     try:
+        _update_claim(appointment, new_status)
         appointment.status = new_status
+        notify('animal_owner', appointment.owner_id, f"Appointment {new_status.lower()}",
+               f"Your appointment on {appointment.date.isoformat()} at {appointment.time} is now {new_status}",
+               'appointment', appointment.id)
         db.session.commit()
 
         return jsonify({"message": f"Appointment status updated to {new_status}"}), 200
+    except slots.SlotConflict as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -723,16 +744,51 @@ def update_appointment():
         if not appointment:
             return jsonify({"error": "Appointment not found"}), 404
 
+        _update_claim(appointment, status)
         appointment.status = status
         appointment.notes = notes
         appointment.prescription = prescription
         db.session.commit()
 
         return jsonify({"message": "Appointment updated successfully"}), 200
+    except slots.SlotConflict as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
+@auth_bp.route('/update_appointment_statuses', methods=['POST'])
+def update_appointment_statuses():
+    try:
+        items = bulk.batch_items(request.get_json(silent=True), 'appointments')
+    except bulk.BulkRequestError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        results = bulk.update_appointment_statuses(items)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(bulk.summarize(results)), 200
+
+
+@auth_bp.route('/update_appointments', methods=['POST'])
+def update_appointments():
+    try:
+        items = bulk.batch_items(request.get_json(silent=True), 'appointments')
+    except bulk.BulkRequestError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        results = bulk.update_appointments(items)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify(bulk.summarize(results)), 200
+
+
 @auth_bp.route('/get_animal_appointment_history', methods=['GET'])
 def get_animal_appointment_history():
     animal_id = request.args.get('animal_id', type=int)
@@ -740,31 +796,38 @@ def get_animal_appointment_history():
         return jsonify({"error": "Missing animal_id"}), 400
 
     try:
-        # Get all appointments for this animal, ordered by date (newest first)
-        appointments = (
-            Appointment.query
-            .filter_by(animal_id=animal_id)
-            .order_by(Appointment.date.desc(), Appointment.time.desc())
-            .all()
+        # Get all appointments for this animal with the vet name, ordered by date (newest first)
+        query = (
+            db.session.query(
+                Appointment.id, Appointment.date, Appointment.time, Appointment.appointment_type,
+                Appointment.status, Appointment.notes, Appointment.prescription, Appointment.created_at,
+                Veterinarian.name
+            )
+            .outerjoin(Veterinarian, Appointment.veterinarian_id == Veterinarian.id)
+            .filter(Appointment.animal_id == animal_id)
         )
 
-        history = []
-        for appointment in appointments:
-            # Get veterinarian name
-            vet = Veterinarian.query.get(appointment.veterinarian_id)
-            vet_name = vet.name if vet else "Unknown Veterinarian"
-            
-            history.append({
+        try:
+            query = _filter_appointments(query)
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+
+        appointments = query.order_by(Appointment.date.desc(), Appointment.time.desc()).all()
+
+        history = [
+            {
                 "id": appointment.id,
-                "date": appointment.date.strftime("%Y-%m-%d"),
+                "date": appointment.date,
                 "time": appointment.time,
                 "appointment_type": appointment.appointment_type,
                 "status": appointment.status,
                 "notes": appointment.notes,
                 "prescription": appointment.prescription,
-                "veterinarian_name": vet_name,
-                "created_at": appointment.created_at.strftime("%Y-%m-%d %H:%M:%S")
-            })
+                "veterinarian_name": appointment.name or "Unknown Veterinarian",
+                "created_at": appointment.created_at
+            }
+            for appointment in appointments
+        ]
 
         return jsonify(history), 200
     
@@ -782,13 +845,23 @@ def submit_review():
     if not veterinarian_id or not owner_id or not review_text:
         return jsonify({"error": "Missing required fields"}), 400
 
+    try:
+        rating = parse_rating(data.get("rating"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Rating must be a number between 1 and 5"}), 400
+
     try:
         new_review = Review(
             veterinarian_id=veterinarian_id,
             owner_id=owner_id,
-            review_text=review_text
+            review_text=review_text,
+            rating=rating
         )
         db.session.add(new_review)
+        # Keep the vet's rating aggregates in the same transaction as the review
+        record_review(veterinarian_id, rating)
+        db.session.flush()
+        notify('veterinarian', veterinarian_id, 'New review', review_text, 'review', new_review.id)
         db.session.commit()
         return jsonify({"message": "Review submitted successfully"}), 201
 
@@ -803,25 +876,32 @@ def get_reviews():
     if not vet_id:
         return jsonify({"error": "Missing vet_id"}), 400
 
-    reviews = Review.query.filter_by(veterinarian_id=vet_id).all()
+    limit, after = page_params()
+
+    # Reviews and reviewer names come back in one joined query, newest first
+    query = (
+        db.session.query(
+            Review.id, Review.veterinarian_id, Review.owner_id, Review.review_text, Review.rating,
+            Review.created_at, AnimalOwner.name
+        )
+        .outerjoin(AnimalOwner, Review.owner_id == AnimalOwner.id)
+        .filter(Review.veterinarian_id == vet_id)
+    )
+    reviews, next_key = keyset_page(query, [Review.created_at, Review.id], limit, after, descending=True)
     review_list = []
 
     for review in reviews:
-        owner = AnimalOwner.query.get(review.owner_id)
-        owner_name = owner.name if owner else "Unknown"
-
-        local_time = utc_to_local(review.created_at).strftime("%Y-%m-%d %H:%M:%S")
-
         review_list.append({
             "id": review.id,
             "veterinarian_id": review.veterinarian_id,
             "owner_id": review.owner_id,
-            "user_name": owner_name,
+            "user_name": review.name or "Unknown",
             "review_text": review.review_text,
-            "created_at": local_time
+            "rating": review.rating,
+            "created_at": review.created_at
         })
 
-    return jsonify(review_list), 200
+    return paginated_list(review_list, next_key), 200
 
 @auth_bp.route("/user_activity/<int:user_id>", methods=["GET"])
 def get_user_activity(user_id):
@@ -837,16 +917,64 @@ def get_user_activity(user_id):
     user_name = owner.name if owner else veterinarian.name
     user_email = owner.email if owner else veterinarian.email
 
-    # Fetch user activity
-    appointments = Appointment.query.filter_by(owner_id=user_id).all()
-    reviews = Review.query.filter_by(owner_id=user_id).all()
-    favorites = FavoriteVeterinarian.query.filter_by(owner_id=user_id).all()
-    notifications = Notification.query.filter_by(user_id=user_id).all()
-
-    # Fetch animal registration activities without filtering by `user_type`
-    registrations = UserActivity.query.filter_by(user_id=user_id, activity_type='animal_registration').all()
-    appointment_activities = UserActivity.query.filter_by(user_id=user_id, activity_type='appointment').all()
-    review_activities = UserActivity.query.filter_by(user_id=user_id, activity_type='review').all()
+    limit, after = page_params()
+    if after is not None and (
+        not isinstance(after, dict) or not isinstance(after.get('source'), str) or 'after' not in after
+    ):
+        raise InvalidCursor('Invalid cursor')
+
+    # One feed in a fixed source order: a page takes rows from the source the
+    # cursor points at and moves on to the next source until it holds `limit`
+    sources = {
+        'appointments': (Appointment.query.filter_by(owner_id=user_id), [Appointment.id]),
+        'reviews': (Review.query.filter_by(owner_id=user_id), [Review.id]),
+        'favorites': (FavoriteVeterinarian.query.filter_by(owner_id=user_id), [FavoriteVeterinarian.id]),
+        'notifications': (Notification.query.filter_by(user_id=user_id), [Notification.timestamp, Notification.id]),
+        # Fetch animal registration activities without filtering by `user_type`
+        'registrations': (
+            UserActivity.query.filter_by(user_id=user_id, activity_type='animal_registration'),
+            [UserActivity.timestamp, UserActivity.id]
+        ),
+        'appointment_activities': (
+            UserActivity.query.filter_by(user_id=user_id, activity_type='appointment'),
+            [UserActivity.timestamp, UserActivity.id]
+        ),
+        'review_activities': (
+            UserActivity.query.filter_by(user_id=user_id, activity_type='review'),
+            [UserActivity.timestamp, UserActivity.id]
+        ),
+    }
+    order = list(sources)
+    if after is not None and after['source'] not in sources:
+        raise InvalidCursor('Invalid cursor')
+
+    pages = {source: [] for source in sources}
+    next_cursor = None
+    remaining = limit
+    first = order.index(after['source']) if after else 0
+    for position, source in enumerate(order[first:], start=first):
+        query, columns = sources[source]
+        source_after = after['after'] if after and source == after['source'] else None
+        pages[source], next_key = keyset_page(query, columns, remaining, source_after)
+        if limit is None:
+            continue
+        remaining -= len(pages[source])
+        if next_key is not None:
+            next_cursor = {'source': source, 'after': next_key}
+            break
+        if remaining == 0:
+            # This source is done; the next page starts at the following one, if any
+            if position + 1 < len(order):
+                next_cursor = {'source': order[position + 1], 'after': None}
+            break
+
+    appointments = pages['appointments']
+    reviews = pages['reviews']
+    favorites = pages['favorites']
+    notifications = pages['notifications']
+    registrations = pages['registrations']
+    appointment_activities = pages['appointment_activities']
+    review_activities = pages['review_activities']
 
     # Convert data to JSON format
     activity_data = {
@@ -854,11 +982,11 @@ def get_user_activity(user_id):
         "email": user_email,
         "activities": [
             *[
-                {"type": "Appointment", "description": a.status, "timestamp": a.date.isoformat()}
+                {"type": "Appointment", "description": a.status, "timestamp": a.date}
                 for a in appointments
             ],
             *[
-                {"type": "Review", "description": r.review_text, "timestamp": r.created_at.isoformat()}
+                {"type": "Review", "description": r.review_text, "timestamp": r.created_at}
                 for r in reviews
             ],
             *[
@@ -866,22 +994,26 @@ def get_user_activity(user_id):
                 for f in favorites
             ],
             *[
-                {"type": "Notification", "description": n.title, "timestamp": n.timestamp.isoformat()}
+                {"type": "Notification", "description": n.title, "timestamp": n.timestamp}
                 for n in notifications
             ],
             *[
-                {"type": "Animal Registration", "description": reg.description, "timestamp": reg.timestamp.isoformat()}
+                {"type": "Animal Registration", "description": reg.description, "timestamp": reg.timestamp}
                 for reg in registrations
             ],
             *[
-                {"type": "Appointment Activity", "description": a.description, "timestamp": a.timestamp.isoformat()}
+                {"type": "Appointment Activity", "description": a.description, "timestamp": a.timestamp}
                 for a in appointment_activities
             ],
             *[
-                {"type": "Review Activity", "description": r.description, "timestamp": r.timestamp.isoformat()}
+                {"type": "Review Activity", "description": r.description, "timestamp": r.timestamp}
                 for r in review_activities
             ],
-        ]
+        ],
+        # The one list that carries its cursor in the body: a page spans several
+        # sources, and the cursor names the source to resume from. Every other
+        # list sends it in X-Next-Cursor (paginated_list).
+        "next_cursor": encode_cursor(next_cursor) if next_cursor else None
     }
 
     return jsonify(activity_data), 200
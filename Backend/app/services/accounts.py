@@ -0,0 +1,148 @@
+import functools
+import json
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import and_, select
+
+from app import db
+from app.models import Account, AnimalOwner, Veterinarian
+
+ROLE_MODELS = {
+    'animal_owner': AnimalOwner,
+    'veterinarian': Veterinarian,
+}
+
+
+def _directory_query():
+    # Account joined to whichever user table its role points at, so the account
+    # and the user row come back together in a single SELECT
+    return (
+        db.session.query(Account, AnimalOwner, Veterinarian)
+        .outerjoin(AnimalOwner, and_(Account.role == 'animal_owner', AnimalOwner.id == Account.user_id))
+        .outerjoin(Veterinarian, and_(Account.role == 'veterinarian', Veterinarian.id == Account.user_id))
+    )
+
+
+def _unpack(row):
+    if row is None:
+        return None, None
+    account, owner, vet = row
+    user = owner or vet
+    if user is None:
+        return None, None
+    return account, user
+
+
+def resolve_by_email(email):
+    """Return (account, user) for a login email, or (None, None)."""
+    if not email:
+        return None, None
+    return _unpack(_directory_query().filter(Account.email == email).first())
+
+
+def resolve_by_account_id(account_id):
+    """Return (account, user) for a global account ID, or (None, None)."""
+    return _unpack(_directory_query().filter(Account.id == account_id).first())
+
+
+def resolve_many_by_account_id(account_ids):
+    """Return {account_id: (account, user)} for the accounts that exist, in one query."""
+    rows = _directory_query().filter(Account.id.in_(account_ids)).all()
+    resolved = {}
+    for row in rows:
+        account, user = _unpack(row)
+        if account is not None:
+            resolved[account.id] = (account, user)
+    return resolved
+
+
+def resolve_by_user(role, user_id):
+    """Return (account, user) for a row ID within a role, or (None, None)."""
+    if role not in ROLE_MODELS:
+        return None, None
+    return _unpack(_directory_query().filter(Account.role == role, Account.user_id == user_id).first())
+
+
+def add_account(user, role):
+    """Register a freshly added user in the directory, in the caller's transaction."""
+    db.session.flush()  # Assigns user.id
+    account = Account(email=user.email, role=role, user_id=user.id)
+    db.session.add(account)
+    return account
+
+
+def users_without_account():
+    """(role, user, holder) for every user with no account row, one query per role.
+
+    These are the second holders of an email that both tables had when the
+    directory was backfilled; `holder` is the (account, user) owning the email.
+    Such a user cannot log in until resolve_missing_account() gives them an
+    email of their own.
+    """
+    missing = []
+    for role, model in ROLE_MODELS.items():
+        users = (
+            model.query
+            .outerjoin(Account, and_(Account.role == role, Account.user_id == model.id))
+            .filter(Account.id.is_(None))
+            .order_by(model.id)
+            .all()
+        )
+        missing.extend((role, user, resolve_by_email(user.email)) for user in users)
+    return missing
+
+
+def resolve_missing_account(role, user_id, email):
+    """Move a user without an account row to a free email and add the account. The caller commits.
+
+    Raises ValueError when the user is unknown, already has an account or the email is taken.
+    """
+    user = db.session.get(ROLE_MODELS[role], user_id) if role in ROLE_MODELS else None
+    if user is None:
+        raise ValueError(f"No {role} with id {user_id}")
+    if resolve_by_user(role, user_id)[0] is not None:
+        raise ValueError(f"{role} {user_id} already has an account")
+    if db.session.query(Account.id).filter_by(email=email).first() is not None:
+        raise ValueError(f"{email} is already registered")
+
+    user.email = email
+    return add_account(user, role)
+
+
+def request_account_id():
+    """The caller's account ID from ?account_id= or ?user_id=&user_type=.
+
+    Returns an int, a scalar subquery that callers can embed in their own
+    statement (so resolving the caller costs no extra round trip), or None.
+    """
+    account_id = request.args.get('account_id', type=int)
+    if account_id is not None:
+        return account_id
+
+    user_id = request.args.get('user_id', type=int)
+    user_type = request.args.get('user_type')
+    if user_id is None or user_type not in ROLE_MODELS:
+        return None
+
+    return select(Account.id).where(Account.role == user_type, Account.user_id == user_id).scalar_subquery()
+
+
+def resolve_request_account_id():
+    """Like request_account_id() but always an int (or None), running the lookup if needed."""
+    account_id = request_account_id()
+    if account_id is None or isinstance(account_id, int):
+        return account_id
+    return db.session.execute(select(account_id)).scalar()
+
+
+def admin_required(view):
+    """Only let through a bearer token whose account is in ADMIN_ACCOUNT_IDS."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()  # 401 without a valid token
+        identity = json.loads(get_jwt_identity())
+        if identity.get('account_id') not in current_app.config['ADMIN_ACCOUNT_IDS']:
+            return jsonify({'success': False, 'message': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+    return wrapper
@@ -1,13 +1,23 @@
 from flask import jsonify, request
-from app import db, bcrypt
+from sqlalchemy.exc import IntegrityError
+from app import db
 from app.models import Animal, AnimalOwner, Appointment, Review, UserActivity, Veterinarian
-from werkzeug.security import generate_password_hash
+from app.services.accounts import add_account, resolve_by_email
+from app.services.passwords import hash_password, upgrade_hash_if_needed, verify_password
+from app.services.response_cache import invalidate_on_commit
+from app.services.tasks import queue_firebase_sync
+from app.services.vet_search import index_vet
+from app.services.vet_stats import record_review
 
 def register_user(user_type):
     data = request.get_json()
+
+    # One account directory for both roles, so an email can only be registered once
+    if resolve_by_email(data['email'])[0] is not None:
+        return jsonify({'message': 'Email already registered'}), 409
     
     # Hash the password before storing it
-    hashed_password = generate_password_hash(data['password'])
+    hashed_password = hash_password(data['password'])
 
     if user_type == 'animal_owner':
         new_user = AnimalOwner(
@@ -30,8 +40,20 @@ def register_user(user_type):
 
     try:
         db.session.add(new_user)
+        add_account(new_user, user_type)
+        # The Firebase account is created by a job worker once this commits
+        queue_firebase_sync(new_user, user_type)
+        if user_type == 'veterinarian':
+            index_vet(new_user)
+            invalidate_on_commit('vets')
         db.session.commit()
         return jsonify({'message': 'User registered successfully'}), 201
+    except IntegrityError as e:
+        db.session.rollback()
+        # Registered concurrently since the check above
+        if resolve_by_email(data['email'])[0] is not None:
+            return jsonify({'message': 'Email already registered'}), 409
+        return jsonify({'message': f'Error registering user: {str(e)}'}), 500
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Error registering user: {str(e)}'}), 500
@@ -42,20 +64,18 @@ def login_user():
     email = data.get('email')
     password = data.get('password')
 
-    # Try to find user in AnimalOwner table
-    user = AnimalOwner.query.filter_by(email=email).first()
-    user_type = "animal_owner"
+    # One lookup in the account directory finds the user in either table
+    account, user = resolve_by_email(email)
 
-    # If user is not found, try the Veterinarian table
-    if not user:
-        user = Veterinarian.query.filter_by(email=email).first()
-        user_type = "veterinarian"
+    if user and verify_password(password, user.password):
+        if upgrade_hash_if_needed(user, password):
+            db.session.commit()
 
-    if user and bcrypt.check_password_hash(user.password, password):
         return jsonify({
             'message': 'Login successful',
+            'account_id': account.id,
             'user_id': user.id,
-            'user_type': user_type,
+            'user_type': account.role,
             'name': user.name
         }), 200
 
@@ -109,14 +129,16 @@ def create_appointment(owner_id, animal_id, veterinarian_id, date, time, appoint
     db.session.add(activity)
     db.session.commit()
 
-def add_review(owner_id, veterinarian_id, review_text):
+def add_review(owner_id, veterinarian_id, review_text, rating=None):
     # Add the review to the system
     new_review = Review(
         owner_id=owner_id,
         veterinarian_id=veterinarian_id,
-        review_text=review_text
+        review_text=review_text,
+        rating=rating
     )
     db.session.add(new_review)
+    record_review(veterinarian_id, rating)
 
     # Log this review as an activity
     activity = UserActivity(
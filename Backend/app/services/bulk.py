@@ -0,0 +1,237 @@
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, select
+
+from app import db
+from app.models import Animal, AnimalOwner, Appointment
+from app.services import slots
+from app.services.notifications import notify_many
+
+# Bulk variants of /register_animal, /update_appointment_status and
+# /update_appointment for herds and a vet's whole day. Every item is validated
+# up front (the lookups they need are one query per batch), then all the valid
+# ones are written in one transaction: animals in one flush (a single batched
+# INSERT where the database can return the new keys, one per row on MySQL), one
+# UPDATE ... SET col = CASE id WHEN ... END for appointments. Invalid items are
+# reported in the per-item results and do not stop the rest of the batch.
+
+APPOINTMENT_STATUSES = ["Pending", "Upcoming", "Completed", "Missed"]
+ANIMAL_FIELDS = ["owner_id", "name", "breed", "species", "gender", "color", "date_of_birth"]
+
+
+class BulkRequestError(ValueError):
+    """The batch itself is unusable (not a list, empty, too large)."""
+
+
+def batch_items(data, key):
+    """The list of items under `key` in a request body, capped at BULK_MAX_ITEMS."""
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BulkRequestError(f"'{key}' must be a non-empty list")
+
+    max_items = current_app.config['BULK_MAX_ITEMS']
+    if len(items) > max_items:
+        raise BulkRequestError(f"At most {max_items} {key} per request")
+    return items
+
+
+def _failed(index, error):
+    return {"index": index, "success": False, "error": error}
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize(results):
+    succeeded = sum(1 for result in results if result["success"])
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
+def parse_animal(item):
+    """Animal column values from one /register_animal body or batch item.
+
+    Shared by the single and bulk endpoints so both accept the same input and
+    store the same types. Raises ValueError with the message for the client;
+    whether the owner exists is left to the caller (owner_id is None when not a number).
+    """
+    if not isinstance(item, dict) or any(not item.get(field) for field in ANIMAL_FIELDS):
+        raise ValueError("Missing required fields")
+    try:
+        date_of_birth = datetime.strptime(item["date_of_birth"], "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+
+    return {
+        "owner_id": _int_or_none(item["owner_id"]),
+        "name": item["name"],
+        "breed": item["breed"],
+        "species": item["species"],
+        "gender": item["gender"],
+        "color": item["color"],
+        "date_of_birth": date_of_birth,
+        "image_url": item.get("image_url", ""),
+    }
+
+
+def register_animals(items):
+    """Insert every valid animal in `items` in one flush. Returns per-item results."""
+    results = [None] * len(items)
+    animals, animal_indexes = [], []
+
+    owner_ids = {_int_or_none(item.get("owner_id")) for item in items if isinstance(item, dict)}
+    owner_ids.discard(None)
+    known_owners = set(db.session.scalars(select(AnimalOwner.id).where(AnimalOwner.id.in_(owner_ids))))
+
+    for index, item in enumerate(items):
+        try:
+            fields = parse_animal(item)
+        except ValueError as e:
+            results[index] = _failed(index, str(e))
+            continue
+        if fields["owner_id"] not in known_owners:
+            results[index] = _failed(index, "Owner not found")
+            continue
+
+        animals.append(Animal(**fields))
+        animal_indexes.append(index)
+
+    if animals:
+        try:
+            # The ORM batches the INSERT with RETURNING where the dialect supports it
+            # and falls back to one row at a time (lastrowid) where it does not
+            db.session.add_all(animals)
+            db.session.flush()
+            animal_ids = [animal.id for animal in animals]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for index, animal_id in zip(animal_indexes, animal_ids):
+            results[index] = {"index": index, "success": True, "animal_id": animal_id}
+
+    return results
+
+
+def _validate_appointment_items(items):
+    """(results with failures filled in, {appointment_id: (index, item)}, {appointment_id: row})."""
+    results = [None] * len(items)
+    valid = {}
+
+    for index, item in enumerate(items):
+        appointment_id = _int_or_none(item.get("appointment_id")) if isinstance(item, dict) else None
+        if appointment_id is None or not item.get("status"):
+            results[index] = _failed(index, "Missing appointment_id or status")
+        elif item["status"] not in APPOINTMENT_STATUSES:
+            results[index] = _failed(index, "Invalid status. Allowed: " + ", ".join(APPOINTMENT_STATUSES))
+        elif appointment_id in valid:
+            results[index] = _failed(index, "Duplicate appointment_id in batch")
+        else:
+            valid[appointment_id] = (index, item)
+
+    existing = {
+        row.id: row
+        for row in db.session.query(
+            Appointment.id, Appointment.owner_id, Appointment.veterinarian_id, Appointment.date,
+            Appointment.time, Appointment.status, Appointment.duration_minutes
+        ).filter(Appointment.id.in_(valid))
+    }
+    for appointment_id in list(valid):
+        if appointment_id not in existing:
+            index, _ = valid.pop(appointment_id)
+            results[index] = _failed(index, "Appointment not found")
+
+    return results, valid, existing
+
+
+def _update_claims(results, valid, existing):
+    """Release the slots of appointments leaving a claiming status and take back those returning to one.
+
+    An appointment whose time has been booked since is reported as failed and
+    dropped from `valid`, so it is not updated.
+    """
+    released = []
+    for appointment_id, (index, item) in list(valid.items()):
+        row = existing[appointment_id]
+        if slots.holds_claim(row.status) and not slots.holds_claim(item["status"]):
+            released.append(appointment_id)
+        elif not slots.holds_claim(row.status) and slots.holds_claim(item["status"]):
+            try:
+                slots.reclaim(row)
+            except slots.SlotConflict as e:
+                del valid[appointment_id]
+                results[index] = _failed(index, str(e))
+    slots.release(released)
+
+
+def _update_appointments(changes, columns):
+    """One UPDATE setting `columns` per appointment: {appointment_id: {column: value}}."""
+    ids = list(changes)
+    values = {
+        column: case({appointment_id: changes[appointment_id][column] for appointment_id in ids}, value=Appointment.id)
+        for column in columns
+    }
+    values["updated_at"] = datetime.utcnow()
+    Appointment.query.filter(Appointment.id.in_(ids)).update(values, synchronize_session=False)
+
+
+def update_appointment_statuses(items):
+    """Set the status of many appointments and notify their owners. Returns per-item results."""
+    results, valid, existing = _validate_appointment_items(items)
+    if not valid:
+        return results
+
+    try:
+        _update_claims(results, valid, existing)
+        changes = {appointment_id: {"status": item["status"]} for appointment_id, (_, item) in valid.items()}
+        if changes:
+            _update_appointments(changes, ["status"])
+        notify_many([{
+            "user_type": "animal_owner",
+            "user_id": existing[appointment_id].owner_id,
+            "title": f"Appointment {item['status'].lower()}",
+            "body": f"Your appointment on {existing[appointment_id].date.isoformat()} at "
+                    f"{existing[appointment_id].time} is now {item['status']}",
+            "type": "appointment",
+            "related_id": appointment_id,
+        } for appointment_id, (_, item) in valid.items()])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for appointment_id, (index, item) in valid.items():
+        results[index] = {"index": index, "success": True, "appointment_id": appointment_id, "status": item["status"]}
+    return results
+
+
+def update_appointments(items):
+    """Set status, notes and prescription on many appointments. Returns per-item results."""
+    results, valid, existing = _validate_appointment_items(items)
+    if not valid:
+        return results
+
+    try:
+        _update_claims(results, valid, existing)
+        changes = {
+            appointment_id: {
+                "status": item["status"],
+                "notes": item.get("notes", ""),
+                "prescription": item.get("prescription", ""),
+            }
+            for appointment_id, (_, item) in valid.items()
+        }
+        if changes:
+            _update_appointments(changes, ["status", "notes", "prescription"])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for appointment_id, (index, _) in valid.items():
+        results[index] = {"index": index, "success": True, "appointment_id": appointment_id}
+    return results
@@ -0,0 +1,180 @@
+from datetime import datetime
+
+from sqlalchemy import and_, case, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Account, AnimalOwner, Conversation, Message, Veterinarian
+from app.services.pagination import keyset_page
+from app.services.realtime import publish
+
+
+def parse_chat_id(chat_id):
+    """Split an "<account>_<account>" chat ID into (participant_a_id, participant_b_id), or None."""
+    parts = chat_id.split('_')
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        return None
+    a, b = sorted(int(part) for part in parts)
+    if a == b:
+        return None
+    return a, b
+
+
+def _side(conversation_a_id, account_id):
+    return 'a' if account_id == conversation_a_id else 'b'
+
+
+def list_conversations(me, limit=None, after=None):
+    """The conversations `me` takes part in, most recent first, with the other party's profile.
+
+    `me` may be an account ID or a scalar subquery from request_account_id().
+    """
+    is_a = Conversation.participant_a_id == me
+    other_id = case((is_a, Conversation.participant_b_id), else_=Conversation.participant_a_id)
+
+    query = (
+        db.session.query(
+            Conversation.id,
+            Conversation.participant_a_id,
+            Conversation.participant_b_id,
+            Conversation.last_message,
+            Conversation.last_message_time,
+            case((is_a, Conversation.unread_count_a), else_=Conversation.unread_count_b).label('unread_count'),
+            Account.id.label('other_account_id'),
+            Account.user_id.label('other_user_id'),
+            AnimalOwner.name.label('owner_name'),
+            Veterinarian.name.label('vet_name'),
+            Veterinarian.profile_image.label('vet_image'),
+        )
+        .join(Account, Account.id == other_id)
+        .outerjoin(AnimalOwner, and_(Account.role == 'animal_owner', AnimalOwner.id == Account.user_id))
+        .outerjoin(Veterinarian, and_(Account.role == 'veterinarian', Veterinarian.id == Account.user_id))
+        .filter(or_(Conversation.participant_a_id == me, Conversation.participant_b_id == me))
+    )
+
+    return keyset_page(
+        query, [Conversation.last_message_time, Conversation.id], limit, after, descending=True
+    )
+
+
+def _conversation_id(a, b):
+    return (
+        db.session.query(Conversation.id)
+        .filter(Conversation.participant_a_id == a, Conversation.participant_b_id == b)
+        .scalar()
+    )
+
+
+def _get_or_create_conversation(a, b):
+    conversation_id = _conversation_id(a, b)
+    if conversation_id is not None:
+        return conversation_id
+
+    conversation = Conversation(participant_a_id=a, participant_b_id=b)
+    try:
+        with db.session.begin_nested():
+            db.session.add(conversation)
+        return conversation.id
+    except IntegrityError:
+        # The other participant opened the conversation at the same moment
+        return _conversation_id(a, b)
+
+
+def send_message(a, b, sender_id, content, image_url=None):
+    """Store a message and update the conversation summary in the same transaction."""
+    conversation_id = _get_or_create_conversation(a, b)
+    now = datetime.utcnow()
+
+    message = Message(
+        conversation_id=conversation_id,
+        sender_id=sender_id,
+        content=content,
+        image_url=image_url,
+        created_at=now
+    )
+    db.session.add(message)
+    db.session.flush()
+
+    sender = _side(a, sender_id)
+    recipient = 'b' if sender == 'a' else 'a'
+    unread = getattr(Conversation, f'unread_count_{recipient}')
+
+    Conversation.query.filter_by(id=conversation_id).update({
+        'last_message': content,
+        'last_message_time': now,
+        'last_message_id': message.id,
+        'last_sender_id': sender_id,
+        'message_count': Conversation.message_count + 1,
+        f'unread_count_{recipient}': unread + 1,
+        # Sending implies having read everything up to here
+        f'unread_count_{sender}': 0,
+        f'last_read_id_{sender}': message.id,
+    }, synchronize_session=False)
+
+    event = {
+        'chat_id': f"{a}_{b}",
+        'id': str(message.id),
+        'sender_id': str(sender_id),
+        'receiver_id': str(b if sender == 'a' else a),
+        'content': content,
+        'image_url': image_url,
+        'timestamp': now,
+    }
+    # Both sides get the event, the sender's other devices need it too
+    publish(a, 'message', event)
+    publish(b, 'message', event)
+    db.session.commit()
+
+    return message
+
+
+def get_messages(a, b, limit=None, after=None):
+    """Messages of the conversation in send order, each with the recipient's read marker."""
+    query = (
+        db.session.query(
+            Message.id, Message.sender_id, Message.content, Message.image_url, Message.created_at,
+            Conversation.last_read_id_a, Conversation.last_read_id_b
+        )
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .filter(Conversation.participant_a_id == a, Conversation.participant_b_id == b)
+    )
+    return keyset_page(query, [Message.id], limit, after)
+
+
+def is_read(row, a):
+    # A message is read once the recipient's read marker has passed it
+    recipient_marker = row.last_read_id_b if row.sender_id == a else row.last_read_id_a
+    return recipient_marker >= row.id
+
+
+def mark_read(a, b, reader_id):
+    """Zero the reader's unread counter with one UPDATE. Returns False if there is no conversation."""
+    reader = _side(a, reader_id)
+    updated = (
+        Conversation.query
+        .filter(Conversation.participant_a_id == a, Conversation.participant_b_id == b)
+        .update({
+            f'unread_count_{reader}': 0,
+            f'last_read_id_{reader}': db.func.coalesce(Conversation.last_message_id, 0),
+        }, synchronize_session=False)
+    )
+    if updated:
+        # Read receipt for the other participant
+        publish(b if reader == 'a' else a, 'read', {'chat_id': f"{a}_{b}", 'reader_id': str(reader_id)})
+    db.session.commit()
+    return bool(updated)
+
+
+def get_counts(a, b, reader_id=None):
+    """(message_count, unread_count) for the conversation from its summary row."""
+    row = (
+        db.session.query(Conversation.message_count, Conversation.unread_count_a, Conversation.unread_count_b)
+        .filter(Conversation.participant_a_id == a, Conversation.participant_b_id == b)
+        .first()
+    )
+    if row is None:
+        return 0, 0
+    if reader_id is None:
+        return row.message_count, 0
+    unread = row.unread_count_a if _side(a, reader_id) == 'a' else row.unread_count_b
+    return row.message_count, unread
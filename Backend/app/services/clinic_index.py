@@ -0,0 +1,180 @@
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import Veterinarian
+
+# Clinic coordinates are kept in an in-process grid index so the map can ask for
+# the clinics near a point without the database computing a distance for every
+# vet. The grid cuts the globe into CLINIC_INDEX_CELL_DEGREES squares; a radius
+# query only visits the cells its bounding box touches. Each worker loads the
+# index on first use and then picks up locations changed by other workers every
+# CLINIC_INDEX_SYNC_SECONDS through the indexed location_updated_at column.
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_coordinates(latitude, longitude):
+    return -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def clinic_entry(vet):
+    return {
+        'id': str(vet.id),
+        'name': vet.clinic_name or f"{vet.name}'s Clinic",
+        'address': vet.clinic,
+        'latitude': vet.latitude,
+        'longitude': vet.longitude,
+        'vet_name': vet.name,
+    }
+
+
+class ClinicIndex:
+
+    # Locations committed by other workers shortly before a sync may carry an
+    # older timestamp than the sync watermark, so each sync looks back a little
+    SYNC_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, cell_degrees=0.1, sync_seconds=5.0):
+        self.cell_degrees = cell_degrees
+        self.sync_seconds = sync_seconds
+        self.lon_cells = math.ceil(360 / cell_degrees)
+
+        self._lock = threading.Lock()
+        self._cells = {}    # (lat_cell, lon_cell) -> {vet_id: entry}
+        self._entries = {}  # vet_id -> (cell, entry)
+        self._loaded = False
+        self._synced_at = None
+        self._next_sync = 0.0
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor((longitude + 180) / self.cell_degrees) % self.lon_cells
+
+    def _put(self, vet_id, entry):
+        # Caller holds the lock
+        self._remove(vet_id)
+        if entry is None or entry['latitude'] is None or entry['longitude'] is None:
+            return
+        cell = self._cell(entry['latitude'], entry['longitude'])
+        self._cells.setdefault(cell, {})[vet_id] = entry
+        self._entries[vet_id] = (cell, entry)
+
+    def _remove(self, vet_id):
+        previous = self._entries.pop(vet_id, None)
+        if previous is not None:
+            cell, _ = previous
+            members = self._cells[cell]
+            del members[vet_id]
+            if not members:
+                del self._cells[cell]
+
+    def update(self, vet):
+        """Apply one vet's (new) location right away in this worker."""
+        with self._lock:
+            self._put(vet.id, clinic_entry(vet))
+
+    def _load(self, vets, now):
+        with self._lock:
+            for vet in vets:
+                self._put(vet.id, clinic_entry(vet))
+            self._synced_at = now
+
+    def _refresh(self):
+        clock = time.monotonic()
+        if self._loaded and clock < self._next_sync:
+            return
+        now = datetime.utcnow()
+        query = Veterinarian.query.filter(Veterinarian.latitude.isnot(None))
+        if self._loaded:
+            query = Veterinarian.query.filter(Veterinarian.location_updated_at >= self._synced_at - self.SYNC_OVERLAP)
+        self._load(query.all(), now)
+        self._loaded = True
+        self._next_sync = clock + self.sync_seconds
+
+    def _cells_around(self, latitude, longitude, radius_km):
+        """(lat_cells, lon_cells) covering the bounding box of a circle."""
+        lat_span = radius_km / KM_PER_DEGREE
+        lat_low = max(-90.0, latitude - lat_span)
+        lat_high = min(90.0, latitude + lat_span)
+        lat_cells = range(math.floor(lat_low / self.cell_degrees), math.floor(lat_high / self.cell_degrees) + 1)
+
+        # Longitude degrees shrink towards the poles; near one, every longitude is close
+        widest = max(abs(lat_low), abs(lat_high))
+        cos_lat = math.cos(math.radians(widest))
+        if widest >= 89.9 or radius_km / (KM_PER_DEGREE * cos_lat) >= 180:
+            return lat_cells, range(self.lon_cells)
+
+        lon_span = radius_km / (KM_PER_DEGREE * cos_lat)
+        first = math.floor((longitude - lon_span + 180) / self.cell_degrees)
+        last = math.floor((longitude + lon_span + 180) / self.cell_degrees)
+        return lat_cells, {cell % self.lon_cells for cell in range(first, last + 1)}
+
+    def within(self, latitude, longitude, radius_km):
+        """Clinics within `radius_km`, nearest first, as (distance_km, entry)."""
+        self._refresh()
+        lat_cells, lon_cells = self._cells_around(latitude, longitude, radius_km)
+        found = []
+        with self._lock:
+            if len(lat_cells) * len(lon_cells) <= len(self._cells):
+                candidates = (self._cells.get((lat_cell, lon_cell)) for lat_cell in lat_cells for lon_cell in lon_cells)
+            else:
+                # A wide radius covers more grid squares than there are clinics; walk the occupied ones
+                candidates = (
+                    members for (lat_cell, lon_cell), members in self._cells.items()
+                    if lat_cell in lat_cells and lon_cell in lon_cells
+                )
+            for members in candidates:
+                for entry in (members or {}).values():
+                    distance = haversine_km(latitude, longitude, entry['latitude'], entry['longitude'])
+                    if distance <= radius_km:
+                        found.append((distance, entry))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def nearest(self, latitude, longitude, k, max_radius_km=None):
+        """The `k` nearest clinics, optionally no further than `max_radius_km`."""
+        limit = max_radius_km if max_radius_km is not None else math.pi * EARTH_RADIUS_KM
+        # Widen the search until it holds k clinics; everything outside the radius is further away
+        radius = min(limit, 5.0)
+        while True:
+            found = self.within(latitude, longitude, radius)
+            if len(found) >= k or radius >= limit:
+                return found[:k]
+            radius = min(limit, radius * 4)
+
+    def all(self):
+        self._refresh()
+        with self._lock:
+            return [entry for _, entry in self._entries.values()]
+
+
+def init_clinic_index(app):
+    app.extensions['clinic_index'] = ClinicIndex(
+        cell_degrees=app.config['CLINIC_INDEX_CELL_DEGREES'],
+        sync_seconds=app.config['CLINIC_INDEX_SYNC_SECONDS'],
+    )
+
+
+def get_clinic_index():
+    return current_app.extensions['clinic_index']
+
+
+def set_clinic_location(vet, name, address, latitude, longitude):
+    """Store a vet's clinic location in the caller's transaction. The caller commits."""
+    vet.clinic_name = name
+    vet.clinic = address
+    vet.latitude = latitude
+    vet.longitude = longitude
+    vet.location_updated_at = datetime.utcnow()
+    db.session.add(vet)
@@ -0,0 +1,119 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip only without it
+    brotli = None
+
+# Response compression negotiated from Accept-Encoding. Brotli is preferred when
+# the client takes it and the package is installed, gzip otherwise. Buffered
+# bodies under COMPRESS_MIN_SIZE are sent as they are; streamed bodies (the
+# /api/events stream) are compressed chunk by chunk and flushed after every
+# chunk so nothing is held back waiting for more data.
+
+
+class _GzipStream:
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def _stream_for(encoding, config):
+    if encoding == 'br':
+        return _BrotliStream(config['COMPRESS_BROTLI_QUALITY'])
+    return _GzipStream(config['COMPRESS_LEVEL'])
+
+
+def choose_encoding(accept_encodings):
+    """The best encoding the client accepts, or None for identity."""
+    candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_quality = None, 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_body(data, encoding, config):
+    stream = _stream_for(encoding, config)
+    return stream.compress(data) + stream.finish()
+
+
+def _compress_chunks(chunks, stream):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = stream.compress(chunk) + stream.flush()
+            if data:
+                yield data
+        yield stream.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def init_compression(app):
+    mimetypes = set(app.config['COMPRESS_MIMETYPES'])
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in mimetypes
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+        ):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            if not app.config['COMPRESS_STREAMS']:
+                return response
+            response.response = _compress_chunks(response.response, _stream_for(encoding, app.config))
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < app.config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(compress_body(data, encoding, app.config))
+
+        response.headers['Content-Encoding'] = encoding
+        # The compressed bytes differ from the identity ones, so the validator becomes weak
+        etag, is_weak = response.get_etag()
+        if etag and not is_weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,64 @@
+import hashlib
+from datetime import timezone
+
+from flask import current_app, request
+from sqlalchemy import func
+
+# Conditional GETs for the owner screens the app reloads on every visit. The
+# validator comes from one aggregate over the rows behind the response, the row
+# count plus the newest updated_at, so checking it never builds the body. A
+# delete changes the count, an insert or update moves max(updated_at).
+
+
+def collection_version(query, *updated_at_columns):
+    """(count, newest updated_at of each column) over the rows matched by `query`.
+
+    Pass the updated_at of every joined table whose fields the response shows.
+    """
+    return tuple(
+        query.with_entities(func.count(), *(func.max(column) for column in updated_at_columns))
+        .order_by(None)
+        .one()
+    )
+
+
+def make_validators(*parts):
+    """A strong ETag for this URL and the given version parts, and a Last-Modified.
+
+    The query string is part of the tag, so each page or filter of a list has
+    its own. Any datetime among the parts is a candidate for Last-Modified.
+    """
+    digest = hashlib.sha1(request.full_path.encode('utf-8'))
+    for part in parts:
+        digest.update(b'|' + repr(part).encode('utf-8'))
+    etag = digest.hexdigest()[:32]
+
+    timestamps = [part for part in parts if hasattr(part, 'tzinfo')]
+    last_modified = max(timestamps).replace(tzinfo=timezone.utc, microsecond=0) if timestamps else None
+    return etag, last_modified
+
+
+def is_fresh(etag, last_modified):
+    """True when the client's cached copy (If-None-Match / If-Modified-Since) is current."""
+    if request.if_none_match:
+        # Weak comparison: a compressed response carries the same tag marked W/
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def not_modified(etag, last_modified):
+    response = current_app.response_class(status=304)
+    return with_validators(response, etag, last_modified)
+
+
+def with_validators(response, etag, last_modified):
+    response = current_app.make_response(response)
+    if response.status_code in (200, 304):
+        response.set_etag(etag)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        # The app must revalidate, but may keep the copy to get 304s
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long requests wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        event.listen(self, 'checkout', self._on_checkout)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        # Fires once per checkout handed to the caller, whatever _do_get did to get there
+        with self._stats_lock:
+            self._checkouts += 1
+
+    def connect(self):
+        # Timed around the whole checkout; _do_get recurses after an overflow or a failed connect
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except Exception:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+
+    def wait_stats(self):
+        with self._stats_lock:
+            return {
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'total_wait_ms': round(self._total_wait * 1000, 3),
+                'avg_wait_ms': round(self._total_wait * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+            }
+
+
+def engine_options(database_uri, options):
+    """Engine options for a database URI: the bounded, instrumented pool for a server database.
+
+    SQLite keeps the pool SQLAlchemy picks for it. A QueuePool would give each
+    connection its own empty database on sqlite:// and :memory: URLs.
+    """
+    if make_url(database_uri).get_backend_name() == 'sqlite':
+        return {}
+    return dict(options, poolclass=InstrumentedQueuePool)
+
+
+def pool_stats(engine):
+    """Snapshot of the engine's pool, used to size workers."""
+    pool = engine.pool
+    stats = {'pool_class': type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        })
+
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(pool.wait_stats())
+
+    return stats
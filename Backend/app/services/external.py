@@ -0,0 +1,501 @@
+import asyncio
+import hashlib
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+
+# Clients for the external services the app talks to. Routes and job handlers
+# go through get_firebase() / get_cloudinary() instead of the SDK modules, so
+# FIREBASE_CLIENT=fake and CLOUDINARY_CLIENT=fake run everything offline with
+# in-memory stand-ins that behave like the real services. Creating a client is
+# free: the SDKs are imported and set up on the first call, in the process that
+# makes it, so nothing is initialized before a pre-fork server forks.
+#
+# Every client is wrapped in a GuardedClient. Its calls run on a small thread
+# pool of the service's own: the caller waits at most <SERVICE>_TIMEOUT_SECONDS,
+# at most <SERVICE>_MAX_CONCURRENCY calls are in flight per process, and a
+# circuit breaker stops calling a service that keeps failing. A slow Firebase
+# then holds a few threads of its own instead of every request thread, and only
+# the endpoints that use it answer 503 until it recovers.
+
+
+class ExternalServiceError(Exception):
+    """A call to an external service failed in a way worth retrying."""
+
+
+class PermanentServiceError(ExternalServiceError):
+    """A call that will fail the same way however often it is retried."""
+
+
+class ServiceUnavailable(ExternalServiceError):
+    """The service was not called, its circuit is open or all its slots are busy."""
+
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ServiceTimeout(ServiceUnavailable):
+    """The service did not answer within its timeout."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` failures in a row and rejects calls for
+    `reset_seconds`. After that one trial call goes through: success closes the
+    circuit, failure opens it for another `reset_seconds`.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if now - self.opened_at >= self.reset_seconds else 'open'
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow(self):
+        """True when a call may go ahead."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def retry_after(self):
+        """Seconds until the circuit lets a trial call through."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+class GuardedClient:
+    """Runs the public methods of `client` with a timeout, a concurrency limit
+    and a circuit breaker. Other attributes are passed through.
+
+    A call that overruns its timeout keeps its slot until it really returns, so
+    a hung service holds at most `max_concurrency` pool threads and later
+    callers are turned away at once rather than piling up behind it. Callers
+    wait up to `queue_seconds` for a free slot.
+
+    `await client.aio.method(...)` makes the same call from asyncio code
+    without blocking the event loop; it never waits for a slot.
+    """
+
+    def __init__(self, name, client, timeout, max_concurrency, breaker, queue_seconds=0.0):
+        self.name = name
+        self.client = client
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.breaker = breaker
+        self.queue_seconds = queue_seconds
+        self.aio = _AsyncCalls(self)
+        self.counts = {'calls': 0, 'failures': 0, 'timeouts': 0, 'rejected': 0}
+        self.in_flight = 0
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        return call
+
+    def _pool(self):
+        # Threads do not survive fork(), so every worker process starts its own pool
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix=self.name)
+                self._executor_pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(self.max_concurrency)
+                self.in_flight = 0
+            return self._executor, self._slots
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self.counts[name] += delta
+
+    def _submit(self, method, args, kwargs, wait):
+        executor, slots = self._pool()
+        if wait and self.queue_seconds > 0:
+            acquired = slots.acquire(timeout=self.queue_seconds)
+        else:
+            acquired = slots.acquire(blocking=False)
+        if not acquired:
+            self._count('rejected')
+            raise ServiceUnavailable(f"{self.name} is busy, all {self.max_concurrency} slots are in use")
+        if not self.breaker.allow():
+            slots.release()
+            self._count('rejected')
+            raise ServiceUnavailable(f"{self.name} is unavailable after repeated failures", self.breaker.retry_after())
+
+        with self._lock:
+            self.counts['calls'] += 1
+            self.in_flight += 1
+
+        def finished(future):
+            with self._lock:
+                self.in_flight -= 1
+            slots.release()
+
+        future = executor.submit(getattr(self.client, method), *args, **kwargs)
+        future.add_done_callback(finished)
+        return future
+
+    def _record(self, error):
+        # Permanent errors and bugs on our side are answers too, only outages count
+        if isinstance(error, ExternalServiceError) and not isinstance(error, PermanentServiceError):
+            self._count('timeouts' if isinstance(error, ServiceTimeout) else 'failures')
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _timed_out(self, method):
+        error = ServiceTimeout(f"{self.name}.{method} did not answer within {self.timeout:g} s")
+        self._record(error)
+        return error
+
+    def call(self, method, *args, **kwargs):
+        future = self._submit(method, args, kwargs, wait=True)
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise self._timed_out(method) from None
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    async def call_async(self, method, *args, **kwargs):
+        future = self._submit(method, args, kwargs, wait=False)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out(method) from None
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record(None)
+        return result
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts, in_flight=self.in_flight)
+        return dict(
+            counts,
+            state=self.breaker.state,
+            max_concurrency=self.max_concurrency,
+            timeout_seconds=self.timeout
+        )
+
+
+class _AsyncCalls:
+    def __init__(self, guarded):
+        self._guarded = guarded
+
+    def __getattr__(self, name):
+        getattr(self._guarded.client, name)  # AttributeError for unknown methods
+
+        async def call(*args, **kwargs):
+            return await self._guarded.call_async(name, *args, **kwargs)
+        return call
+
+
+class FirebaseAuthClient:
+    """Firebase Authentication through the Admin SDK.
+
+    New users are written with their bcrypt hash (import_users), so the plain
+    text password never has to be kept around for a background job.
+    """
+
+    def __init__(self, credentials_path=None, timeout=None):
+        self.credentials_path = credentials_path
+        self.timeout = timeout
+
+    def _auth(self):
+        import firebase_admin
+        from firebase_admin import auth, credentials
+
+        try:
+            firebase_admin.get_app()
+        except ValueError:
+            # Not initialized in this process yet (job workers, CLI)
+            certificate = credentials.Certificate(self.credentials_path) if self.credentials_path else None
+            # The SDK's own HTTP timeout, so a pool thread is not held past the caller's
+            firebase_admin.initialize_app(certificate, {'httpTimeout': self.timeout} if self.timeout else None)
+        return auth
+
+    def sync_user(self, email, display_name, password_hash, set_password=False):
+        """Create the Firebase user for `email`, or bring an existing one up to date. Returns its uid.
+
+        An existing user gets the new display name, and the password hash only
+        when `set_password` (a password reset). import_users replaces a user
+        wholesale, so for an existing user every other field is carried over.
+        """
+        if not password_hash.startswith(('$2a$', '$2b$', '$2y$')):
+            raise PermanentServiceError("Only bcrypt password hashes can be imported into Firebase")
+
+        auth = self._auth()
+        try:
+            user = auth.get_user_by_email(email)
+        except auth.UserNotFoundError:
+            user = None
+        except Exception as e:
+            raise ExternalServiceError(str(e)) from e
+
+        if user is not None and not set_password:
+            try:
+                if user.display_name != display_name:
+                    auth.update_user(user.uid, display_name=display_name)
+            except Exception as e:
+                raise ExternalServiceError(str(e)) from e
+            return user.uid
+
+        if user is None:
+            record = auth.ImportUserRecord(
+                uid=secrets.token_hex(14), email=email, display_name=display_name,
+                password_hash=password_hash.encode('utf-8')
+            )
+        else:
+            record = auth.ImportUserRecord(
+                uid=user.uid, email=user.email, email_verified=user.email_verified, display_name=display_name,
+                phone_number=user.phone_number, photo_url=user.photo_url, disabled=user.disabled,
+                user_metadata=auth.UserMetadata(
+                    user.user_metadata.creation_timestamp, user.user_metadata.last_sign_in_timestamp
+                ),
+                provider_data=[
+                    auth.UserProvider(
+                        uid=provider.uid, provider_id=provider.provider_id, email=provider.email,
+                        display_name=provider.display_name, photo_url=provider.photo_url
+                    )
+                    for provider in user.provider_data
+                    if provider.provider_id not in ('password', 'phone')  # Set from the fields above
+                ],
+                custom_claims=user.custom_claims, password_hash=password_hash.encode('utf-8')
+            )
+        try:
+            result = auth.import_users([record], hash_alg=auth.UserImportHash.bcrypt())
+        except Exception as e:
+            raise ExternalServiceError(str(e)) from e
+        if result.failure_count:
+            raise PermanentServiceError(result.errors[0].reason)
+        return record.uid
+
+    def generate_password_reset_link(self, email):
+        auth = self._auth()
+        try:
+            return auth.generate_password_reset_link(email)
+        except auth.UserNotFoundError as e:
+            raise PermanentServiceError(str(e)) from e
+        except Exception as e:
+            raise ExternalServiceError(str(e)) from e
+
+
+class FaultInjection:
+    """Failures and latency on demand for the fake clients.
+
+    `fail_next(n)` makes the next n calls raise ExternalServiceError and
+    `set_latency(seconds)` makes every call take that long, like a slow service.
+    """
+
+    def __init__(self, latency=0.0):
+        self.calls = []
+        self.latency = latency
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    def fail_next(self, count=1):
+        with self._lock:
+            self._failures = count
+
+    def set_latency(self, seconds):
+        self.latency = seconds
+
+    def _call(self, name, *args):
+        with self._lock:
+            self.calls.append((name,) + args)
+            failing = self._failures > 0
+            if failing:
+                self._failures -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            raise ExternalServiceError(f"Injected failure in {name}")
+
+
+class FakeFirebaseAuthClient(FaultInjection):
+    """In-memory Firebase for tests and offline development."""
+
+    def __init__(self, credentials_path=None, timeout=None):
+        super().__init__()
+        self.users = {}  # email -> {'uid', 'display_name', 'password_hash'}
+        self.reset_links = []
+
+    def sync_user(self, email, display_name, password_hash, set_password=False):
+        self._call('sync_user', email)
+        with self._lock:
+            user = self.users.get(email)
+            if user is None:
+                user = self.users[email] = {'uid': secrets.token_hex(14), 'password_hash': password_hash}
+            elif set_password:
+                user['password_hash'] = password_hash
+            user['display_name'] = display_name
+            return user['uid']
+
+    def generate_password_reset_link(self, email):
+        self._call('generate_password_reset_link', email)
+        with self._lock:
+            if email not in self.users:
+                raise PermanentServiceError(f"No user record found for {email}")
+            link = f"https://example.invalid/reset?oob={secrets.token_urlsafe(16)}"
+            self.reset_links.append((email, link))
+            return link
+
+
+class CloudinaryClient:
+    """Uploads through the Cloudinary SDK, imported and configured on the first upload."""
+
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None, timeout=None):
+        self.credentials = {'cloud_name': cloud_name, 'api_key': api_key, 'api_secret': api_secret}
+        self.timeout = timeout
+        self._configured = False
+
+    def _uploader(self):
+        import cloudinary
+        import cloudinary.uploader
+
+        if not self._configured:
+            # Unset values are left to the SDK, which reads CLOUDINARY_URL
+            cloudinary.config(**{name: value for name, value in self.credentials.items() if value})
+            settings = cloudinary.config()
+            if not (settings.cloud_name and settings.api_key and settings.api_secret):
+                raise PermanentServiceError(
+                    "Cloudinary is not configured, set CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY and "
+                    "CLOUDINARY_API_SECRET (or CLOUDINARY_URL)"
+                )
+            self._configured = True
+        return cloudinary.uploader
+
+    def upload(self, file, **options):
+        uploader = self._uploader()
+        if self.timeout:
+            options.setdefault('timeout', self.timeout)
+        try:
+            return uploader.upload(file, **options)
+        except Exception as e:
+            raise ExternalServiceError(str(e)) from e
+
+
+class FakeCloudinaryClient(FaultInjection):
+    """Keeps uploads in memory and answers with a stable URL per content."""
+
+    def __init__(self, cloud_name=None, api_key=None, api_secret=None, timeout=None):
+        super().__init__()
+        self.uploads = {}  # public_id -> bytes
+
+    def upload(self, file, **options):
+        data = file.read() if hasattr(file, 'read') else file
+        public_id = options.get('public_id') or hashlib.sha1(data).hexdigest()
+        self._call('upload', public_id)
+        with self._lock:
+            self.uploads[public_id] = data
+        return {
+            'public_id': public_id,
+            'bytes': len(data),
+            'secure_url': f"https://res.cloudinary.invalid/fake/{public_id}",
+        }
+
+
+FIREBASE_CLIENTS = {
+    'firebase': FirebaseAuthClient,
+    'fake': FakeFirebaseAuthClient,
+}
+
+CLOUDINARY_CLIENTS = {
+    'cloudinary': CloudinaryClient,
+    'fake': FakeCloudinaryClient,
+}
+
+
+def init_external_clients(app):
+    firebase = app.config['FIREBASE_CLIENT']
+    cloudinary = app.config['CLOUDINARY_CLIENT']
+    if firebase not in FIREBASE_CLIENTS:
+        raise ValueError(f"Unknown FIREBASE_CLIENT {firebase!r}, expected one of {', '.join(FIREBASE_CLIENTS)}")
+    if cloudinary not in CLOUDINARY_CLIENTS:
+        raise ValueError(f"Unknown CLOUDINARY_CLIENT {cloudinary!r}, expected one of {', '.join(CLOUDINARY_CLIENTS)}")
+
+    app.extensions['firebase'] = _guarded(app, 'firebase', FIREBASE_CLIENTS[firebase](
+        app.config['FIREBASE_CREDENTIALS'], timeout=app.config['FIREBASE_TIMEOUT_SECONDS']
+    ))
+    app.extensions['cloudinary'] = _guarded(app, 'cloudinary', CLOUDINARY_CLIENTS[cloudinary](
+        app.config['CLOUDINARY_CLOUD_NAME'], app.config['CLOUDINARY_API_KEY'], app.config['CLOUDINARY_API_SECRET'],
+        timeout=app.config['CLOUDINARY_TIMEOUT_SECONDS']
+    ))
+
+
+def _guarded(app, name, client):
+    if isinstance(client, FaultInjection):
+        client.set_latency(app.config['FAKE_SERVICE_LATENCY_SECONDS'])
+
+    prefix = name.upper()
+    return GuardedClient(
+        name,
+        client,
+        timeout=app.config[f'{prefix}_TIMEOUT_SECONDS'],
+        max_concurrency=app.config[f'{prefix}_MAX_CONCURRENCY'],
+        breaker=CircuitBreaker(
+            failure_threshold=app.config['EXTERNAL_BREAKER_FAILURES'],
+            reset_seconds=app.config['EXTERNAL_BREAKER_RESET_SECONDS']
+        ),
+        queue_seconds=app.config['EXTERNAL_QUEUE_SECONDS']
+    )
+
+
+def get_firebase():
+    return current_app.extensions['firebase']
+
+
+def get_cloudinary():
+    return current_app.extensions['cloudinary']
+
+
+def service_stats():
+    """Per-worker state of each external service: circuit, calls in flight, failures."""
+    return {name: current_app.extensions[name].stats() for name in ('firebase', 'cloudinary')}
@@ -0,0 +1,208 @@
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import HelpDeskComment, HelpDeskLike, HelpDeskPost
+from app.services.accounts import ROLE_MODELS
+from app.services.pagination import keyset_page
+
+FEED_COLUMNS = [HelpDeskPost.timestamp, HelpDeskPost.id]
+COMMENT_COLUMNS = [HelpDeskComment.id]
+
+
+def _user_names(users):
+    """{(user_type, user_id): name} for a set of authors, one query per role."""
+    names = {}
+    by_role = {}
+    for user_type, user_id in users:
+        by_role.setdefault(user_type, set()).add(user_id)
+
+    for user_type, user_ids in by_role.items():
+        model = ROLE_MODELS.get(user_type)
+        if model is None:
+            continue
+        for user_id, name in db.session.query(model.id, model.name).filter(model.id.in_(user_ids)):
+            names[(user_type, user_id)] = name
+    return names
+
+
+def comment_to_dict(comment, names):
+    return {
+        'id': str(comment.id),
+        'user_id': str(comment.user_id),
+        'user_type': comment.user_type,
+        'user_name': names.get((comment.user_type, comment.user_id), 'Unknown'),
+        'comment': comment.comment,
+        'timestamp': comment.timestamp,
+    }
+
+
+def _latest_comments(post_ids, per_post):
+    """The newest `per_post` comments of every post in one query, grouped by post."""
+    if not post_ids or per_post <= 0:
+        return {}
+
+    ranked = (
+        select(
+            HelpDeskComment.id,
+            func.row_number().over(
+                partition_by=HelpDeskComment.post_id,
+                order_by=HelpDeskComment.id.desc()
+            ).label('position')
+        )
+        .where(HelpDeskComment.post_id.in_(post_ids))
+        .subquery()
+    )
+    comments = (
+        HelpDeskComment.query
+        .join(ranked, ranked.c.id == HelpDeskComment.id)
+        .filter(ranked.c.position <= per_post)
+        .order_by(HelpDeskComment.post_id, HelpDeskComment.id)
+        .all()
+    )
+
+    grouped = {}
+    for comment in comments:
+        grouped.setdefault(comment.post_id, []).append(comment)
+    return grouped
+
+
+def get_feed(animal_type=None, limit=None, after=None):
+    """One page of posts, newest first, each with its latest comments.
+
+    Returns (items, next_key). The whole page costs three queries whatever its
+    size: the posts, the comment previews and the author names.
+    """
+    query = HelpDeskPost.query
+    if animal_type:
+        query = query.filter(HelpDeskPost.animal_type == animal_type)
+    posts, next_key = keyset_page(query, FEED_COLUMNS, limit, after, descending=True)
+
+    previews = _latest_comments([post.id for post in posts], current_app.config['HELPDESK_COMMENT_PREVIEW'])
+    authors = {(post.user_type, post.user_id) for post in posts}
+    authors.update((c.user_type, c.user_id) for comments in previews.values() for c in comments)
+    names = _user_names(authors)
+
+    items = [{
+        'id': str(post.id),
+        'user_id': str(post.user_id),
+        'user_type': post.user_type,
+        'user_name': names.get((post.user_type, post.user_id), 'Unknown'),
+        'title': post.title,
+        'content': post.content,
+        'animal_type': post.animal_type,
+        'image_url': post.image_url,
+        'timestamp': post.timestamp,
+        'likes': post.likes or 0,
+        'comment_count': post.comment_count,
+        'comments': [comment_to_dict(comment, names) for comment in previews.get(post.id, [])],
+    } for post in posts]
+
+    return items, next_key
+
+
+def get_comments(post_id, limit=None, after=None):
+    """One page of a post's comments, oldest first. Returns (items, next_key)."""
+    comments, next_key = keyset_page(
+        HelpDeskComment.query.filter_by(post_id=post_id), COMMENT_COLUMNS, limit, after
+    )
+    names = _user_names({(c.user_type, c.user_id) for c in comments})
+    return [comment_to_dict(comment, names) for comment in comments], next_key
+
+
+def create_post(user_type, user_id, title, content, animal_type, image_url=None):
+    post = HelpDeskPost(
+        user_id=user_id,
+        user_type=user_type,
+        title=title,
+        content=content,
+        animal_type=animal_type,
+        image_url=image_url,
+        likes=0,
+        comment_count=0
+    )
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+def add_comment(post_id, user_type, user_id, text):
+    """Store a comment and bump the post's comment_count in the same transaction.
+
+    Returns the comment, or None when the post does not exist.
+    """
+    updated = (
+        HelpDeskPost.query
+        .filter_by(id=post_id)
+        .update({'comment_count': HelpDeskPost.comment_count + 1}, synchronize_session=False)
+    )
+    if not updated:
+        db.session.rollback()
+        return None
+
+    comment = HelpDeskComment(post_id=post_id, user_id=user_id, user_type=user_type, comment=text)
+    db.session.add(comment)
+    db.session.commit()
+    return comment
+
+
+def _post_likes(post_id):
+    return db.session.query(HelpDeskPost.likes).filter_by(id=post_id).scalar()
+
+
+def like_post(post_id, user_type, user_id):
+    """Like a post once per user. Returns the new like count, or None when the post does not exist."""
+    if db.session.get(HelpDeskPost, post_id) is None:
+        return None
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(HelpDeskLike(post_id=post_id, user_type=user_type, user_id=user_id))
+    except IntegrityError:
+        # Already liked
+        return _post_likes(post_id)
+
+    HelpDeskPost.query.filter_by(id=post_id).update(
+        {'likes': func.coalesce(HelpDeskPost.likes, 0) + 1}, synchronize_session=False
+    )
+    db.session.commit()
+    return _post_likes(post_id)
+
+
+def unlike_post(post_id, user_type, user_id):
+    """Remove a user's like. Returns the new like count, or None when the post does not exist."""
+    removed = (
+        HelpDeskLike.query
+        .filter_by(post_id=post_id, user_type=user_type, user_id=user_id)
+        .delete(synchronize_session=False)
+    )
+    if removed:
+        HelpDeskPost.query.filter_by(id=post_id).update(
+            {'likes': HelpDeskPost.likes - removed}, synchronize_session=False
+        )
+    db.session.commit()
+    return _post_likes(post_id)
+
+
+def rebuild_post_counts():
+    """Recompute comment_count and likes on every post. Returns the number of posts."""
+    comment_counts = (
+        select(func.count(HelpDeskComment.id))
+        .where(HelpDeskComment.post_id == HelpDeskPost.id)
+        .scalar_subquery()
+    )
+    like_counts = (
+        select(func.count(HelpDeskLike.id))
+        .where(HelpDeskLike.post_id == HelpDeskPost.id)
+        .scalar_subquery()
+    )
+    try:
+        updated = HelpDeskPost.query.update(
+            {'comment_count': comment_counts, 'likes': like_counts}, synchronize_session=False
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return updated
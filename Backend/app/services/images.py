@@ -0,0 +1,223 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+from flask import current_app, send_from_directory
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import ImageAsset
+from app.services.external import get_cloudinary
+
+# Upload ingest for animal photos and vet profile pictures.
+#
+# The upload is streamed in chunks into a spooled temp file (memory first, disk
+# past 1 MB) while it is hashed, so a large photo is never held as one bytes
+# object. A content hash that was seen before answers with the stored URLs at
+# once: no decoding, no resizing, no network. New content is decoded once
+# (JPEGs at reduced size when only smaller outputs are needed), turned upright
+# from its EXIF orientation, converted to IMAGE_FORMAT and written as a capped
+# full-size image plus the fixed IMAGE_THUMBNAIL_SIZES. Object keys derive from
+# the hash, so a repeated write after a race overwrites identical bytes.
+# Pillow is imported on the first new image, not at startup.
+#
+# List endpoints show thumbnails through thumbnail_urls(), one query per page.
+
+CHUNK_SIZE = 64 * 1024
+FULL_SIZE = 'full'
+
+
+class ImageRejected(ValueError):
+    """The upload is not an image we accept (too large, not decodable)."""
+
+
+class LocalImageStorage:
+    """Files under IMAGE_STORAGE_PATH, served by the app at IMAGE_BASE_URL."""
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def put(self, key, data, content_type):
+        path = os.path.join(self.root, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a reader never sees half a file
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as handle:
+            handle.write(data)
+        os.replace(handle.name, path)
+        return f"{self.base_url}/{key}"
+
+
+class CloudinaryImageStorage:
+    """Objects in Cloudinary, keyed by public_id."""
+
+    def put(self, key, data, content_type):
+        public_id = key.rsplit('.', 1)[0]  # Cloudinary adds the extension itself
+        result = get_cloudinary().upload(
+            io.BytesIO(data), public_id=public_id, overwrite=True, resource_type='image'
+        )
+        return result['secure_url']
+
+
+STORAGES = {
+    'cloudinary': CloudinaryImageStorage,
+    'local': LocalImageStorage,
+}
+
+
+def init_images(app):
+    backend = app.config['IMAGE_STORAGE']
+    if backend not in STORAGES:
+        raise ValueError(f"Unknown IMAGE_STORAGE {backend!r}, expected one of {', '.join(STORAGES)}")
+
+    if backend == 'local':
+        root = app.config['IMAGE_STORAGE_PATH']
+        storage = LocalImageStorage(root, app.config['IMAGE_BASE_URL'])
+        app.add_url_rule(
+            f"{storage.base_url}/<path:key>", 'media',
+            lambda key: send_from_directory(root, key, max_age=31536000)  # Keys are content hashes
+        )
+    else:
+        storage = STORAGES[backend]()
+    app.extensions['image_storage'] = storage
+
+
+def get_image_storage():
+    return current_app.extensions['image_storage']
+
+
+def _spool(stream, max_bytes):
+    """Copy a stream into a temp file while hashing it. Returns (file, sha256 hex, size)."""
+    digest = hashlib.sha256()
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            spooled.close()
+            raise ImageRejected(f"Images are limited to {max_bytes // (1024 * 1024)} MB")
+        digest.update(chunk)
+        spooled.write(chunk)
+    if not size:
+        spooled.close()
+        raise ImageRejected("The upload is empty")
+    spooled.seek(0)
+    return spooled, digest.hexdigest(), size
+
+
+def _open_upright(file, largest_output):
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(file)
+    except Image.DecompressionBombError as e:
+        raise ImageRejected("The image has too many pixels") from e
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImageRejected("Not a supported image") from e
+
+    # Only the header has been read so far, the pixels are decoded by load()
+    width, height = image.size
+    if width * height > current_app.config['IMAGE_MAX_PIXELS']:
+        raise ImageRejected("The image has too many pixels")
+
+    try:
+        # JPEG can decode straight to a smaller scale, far cheaper than decoding and resizing
+        image.draft('RGB', (largest_output, largest_output))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImageRejected("Not a supported image") from e
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _encode(image, size, image_format, quality):
+    from PIL import Image
+
+    resized = image.copy()
+    resized.thumbnail((size, size), Image.LANCZOS)
+    if image_format == 'JPEG' and resized.mode == 'RGBA':
+        background = Image.new('RGB', resized.size, (255, 255, 255))
+        background.paste(resized, mask=resized.getchannel('A'))
+        resized = background
+
+    output = io.BytesIO()
+    resized.save(output, image_format, quality=quality, optimize=True)
+    return output.getvalue(), resized.size
+
+
+def asset_to_dict(asset, deduplicated=False):
+    variants = json.loads(asset.variants)
+    return {
+        'image_url': asset.url,
+        'thumbnails': {name: url for name, url in variants.items() if name != FULL_SIZE},
+        'width': asset.width,
+        'height': asset.height,
+        'deduplicated': deduplicated,
+    }
+
+
+def ingest(stream):
+    """Store an uploaded image and its thumbnails. Returns (asset, deduplicated).
+
+    `stream` is any file-like object with read(). Raises ImageRejected.
+    """
+    config = current_app.config
+    spooled, content_hash, size = _spool(stream, config['IMAGE_MAX_UPLOAD_BYTES'])
+    try:
+        existing = ImageAsset.query.filter_by(content_hash=content_hash).first()
+        if existing is not None:
+            return existing, True
+
+        sizes = dict(config['IMAGE_THUMBNAIL_SIZES'], **{FULL_SIZE: config['IMAGE_MAX_DIMENSION']})
+        image = _open_upright(spooled, max(sizes.values()))
+    finally:
+        spooled.close()
+
+    image_format = config['IMAGE_FORMAT']
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    storage = get_image_storage()
+
+    variants, dimensions = {}, None
+    for name, max_size in sizes.items():
+        data, encoded_size = _encode(image, max_size, image_format, config['IMAGE_QUALITY'])
+        key = f"images/{content_hash[:2]}/{content_hash}/{name}.{extension}"
+        variants[name] = storage.put(key, data, f"image/{extension}")
+        if name == FULL_SIZE:
+            dimensions = encoded_size
+
+    asset = ImageAsset(
+        content_hash=content_hash,
+        url=variants[FULL_SIZE],
+        variants=json.dumps(variants),
+        width=dimensions[0],
+        height=dimensions[1],
+        upload_bytes=size
+    )
+    try:
+        db.session.add(asset)
+        db.session.commit()
+    except IntegrityError:
+        # The same image was ingested concurrently; its keys hold the same bytes
+        db.session.rollback()
+        return ImageAsset.query.filter_by(content_hash=content_hash).first(), True
+    return asset, False
+
+
+def thumbnail_urls(urls, size='small'):
+    """{image url: thumbnail url} for the ingested images among `urls`, one query.
+
+    Images stored before ingest existed have no thumbnails and are left out;
+    callers fall back to the image itself.
+    """
+    urls = {url for url in urls if url}
+    if not urls:
+        return {}
+    rows = db.session.query(ImageAsset.url, ImageAsset.variants).filter(ImageAsset.url.in_(urls))
+    return {url: json.loads(variants).get(size, url) for url, variants in rows}
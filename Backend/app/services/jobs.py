@@ -0,0 +1,297 @@
+import json
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import DeadLetterJob, Job
+from app.services.external import PermanentServiceError
+
+# Durable background jobs for side effects that should not hold up a request
+# (Firebase account sync, password reset links).
+#
+# enqueue() adds a row to the job table inside the caller's transaction, so a
+# job exists exactly when the change that needs it was committed, and the
+# request returns as soon as that commit succeeds. Workers (`flask run-jobs`)
+# claim due jobs with a conditional UPDATE, which works the same on SQLite and
+# MySQL without row locks: of two workers racing for a job only one sees its
+# UPDATE match. A claim is a lease; a job whose worker died is picked up again
+# once JOB_LEASE_SECONDS have passed.
+#
+# A failed job is retried with exponential backoff and jitter up to
+# max_attempts, then moved to the dead_letter_job table. A handler raises
+# PermanentJobError (or PermanentServiceError) to skip the remaining retries.
+#
+# Jobs with the same idempotency key are only queued once while the first one
+# is still in the table (done jobs are purged after JOB_RETENTION_HOURS), and
+# handlers are written so running one twice does no harm.
+
+TASKS = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help."""
+
+
+def task(name):
+    """Register a handler, called with the job's payload inside an app context.
+
+    The worker commits the handler's database changes together with marking
+    the job done.
+    """
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(task_name, payload, idempotency_key=None, delay_seconds=0, max_attempts=None):
+    """Queue a job as part of the caller's transaction. The caller commits.
+
+    Returns the new job, or the queued job with the same idempotency key.
+    """
+    if task_name not in TASKS:
+        raise ValueError(f"Unknown task {task_name!r}")
+
+    job = Job(
+        task=task_name,
+        payload=json.dumps(payload),
+        idempotency_key=idempotency_key,
+        status='pending',
+        attempts=0,
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=datetime.utcnow() + timedelta(seconds=delay_seconds)
+    )
+    if idempotency_key is None:
+        db.session.add(job)
+        return job
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        return Job.query.filter_by(idempotency_key=idempotency_key).first()
+    return job
+
+
+def backoff_seconds(attempts, config):
+    """Delay before retry number `attempts`: base * 2^(attempts - 1), capped, with +-20% jitter."""
+    delay = min(config['JOB_BACKOFF_SECONDS'] * 2 ** (attempts - 1), config['JOB_BACKOFF_MAX_SECONDS'])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claimable(now):
+    return or_(
+        and_(Job.status == 'pending', Job.run_at <= now),
+        and_(Job.status == 'running', Job.locked_until < now)
+    )
+
+
+class Worker:
+    """Claims and runs due jobs. One per process; `flask run-jobs` starts them."""
+
+    def __init__(self, app, name=None):
+        self.app = app
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def claim(self, limit):
+        """Lease up to `limit` due jobs to this worker."""
+        now = datetime.utcnow()
+        lease = now + timedelta(seconds=self.app.config['JOB_LEASE_SECONDS'])
+        candidates = (
+            db.session.query(Job.id)
+            .filter(_claimable(now))
+            .order_by(Job.run_at, Job.id)
+            .limit(limit)
+            .all()
+        )
+
+        claimed = []
+        for (job_id,) in candidates:
+            won = (
+                Job.query
+                .filter(Job.id == job_id, _claimable(now))
+                .update({
+                    'status': 'running',
+                    'locked_by': self.name,
+                    'locked_until': lease,
+                    'attempts': Job.attempts + 1,
+                }, synchronize_session=False)
+            )
+            db.session.commit()
+            if won:
+                claimed.append(job_id)
+        return claimed
+
+    def execute(self, job_id):
+        """Run one claimed job and record the outcome. Returns 'done', 'retry' or 'dead'."""
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return 'done'
+        handler = TASKS.get(job.task)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for {job.task!r}")
+            handler(json.loads(job.payload))
+            job.status = 'done'
+            job.finished_at = datetime.utcnow()
+            job.locked_by = job.locked_until = None
+            db.session.commit()
+            return 'done'
+        except Exception as e:
+            db.session.rollback()
+            error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+            permanent = isinstance(e, (PermanentJobError, PermanentServiceError))
+            return self._failed(job_id, error, permanent)
+
+    def _failed(self, job_id, error, permanent):
+        job = db.session.get(Job, job_id)
+        if permanent or job.attempts >= job.max_attempts:
+            db.session.add(DeadLetterJob(
+                task=job.task,
+                payload=job.payload,
+                idempotency_key=job.idempotency_key,
+                attempts=job.attempts,
+                last_error=error,
+                created_at=job.created_at
+            ))
+            db.session.delete(job)
+            db.session.commit()
+            self.app.logger.warning(
+                "Job %s (%s) moved to the dead letter table after %s attempt(s)", job_id, job.task, job.attempts
+            )
+            return 'dead'
+
+        job.status = 'pending'
+        job.last_error = error
+        job.locked_by = job.locked_until = None
+        job.run_at = datetime.utcnow() + timedelta(seconds=backoff_seconds(job.attempts, self.app.config))
+        db.session.commit()
+        return 'retry'
+
+    def run_once(self):
+        """Claim one batch and run it. Returns the number of jobs run."""
+        with self.app.app_context():
+            job_ids = self.claim(self.app.config['JOB_BATCH_SIZE'])
+            for job_id in job_ids:
+                if self.stopping.is_set():
+                    # Hand the rest back instead of waiting for their lease to run out
+                    Job.query.filter(Job.id == job_id, Job.locked_by == self.name).update(
+                        {'status': 'pending', 'attempts': Job.attempts - 1, 'locked_by': None, 'locked_until': None},
+                        synchronize_session=False
+                    )
+                    db.session.commit()
+                    continue
+                self.execute(job_id)
+            db.session.remove()
+            return len(job_ids)
+
+    def run(self, burst=False):
+        """Poll for jobs until stopped, or until the queue has nothing due when `burst`."""
+        poll = self.app.config['JOB_POLL_SECONDS']
+        while not self.stopping.is_set():
+            if self.run_once():
+                continue
+            if burst:
+                break
+            self.stopping.wait(poll)
+
+    def stop(self, *args):
+        self.stopping.set()
+
+
+def _worker_process(burst):
+    from app import create_app
+
+    app = create_app()
+    worker = Worker(app)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    app.logger.info("Job worker %s started", worker.name)
+    worker.run(burst=burst)
+
+
+def run_workers(processes, burst=False):
+    """Run `processes` worker processes, each with its own app and connection pool."""
+    import multiprocessing
+
+    # Spawned, not forked: this process has already built an app and may run threads
+    # (connection pools, external-call executors) whose locks a forked child would inherit
+    context = multiprocessing.get_context('spawn')
+    children = [context.Process(target=_worker_process, args=(burst,), daemon=False) for _ in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+
+
+def queue_stats():
+    """Job counts by status, due jobs and the dead letter count."""
+    now = datetime.utcnow()
+    counts = dict(db.session.query(Job.status, func.count()).group_by(Job.status).all())
+    return {
+        'pending': counts.get('pending', 0),
+        'running': counts.get('running', 0),
+        'done': counts.get('done', 0),
+        'due': db.session.query(func.count()).select_from(Job).filter(_claimable(now)).scalar(),
+        'dead': db.session.query(func.count()).select_from(DeadLetterJob).scalar(),
+    }
+
+
+def purge_finished(older_than_hours):
+    """Delete done jobs finished more than `older_than_hours` ago. Returns the count."""
+    cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+    removed = Job.query.filter(Job.status == 'done', Job.finished_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def requeue_dead(task_name=None):
+    """Move dead letter jobs back onto the queue with fresh attempts. Returns the count."""
+    query = DeadLetterJob.query
+    if task_name:
+        query = query.filter_by(task=task_name)
+
+    requeued = 0
+    try:
+        for dead in query.all():
+            if dead.idempotency_key and Job.query.filter_by(idempotency_key=dead.idempotency_key).count():
+                # A newer job with the same key is queued already
+                db.session.delete(dead)
+                continue
+            db.session.add(Job(
+                task=dead.task,
+                payload=dead.payload,
+                idempotency_key=dead.idempotency_key,
+                status='pending',
+                attempts=0,
+                max_attempts=current_app.config['JOB_MAX_ATTEMPTS'],
+                run_at=datetime.utcnow()
+            ))
+            db.session.delete(dead)
+            requeued += 1
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return requeued
+
+
+def init_jobs(app):
+    # Registers the handlers
+    from app.services import tasks  # noqa: F401
@@ -0,0 +1,90 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+
+import pytz
+from flask.json.provider import JSONProvider
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library with the same output
+    orjson = None
+
+# The one place datetimes are turned into JSON. Naive datetimes from the
+# database are UTC (every model default is utcnow) and go out as ISO 8601 in
+# JSON_TIMEZONE with an explicit offset and whole seconds, e.g.
+# 2025-05-09T13:37:25+03:00. Dates are YYYY-MM-DD, Decimals are strings so no
+# precision is lost, and SQLAlchemy rows become objects keyed by column label,
+# so routes can hand query results and datetime objects straight to jsonify.
+
+
+@lru_cache(maxsize=4096)
+def _zone_offset(timezone, utc_hour):
+    # Zone offsets only change on the hour, so one lookup serves every timestamp in that hour
+    offset = pytz.utc.localize(utc_hour).astimezone(timezone).utcoffset()
+    minutes = int(offset.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return offset, f"{sign}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}"
+
+
+class OrjsonProvider(JSONProvider):
+
+    mimetype = 'application/json'
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.timezone = pytz.timezone(app.config['JSON_TIMEZONE'])
+        self._utc = self.timezone.zone == 'UTC'
+
+        if orjson is not None:
+            self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_OMIT_MICROSECONDS
+            if self._utc:
+                # orjson formats naive datetimes as UTC itself, without calling back into Python
+                self._options |= orjson.OPT_NAIVE_UTC
+            else:
+                self._options |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _format_datetime(self, value):
+        if value.tzinfo is not None:
+            value = value.astimezone(pytz.utc).replace(tzinfo=None)
+        offset, suffix = _zone_offset(self.timezone, value.replace(minute=0, second=0, microsecond=0))
+        return (value + offset).isoformat(timespec='seconds') + suffix
+
+    def _default(self, value):
+        if isinstance(value, datetime):
+            return self._format_datetime(value)
+        if isinstance(value, (date, time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, Row):
+            return dict(value._mapping)
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        if hasattr(value, '__html__'):
+            return str(value.__html__())
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            return orjson.dumps(obj, default=self._default, option=self._options)
+        return json.dumps(obj, default=self._default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # sort_keys, indent and the like are honoured by the standard library path
+            kwargs.setdefault('default', self._default)
+            kwargs.setdefault('ensure_ascii', False)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
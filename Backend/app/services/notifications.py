@@ -0,0 +1,188 @@
+from sqlalchemy import case, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Account, Notification, NotificationCounter
+from app.services.pagination import keyset_page
+from app.services.realtime import publish
+
+# Feed order: unread first, newest first within each group. This is the order of
+# ix_notification_user_read_timestamp, so every page is an index range seek.
+FEED_COLUMNS = [Notification.is_read, Notification.timestamp, Notification.id]
+FEED_DESCENDING = [False, True, True]
+
+
+def notification_to_dict(notification):
+    return {
+        'id': str(notification.id),
+        'user_id': str(notification.user_id),
+        'user_type': notification.user_type,
+        'title': notification.title,
+        'body': notification.body,
+        'type': notification.type,
+        'related_id': notification.related_id,
+        'timestamp': notification.timestamp,
+        'is_read': bool(notification.is_read),
+    }
+
+
+def _counter(user_type, user_id):
+    return NotificationCounter.query.filter_by(user_type=user_type, user_id=user_id)
+
+
+def _adjust_unread(user_type, user_id, delta):
+    # Single UPDATE ... SET unread_count = unread_count + delta so concurrent writers never lose a change
+    if delta < 0:
+        value = case((NotificationCounter.unread_count > -delta, NotificationCounter.unread_count + delta), else_=0)
+    else:
+        value = NotificationCounter.unread_count + delta
+    updated = _counter(user_type, user_id).update({'unread_count': value}, synchronize_session=False)
+    if updated or delta < 0:
+        return
+
+    # First notification for this recipient
+    try:
+        with db.session.begin_nested():
+            db.session.add(NotificationCounter(user_type=user_type, user_id=user_id, unread_count=delta))
+    except IntegrityError:
+        # Another request created the row in the meantime
+        _counter(user_type, user_id).update({'unread_count': value}, synchronize_session=False)
+
+
+def notify(user_type, user_id, title, body, type, related_id=None):
+    """Add a notification as part of the caller's transaction. The caller commits.
+
+    Bumps the recipient's unread counter and pushes the notification to their
+    open /api/events streams once committed.
+    """
+    notification = Notification(
+        user_id=user_id,
+        user_type=user_type,
+        title=title,
+        body=body,
+        type=type,
+        related_id=str(related_id) if related_id is not None else None,
+        is_read=False
+    )
+    db.session.add(notification)
+    _adjust_unread(user_type, user_id, 1)
+
+    db.session.flush()  # Assigns id and timestamp for the pushed event
+    account_id = db.session.execute(
+        select(Account.id).where(Account.role == user_type, Account.user_id == user_id)
+    ).scalar()
+    if account_id is not None:
+        publish(account_id, 'notification', notification_to_dict(notification))
+
+    return notification
+
+
+def notify_many(notifications):
+    """Add many notifications as part of the caller's transaction. The caller commits.
+
+    `notifications` is a list of dicts with notify()'s arguments. The rows go in
+    with one flush (a single batched INSERT where the database can return the
+    new keys), each recipient's counter is bumped once by their total, and the
+    accounts to push to are looked up in one query per role.
+    """
+    if not notifications:
+        return []
+
+    created = [Notification(**dict(
+        n,
+        related_id=str(n['related_id']) if n.get('related_id') is not None else None,
+        is_read=False
+    )) for n in notifications]
+    db.session.add_all(created)
+    db.session.flush()  # Assigns ids and timestamps for the pushed events
+
+    totals = {}
+    for notification in created:
+        key = (notification.user_type, notification.user_id)
+        totals[key] = totals.get(key, 0) + 1
+    for (user_type, user_id), count in totals.items():
+        _adjust_unread(user_type, user_id, count)
+
+    by_role = {}
+    for user_type, user_id in totals:
+        by_role.setdefault(user_type, set()).add(user_id)
+    accounts = {}
+    for user_type, user_ids in by_role.items():
+        for account_id, user_id in db.session.execute(
+            select(Account.id, Account.user_id).where(Account.role == user_type, Account.user_id.in_(user_ids))
+        ):
+            accounts[(user_type, user_id)] = account_id
+
+    for notification in created:
+        account_id = accounts.get((notification.user_type, notification.user_id))
+        if account_id is not None:
+            publish(account_id, 'notification', notification_to_dict(notification))
+
+    return created
+
+
+def get_feed(user_type, user_id, limit=None, after=None):
+    """One page of a recipient's notifications. Returns (notifications, next_key)."""
+    query = Notification.query.filter_by(user_type=user_type, user_id=user_id)
+    return keyset_page(query, FEED_COLUMNS, limit, after, descending=FEED_DESCENDING)
+
+
+def unread_count(user_type, user_id):
+    """The badge count, read from the counter row rather than counted."""
+    count = (
+        db.session.query(NotificationCounter.unread_count)
+        .filter_by(user_type=user_type, user_id=user_id)
+        .scalar()
+    )
+    return count or 0
+
+
+def mark_read(user_type, user_id, notification_id=None, up_to_id=None):
+    """Mark one notification, every notification up to an ID, or all of them as read.
+
+    Each form is a single UPDATE over the recipient's unread rows; the number of
+    rows it flipped is taken off the counter in the same transaction. Returns
+    that number.
+    """
+    query = Notification.query.filter(
+        Notification.user_type == user_type,
+        Notification.user_id == user_id,
+        Notification.is_read.is_(False)
+    )
+    if notification_id is not None:
+        query = query.filter(Notification.id == notification_id)
+    if up_to_id is not None:
+        query = query.filter(Notification.id <= up_to_id)
+
+    try:
+        marked = query.update({'is_read': True}, synchronize_session=False)
+        if marked:
+            _adjust_unread(user_type, user_id, -marked)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return marked
+
+
+def rebuild_unread_counters():
+    """Recompute every recipient's unread counter from the notification table."""
+    try:
+        NotificationCounter.query.delete(synchronize_session=False)
+        rows = (
+            db.session.query(Notification.user_type, Notification.user_id, db.func.count(Notification.id))
+            .filter(Notification.is_read.is_(False))
+            .group_by(Notification.user_type, Notification.user_id)
+            .all()
+        )
+        db.session.add_all([
+            NotificationCounter(user_type=user_type, user_id=user_id, unread_count=count)
+            for user_type, user_id, count in rows
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(rows)
@@ -0,0 +1,116 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from flask import current_app, jsonify, request
+from sqlalchemy import and_, literal, or_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value):
+    """Opaque, URL-safe cursor for any JSON-serializable value (dates become ISO strings)."""
+    raw = json.dumps(value, separators=(',', ':'), default=lambda v: v.isoformat())
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, ValueError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def page_params():
+    """Read `limit` and `cursor` from the query string.
+
+    Returns (None, None) when the client asked for neither, so existing callers
+    keep getting the full list. Otherwise the limit defaults to DEFAULT_PAGE_SIZE
+    and is capped at MAX_PAGE_SIZE.
+    """
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+
+    if limit is None and not cursor:
+        return None, None
+
+    if limit is None or limit < 1:
+        limit = current_app.config['DEFAULT_PAGE_SIZE']
+    limit = min(limit, current_app.config['MAX_PAGE_SIZE'])
+
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def _coerce(column, value):
+    # Turn the ISO strings stored in the cursor back into the column's type
+    python_type = getattr(column.expression.type, 'python_type', None)
+    if value is None or python_type is None:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is bool:
+        # SQLAlchemy refuses `column > False`, a bound literal compares like any other value
+        return literal(bool(value), column.expression.type)
+    return value
+
+
+def keyset_page(query, columns, limit, after=None, descending=False, key=None):
+    """Fetch one page of `query` ordered by `columns`, starting after the key `after`.
+
+    `columns` must end in a unique column (usually the primary key) so the order is
+    total. Instead of OFFSET the page start is a WHERE on the ordering key, which an
+    index on `columns` turns into a range seek: every page costs the same.
+    `descending` is one flag for every column or a list with one flag per column.
+
+    Returns (rows, next_key) where next_key is None on the last page. With no
+    limit the whole ordered result is returned.
+    """
+    if isinstance(descending, bool):
+        descending = [descending] * len(columns)
+    ordering = [column.desc() if desc else column.asc() for column, desc in zip(columns, descending)]
+    if limit is None:
+        return query.order_by(*ordering).all(), None
+
+    if after is not None:
+        if not isinstance(after, list) or len(after) != len(columns):
+            raise InvalidCursor('Invalid cursor')
+        try:
+            values = [_coerce(column, value) for column, value in zip(columns, after)]
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+
+        # (a, b, c) > (x, y, z) spelled out so every database can use the index
+        conditions = []
+        for i, column in enumerate(columns):
+            equal = [columns[j] == values[j] for j in range(i)]
+            beyond = column < values[i] if descending[i] else column > values[i]
+            conditions.append(and_(*equal, beyond))
+        query = query.filter(or_(*conditions))
+
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if key is None:
+        key = lambda row: [getattr(row, column.key) for column in columns]
+    return rows, list(key(rows[-1]))
+
+
+def paginated_list(items, next_key):
+    """jsonify a list response, passing the next cursor in the X-Next-Cursor header.
+
+    List-shaped bodies are kept as-is so existing clients are unaffected.
+    """
+    response = jsonify(items)
+    if next_key is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor(next_key)
+        response.headers['Access-Control-Expose-Headers'] = 'X-Next-Cursor'
+    return response
@@ -0,0 +1,111 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+from flask import current_app
+from werkzeug.security import check_password_hash
+
+# Hashing and verifying are pure CPU work that holds the GIL for the whole call,
+# so they run in a small process pool and the request thread only waits on the
+# result. Set PASSWORD_HASH_WORKERS = 0 to hash inline (tests, scripts).
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _bcrypt_hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _verify(password, stored_hash):
+    if _is_bcrypt(stored_hash):
+        try:
+            return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
+        except ValueError:
+            return False
+    # Older accounts were hashed with werkzeug's generate_password_hash
+    return check_password_hash(stored_hash, password)
+
+
+def _is_bcrypt(stored_hash):
+    return stored_hash.startswith(('$2a$', '$2b$', '$2y$'))
+
+
+def _get_executor():
+    global _executor, _executor_pid
+
+    workers = current_app.config['PASSWORD_HASH_WORKERS']
+    if workers <= 0:
+        return None
+
+    # A pool inherited through fork() is unusable, so every worker process builds its own.
+    # Hash workers are spawned, not forked: this process already runs threads (connection
+    # pools, external-call executors, the realtime poller) and a lock one of them holds at
+    # fork time would stay locked in the child for good. They only need bcrypt.
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run(func, *args):
+    executor = _get_executor()
+    if executor is None:
+        return func(*args)
+    return executor.submit(func, *args).result()
+
+
+def hash_password(password, rounds=None):
+    """Hash a password with bcrypt at the configured work factor."""
+    if rounds is None:
+        rounds = current_app.config['PASSWORD_HASH_ROUNDS']
+    return _run(_bcrypt_hash, password, rounds)
+
+
+def verify_password(password, stored_hash):
+    """Check a password against a bcrypt or legacy werkzeug hash."""
+    if not password or not stored_hash:
+        return False
+    return _run(_verify, password, stored_hash)
+
+
+def needs_rehash(stored_hash):
+    """True when the hash uses an old scheme or a different bcrypt cost than configured."""
+    if not _is_bcrypt(stored_hash):
+        return True
+    try:
+        rounds = int(stored_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != current_app.config['PASSWORD_HASH_ROUNDS']
+
+
+def upgrade_hash_if_needed(user, password):
+    """Re-hash a just-verified password when its stored hash is out of date.
+
+    Only the plaintext from a successful login can do this, so it happens
+    transparently on the next sign-in after the policy changes.
+    """
+    if not needs_rehash(user.password):
+        return False
+    user.password = hash_password(password)
+    return True
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+atexit.register(shutdown)
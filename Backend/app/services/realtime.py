@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from app import db
+from app.models import RealtimeEvent
+
+# Server push for chat and notification events.
+#
+# Events are rows in realtime_event, written in the same transaction as the
+# change they describe, so every worker process sees them and a reconnecting
+# client can resume from its Last-Event-ID. Each worker runs one poller thread
+# that reads new rows by primary key and hands them to the connections it holds;
+# connections never query the database themselves while idle. IDs are assigned
+# at insert but become visible at commit, so a row can show up after a higher
+# one; IDs skipped by the poller are re-checked for a short grace window. Each connection
+# only owns a bounded deque and an Event, so an idle connection costs a few KB
+# (run gunicorn with a gevent worker to avoid a thread per connection).
+
+
+def publish(account_id, event_type, payload):
+    """Queue an event for an account as part of the caller's transaction."""
+    event = RealtimeEvent(account_id=account_id, event_type=event_type, payload=current_app.json.dumps(payload))
+    db.session.add(event)
+    return event
+
+
+def replay(account_id, after_id, limit):
+    """Stored events for an account after `after_id`, oldest first."""
+    return (
+        RealtimeEvent.query
+        .filter(RealtimeEvent.account_id == account_id, RealtimeEvent.id > after_id)
+        .order_by(RealtimeEvent.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def format_event(event_id, event_type, data):
+    """One server-sent event frame. `data` is already JSON text."""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+class Subscriber:
+    __slots__ = ('account_id', 'buffer', 'overflowed', 'wakeup')
+
+    def __init__(self, account_id, buffer_size):
+        self.account_id = account_id
+        self.buffer = deque(maxlen=buffer_size)
+        self.overflowed = False
+        self.wakeup = threading.Event()
+
+    def push(self, event_id, event_type, data):
+        if len(self.buffer) == self.buffer.maxlen:
+            # A stalled client loses the oldest events and is told to resync
+            self.overflowed = True
+        self.buffer.append((event_id, event_type, data))
+        self.wakeup.set()
+
+    def drain(self):
+        # Cleared first: an event pushed while draining sets it again, so the
+        # next wait() returns at once instead of leaving the event stranded
+        self.wakeup.clear()
+        events = []
+        while self.buffer:
+            events.append(self.buffer.popleft())
+        overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+
+class EventBroker:
+
+    def __init__(self, app, poll_seconds=0.5, buffer_size=256, retention=timedelta(hours=24),
+                 gap_seconds=10.0, max_gaps=1000):
+        self.app = app
+        self.poll_seconds = poll_seconds
+        self.buffer_size = buffer_size
+        self.retention = retention
+        self.gap_seconds = gap_seconds
+        self.max_gaps = max_gaps
+
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._last_id = 0
+        self._gaps = {}  # ID skipped by the poller -> monotonic deadline for it to commit
+        self._next_purge = 0.0
+
+    def subscribe(self, account_id):
+        self._ensure_poller()
+        subscriber = Subscriber(account_id, self.buffer_size)
+        with self._lock:
+            self._subscribers.setdefault(account_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.account_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[subscriber.account_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _ensure_poller(self):
+        # Started on first use in each worker process, never inherited through fork
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            with self.app.app_context():
+                self._last_id = db.session.query(func.coalesce(func.max(RealtimeEvent.id), 0)).scalar()
+                db.session.remove()
+            self._thread = threading.Thread(target=self._poll_forever, name='realtime-poller', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _poll_forever(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Realtime poller error: {e}")
+            time.sleep(self.poll_seconds)
+
+    def poll_once(self):
+        """Fetch events newer than the last seen ID, or filling a gap, and dispatch them to local connections."""
+        now = time.monotonic()
+        self._gaps = {event_id: deadline for event_id, deadline in self._gaps.items() if deadline > now}
+        condition = RealtimeEvent.id > self._last_id
+        if self._gaps:
+            condition = or_(condition, RealtimeEvent.id.in_(list(self._gaps)))
+
+        with self.app.app_context():
+            try:
+                rows = (
+                    db.session.query(RealtimeEvent.id, RealtimeEvent.account_id,
+                                     RealtimeEvent.event_type, RealtimeEvent.payload)
+                    .filter(condition)
+                    .order_by(RealtimeEvent.id)
+                    .limit(1000)
+                    .all()
+                )
+                if now >= self._next_purge:
+                    self._next_purge = now + 300
+                    self.purge()
+            finally:
+                db.session.remove()
+
+        for row in rows:
+            if row.id <= self._last_id:
+                # A transaction that started before a later one committed after it
+                if self._gaps.pop(row.id, None) is None:
+                    continue
+            else:
+                # Skipped IDs may belong to transactions still in flight, or rolled back
+                for missing in range(max(self._last_id + 1, row.id - self.max_gaps), row.id):
+                    self._gaps[missing] = now + self.gap_seconds
+                self._last_id = row.id
+            with self._lock:
+                subscribers = list(self._subscribers.get(row.account_id, ()))
+            for subscriber in subscribers:
+                subscriber.push(row.id, row.event_type, row.payload)
+        if len(self._gaps) > self.max_gaps:
+            for event_id in sorted(self._gaps)[:len(self._gaps) - self.max_gaps]:
+                del self._gaps[event_id]
+        return len(rows)
+
+    def purge(self):
+        cutoff = datetime.utcnow() - self.retention
+        deleted = RealtimeEvent.query.filter(RealtimeEvent.created_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+def init_realtime(app):
+    app.extensions['realtime'] = EventBroker(
+        app,
+        poll_seconds=app.config['REALTIME_POLL_SECONDS'],
+        buffer_size=app.config['REALTIME_BUFFER_SIZE'],
+        retention=timedelta(hours=app.config['REALTIME_RETENTION_HOURS']),
+        gap_seconds=app.config['REALTIME_GAP_SECONDS'],
+    )
+
+
+def get_broker():
+    return current_app.extensions['realtime']
+
+
+def event_stream(broker, subscriber, backlog, heartbeat_seconds, resync=False):
+    """Generator of SSE frames for one connection: backlog first, then live events."""
+    try:
+        yield "retry: 3000\n\n"
+        if resync:
+            yield format_event(backlog[-1][0] if backlog else 0, 'resync', '{}')
+
+        last_sent = 0
+        sent = set()
+        for event_id, event_type, data in backlog:
+            yield format_event(event_id, event_type, data)
+            last_sent = event_id
+            sent.add(event_id)
+
+        while True:
+            if not subscriber.wakeup.wait(heartbeat_seconds):
+                yield ": keepalive\n\n"
+                continue
+
+            events, overflowed = subscriber.drain()
+            if overflowed:
+                yield format_event(last_sent, 'resync', '{}')
+            for event_id, event_type, data in events:
+                # Events already delivered from the backlog can come through the poller again,
+                # and a late commit can arrive with a lower ID than one already sent
+                if event_id in sent:
+                    continue
+                yield format_event(event_id, event_type, data)
+                last_sent = max(last_sent, event_id)
+    finally:
+        broker.unsubscribe(subscriber)
@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import event
+
+from app import db
+
+# Whole-response cache for the read-mostly vet directory endpoints.
+#
+# A cached response is keyed by the request path and query string plus the
+# current generation of each of its tags ('vets', 'vet:12'). Invalidating a tag
+# only bumps its generation, so every response built from older data stops
+# matching at once and simply ages out of the store. Writers queue the tags with
+# invalidate_on_commit() inside their transaction; the bump happens after the
+# commit so a concurrent reader cannot re-cache the old rows in between.
+#
+# The 'memory' backend is a per-process LRU: an invalidation reaches the worker
+# that made the write immediately and the others within RESPONSE_CACHE_TTL_SECONDS.
+# A shared backend only has to implement the same five methods.
+
+
+class MemoryCacheBackend:
+    """Process-local LRU with a TTL per entry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, tags):
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def size(self):
+        return len(self._entries)
+
+
+class NullCacheBackend:
+    """Caches nothing, for debugging and tests."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def generations(self, tags):
+        return [0] * len(tags)
+
+    def bump(self, tags):
+        pass
+
+    def size(self):
+        return 0
+
+
+BACKENDS = {
+    'memory': MemoryCacheBackend,
+    'null': NullCacheBackend,
+}
+
+
+class ResponseCache:
+
+    def __init__(self, backend, default_ttl=60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._stats = {}
+        self._invalidations = 0
+        self._lock = threading.Lock()
+
+    def _count(self, endpoint, outcome):
+        with self._lock:
+            counts = self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0, 'stores': 0})
+            counts[outcome] += 1
+
+    def invalidate(self, *tags):
+        self.backend.bump(tags)
+        with self._lock:
+            self._invalidations += len(tags)
+
+    def stats(self):
+        with self._lock:
+            endpoints = {endpoint: dict(counts) for endpoint, counts in self._stats.items()}
+            invalidations = self._invalidations
+        for counts in endpoints.values():
+            lookups = counts['hits'] + counts['misses']
+            counts['hit_ratio'] = round(counts['hits'] / lookups, 3) if lookups else 0.0
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': self.backend.size(),
+            'invalidations': invalidations,
+            'endpoints': endpoints,
+        }
+
+
+def init_response_cache(app):
+    backend = app.config['RESPONSE_CACHE_BACKEND']
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+    if backend == 'memory':
+        store = MemoryCacheBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+    else:
+        store = BACKENDS[backend]()
+    app.extensions['response_cache'] = ResponseCache(store, app.config['RESPONSE_CACHE_TTL_SECONDS'])
+
+
+def get_response_cache():
+    return current_app.extensions['response_cache']
+
+
+def cached(tags, ttl=None):
+    """Cache a view's successful responses under `tags`.
+
+    `tags` is a list of tag names or a function of the view's URL arguments
+    returning one. Only 200 responses are stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            view_tags = tags(**kwargs) if callable(tags) else tags
+            generations = cache.backend.generations(view_tags)
+            key = f"{request.path}?{request.query_string.decode('latin-1')}|{'.'.join(map(str, generations))}"
+
+            hit = cache.backend.get(key)
+            if hit is not None:
+                cache._count(request.endpoint, 'hits')
+                body, mimetype, headers = hit
+                response = current_app.response_class(body, status=200, mimetype=mimetype, headers=headers)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            cache._count(request.endpoint, 'misses')
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = [(name, value) for name, value in response.headers if name.lower().startswith(('x-', 'access-control-'))]
+                cache.backend.set(key, (response.get_data(), response.mimetype, headers), ttl or cache.default_ttl)
+                cache._count(request.endpoint, 'stores')
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_on_commit(*tags):
+    """Invalidate `tags` once the current transaction commits; dropped on rollback."""
+    db.session.info.setdefault('invalidate_tags', set()).update(tags)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    tags = session.info.pop('invalidate_tags', None)
+    if tags:
+        get_response_cache().invalidate(*tags)
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_on_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('invalidate_tags', None)
@@ -0,0 +1,339 @@
+import re
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+import pytz
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Appointment, AppointmentSlotClaim, Veterinarian, VetWorkingHours
+
+# Vet availability and double-booking protection.
+#
+# A vet's day is cut into GRID_MINUTES units. Every appointment claims the units
+# it covers in appointment_slot_claim, whose primary key (vet, date, minute) is
+# the conflict check: an overlapping booking fails on insert, atomically and
+# across workers, without reading anything first. Free slots for a range of days
+# come from one primary key range read of the claims; each candidate slot is then
+# checked with a binary search over that day's sorted claimed minutes, so the
+# cost depends on the days asked for, not on the vet's history.
+#
+# Working hours are per weekday, in minutes after midnight in APPOINTMENT_TIMEZONE.
+# Vets who have not set any can be booked at any time, still without overlaps.
+#
+# A missed appointment gives its time back; putting it back to another status
+# claims the time again, which fails if someone has booked it since.
+
+GRID_MINUTES = 5  # Changing this needs `flask rebuild-slot-claims`
+MINUTES_PER_DAY = 24 * 60
+MAX_SLOT_MINUTES = 8 * 60
+RELEASED_STATUSES = {'Missed'}  # Appointments in these statuses hold no claim
+
+_TIME_PATTERN = re.compile(r'^\s*(\d{1,2})[:.](\d{2})\s*([AaPp][Mm])?\s*$')
+
+
+class SlotError(ValueError):
+    """A time that cannot be booked (badly formed, outside working hours, in the past)."""
+
+
+class SlotConflict(Exception):
+    """The time overlaps another appointment of the same vet."""
+
+
+def parse_time(text):
+    """Minutes after midnight from "14:30", "9:05" or "2:30 PM"."""
+    match = _TIME_PATTERN.match(text or '')
+    if not match:
+        raise SlotError("Invalid time. Use HH:MM.")
+    hours, minutes, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if meridiem:
+        if not 1 <= hours <= 12:
+            raise SlotError("Invalid time. Use HH:MM.")
+        hours = hours % 12 + (12 if meridiem.lower() == 'pm' else 0)
+    if hours > 23 or minutes > 59:
+        raise SlotError("Invalid time. Use HH:MM.")
+    return hours * 60 + minutes
+
+
+def format_minute(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def local_now():
+    zone = pytz.timezone(current_app.config['APPOINTMENT_TIMEZONE'])
+    return datetime.now(zone).replace(tzinfo=None)
+
+
+def slot_minutes(vet):
+    return vet.slot_minutes or current_app.config['APPOINTMENT_SLOT_MINUTES']
+
+
+def working_hours(veterinarian_id):
+    """{weekday: [(start_minute, end_minute), ...]} sorted by start."""
+    hours = {}
+    rows = (
+        VetWorkingHours.query
+        .filter_by(veterinarian_id=veterinarian_id)
+        .order_by(VetWorkingHours.weekday, VetWorkingHours.start_minute)
+    )
+    for row in rows:
+        hours.setdefault(row.weekday, []).append((row.start_minute, row.end_minute))
+    return hours
+
+
+def working_hours_to_list(hours):
+    return [
+        {'weekday': weekday, 'start': format_minute(start), 'end': format_minute(end)}
+        for weekday, intervals in sorted(hours.items())
+        for start, end in intervals
+    ]
+
+
+def set_working_hours(vet, hours, minutes=None):
+    """Replace a vet's week with `hours`, a list of {weekday, start, end}. The caller commits.
+
+    Raises SlotError for malformed or overlapping intervals. Existing bookings
+    are kept even when they now fall outside the hours.
+    """
+    if minutes is not None:
+        try:
+            minutes = int(minutes)
+        except (TypeError, ValueError):
+            raise SlotError("slot_minutes must be a number")
+        if minutes % GRID_MINUTES or not GRID_MINUTES <= minutes <= MAX_SLOT_MINUTES:
+            raise SlotError(f"slot_minutes must be a multiple of {GRID_MINUTES} up to {MAX_SLOT_MINUTES}")
+
+    intervals = {}
+    for entry in hours:
+        try:
+            weekday = int(entry['weekday'])
+            start = parse_time(entry['start'])
+            end = MINUTES_PER_DAY if str(entry['end']).strip() == '24:00' else parse_time(entry['end'])
+        except (KeyError, TypeError, ValueError):
+            raise SlotError("Each entry needs weekday (0 = Monday), start and end (HH:MM)")
+        if not 0 <= weekday <= 6 or start >= end:
+            raise SlotError("Each entry needs a weekday from 0 to 6 and a start before its end")
+        if start % GRID_MINUTES or end % GRID_MINUTES:
+            raise SlotError(f"Working hours must be on a {GRID_MINUTES} minute boundary")
+        intervals.setdefault(weekday, []).append((start, end))
+
+    for weekday_intervals in intervals.values():
+        weekday_intervals.sort()
+        for (_, previous_end), (start, _) in zip(weekday_intervals, weekday_intervals[1:]):
+            if start < previous_end:
+                raise SlotError("Working hours on the same day overlap")
+
+    if minutes is not None:
+        vet.slot_minutes = minutes
+    VetWorkingHours.query.filter_by(veterinarian_id=vet.id).delete(synchronize_session=False)
+    db.session.add_all([
+        VetWorkingHours(veterinarian_id=vet.id, weekday=weekday, start_minute=start, end_minute=end)
+        for weekday, weekday_intervals in intervals.items()
+        for start, end in weekday_intervals
+    ])
+    return intervals
+
+
+def _claimed_minutes(veterinarian_id, first_day, last_day):
+    """{date: sorted claimed minutes} for a vet between two dates, inclusive."""
+    claimed = {}
+    rows = (
+        db.session.query(AppointmentSlotClaim.date, AppointmentSlotClaim.minute)
+        .filter(
+            AppointmentSlotClaim.veterinarian_id == veterinarian_id,
+            AppointmentSlotClaim.date >= first_day,
+            AppointmentSlotClaim.date <= last_day
+        )
+        .order_by(AppointmentSlotClaim.date, AppointmentSlotClaim.minute)
+    )
+    for day, minute in rows:
+        claimed.setdefault(day, []).append(minute)
+    return claimed
+
+
+def _is_free(claimed, start, end):
+    """True when no claimed minute (sorted) falls in [start, end)."""
+    i = bisect_left(claimed, start)
+    return i == len(claimed) or claimed[i] >= end
+
+
+def free_slots(vet, first_day, days):
+    """[(date, [start minute, ...]), ...] of the vet's bookable slots, one entry per day.
+
+    Slots are laid out from the start of each working interval; today's slots
+    that have already started are left out.
+    """
+    length = slot_minutes(vet)
+    hours = working_hours(vet.id)
+    last_day = first_day + timedelta(days=days - 1)
+    claimed = _claimed_minutes(vet.id, first_day, last_day)
+    now = local_now()
+    earliest = now.hour * 60 + now.minute
+
+    result = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        if day < now.date():
+            result.append((day, []))
+            continue
+        day_claimed = claimed.get(day, [])
+        starts = []
+        for interval_start, interval_end in hours.get(day.weekday(), []):
+            for start in range(interval_start, interval_end - length + 1, length):
+                if day == now.date() and start <= earliest:
+                    continue
+                if _is_free(day_claimed, start, start + length):
+                    starts.append(start)
+        result.append((day, starts))
+    return result
+
+
+def check_bookable(vet, day, start, length):
+    """Raise SlotError unless [start, start + length) on `day` is inside the vet's working hours."""
+    if start % GRID_MINUTES:
+        raise SlotError(f"Appointments start on a {GRID_MINUTES} minute boundary")
+    if start + length > MINUTES_PER_DAY:
+        raise SlotError("Appointment would run past midnight")
+
+    now = local_now()
+    if day < now.date() or (day == now.date() and start <= now.hour * 60 + now.minute):
+        raise SlotError("Cannot book a time in the past")
+
+    hours = working_hours(vet.id)
+    if hours and not any(
+        interval_start <= start and start + length <= interval_end
+        for interval_start, interval_end in hours.get(day.weekday(), [])
+    ):
+        raise SlotError("The vet is not available at that time")
+
+
+def claim(appointment, start, length):
+    """Claim the appointment's grid units in the caller's transaction. The caller commits.
+
+    Raises SlotConflict, with the savepoint rolled back, when any unit is taken.
+    """
+    first = start - start % GRID_MINUTES
+    rows = [
+        {
+            'veterinarian_id': appointment.veterinarian_id,
+            'date': appointment.date,
+            'minute': minute,
+            'appointment_id': appointment.id,
+        }
+        for minute in range(first, start + length, GRID_MINUTES)
+    ]
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(AppointmentSlotClaim), rows)
+    except IntegrityError:
+        raise SlotConflict("The vet is already booked at that time")
+
+
+def holds_claim(status):
+    return status not in RELEASED_STATUSES
+
+
+def release(appointment_ids):
+    """Give back the time claimed by these appointments. The caller commits."""
+    if appointment_ids:
+        (
+            AppointmentSlotClaim.query
+            .filter(AppointmentSlotClaim.appointment_id.in_(appointment_ids))
+            .delete(synchronize_session=False)
+        )
+
+
+def reclaim(appointment):
+    """Claim an appointment's current date and time again, dropping any claim it had. The caller commits.
+
+    Raises SlotConflict when the time has been booked by another appointment.
+    An appointment whose time cannot be parsed claims nothing, as in rebuild_slot_claims().
+    """
+    release([appointment.id])
+    try:
+        start = parse_time(appointment.time)
+    except SlotError:
+        return
+    length = (
+        appointment.duration_minutes
+        or db.session.get(Veterinarian, appointment.veterinarian_id).slot_minutes
+        or current_app.config['APPOINTMENT_SLOT_MINUTES']
+    )
+    claim(appointment, start, min(length, MINUTES_PER_DAY - start))
+
+
+def rebuild_slot_claims(vets_per_page=50):
+    """Recompute every claim from the appointment table.
+
+    Appointments are replayed in booking order per vet and day; one whose time
+    cannot be parsed, or that overlaps an earlier booking, claims nothing.
+    Vets are read a page at a time by primary key, and each page's appointments
+    are loaded in full before their claims are written.
+    Returns (appointments claimed, appointments skipped).
+    """
+    default_length = current_app.config['APPOINTMENT_SLOT_MINUTES']
+    claimed, skipped = 0, 0
+    last_vet_id = 0
+
+    try:
+        AppointmentSlotClaim.query.delete(synchronize_session=False)
+        while True:
+            vets = (
+                db.session.query(Veterinarian.id, Veterinarian.slot_minutes)
+                .filter(Veterinarian.id > last_vet_id)
+                .order_by(Veterinarian.id)
+                .limit(vets_per_page)
+                .all()
+            )
+            if not vets:
+                break
+            defaults = dict(vets)
+            last_vet_id = vets[-1].id
+
+            rows = (
+                db.session.query(
+                    Appointment.id, Appointment.veterinarian_id, Appointment.date,
+                    Appointment.time, Appointment.duration_minutes
+                )
+                .filter(Appointment.veterinarian_id.in_(defaults), Appointment.status.notin_(RELEASED_STATUSES))
+                .order_by(Appointment.veterinarian_id, Appointment.date, Appointment.created_at, Appointment.id)
+                .all()
+            )
+
+            taken, batch = set(), []
+            current_day = None
+            for row in rows:
+                if (row.veterinarian_id, row.date) != current_day:
+                    current_day, taken = (row.veterinarian_id, row.date), set()
+                try:
+                    start = parse_time(row.time)
+                except SlotError:
+                    skipped += 1
+                    continue
+                length = row.duration_minutes or defaults[row.veterinarian_id] or default_length
+                first = start - start % GRID_MINUTES
+                units = range(first, min(start + length, MINUTES_PER_DAY), GRID_MINUTES)
+                if taken.intersection(units):
+                    skipped += 1
+                    continue
+
+                taken.update(units)
+                batch.extend(
+                    {'veterinarian_id': row.veterinarian_id, 'date': row.date, 'minute': minute, 'appointment_id': row.id}
+                    for minute in units
+                )
+                claimed += 1
+                if len(batch) >= 5000:
+                    db.session.execute(insert(AppointmentSlotClaim), batch)
+                    batch = []
+
+            if batch:
+                db.session.execute(insert(AppointmentSlotClaim), batch)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return claimed, skipped
@@ -0,0 +1,53 @@
+import hashlib
+
+from app.services.accounts import ROLE_MODELS
+from app.services.external import get_firebase
+from app.services.jobs import enqueue, task
+
+# Job handlers for the external side effects of accounts, and the helpers that
+# queue them. Payloads carry IDs only; handlers read the current row when they
+# run, so a retry after a later change acts on the latest state.
+
+
+def _fingerprint(value):
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()[:16]
+
+
+def queue_firebase_sync(user, user_type, set_password=False):
+    """Queue creating or updating the user's Firebase account. The caller commits.
+
+    An existing Firebase user only gets the password when `set_password`.
+    Keyed by the password hash, so the same account state is only synced once
+    and a later password change queues a new sync.
+    """
+    return enqueue(
+        'firebase.sync_user',
+        {'user_type': user_type, 'user_id': user.id, 'set_password': set_password},
+        idempotency_key=f"firebase.sync_user:{user_type}:{user.id}:{_fingerprint(user.password)}"
+    )
+
+
+def queue_password_reset_link(email, reset_token):
+    """Queue the Firebase password reset link for an email. The caller commits."""
+    return enqueue(
+        'firebase.password_reset_link',
+        {'email': email},
+        idempotency_key=f"firebase.password_reset_link:{_fingerprint(reset_token)}"
+    )
+
+
+@task('firebase.sync_user')
+def sync_firebase_user(payload):
+    model = ROLE_MODELS.get(payload['user_type'])
+    user = model.query.get(payload['user_id']) if model else None
+    if user is None:
+        return  # Deleted since, nothing to sync
+
+    user.firebase_uid = get_firebase().sync_user(
+        user.email, user.name, user.password, set_password=payload.get('set_password', False)
+    )
+
+
+@task('firebase.password_reset_link')
+def send_password_reset_link(payload):
+    get_firebase().generate_password_reset_link(payload['email'])
@@ -0,0 +1,214 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import RevokedToken
+
+# Revoked JWTs live in a shared store (the database by default) so a logout on
+# one worker is seen by all of them. Each process keeps a Bloom filter of the
+# revoked JTIs in front of the store: a token that is not in the filter is
+# definitely not revoked and is accepted without a query, which is the answer
+# for almost every request. The filter is topped up from the store every
+# JWT_BLOCKLIST_SYNC_SECONDS and rebuilt from the live entries every
+# JWT_BLOCKLIST_REBUILD_SECONDS so expired tokens drop out of it.
+#
+# Top-ups resume from a cursor the store hands out. For the database store it is
+# the database's own clock, which also stamps revoked_at, so workers on hosts
+# whose clocks disagree still see every revocation.
+
+
+class BloomFilter:
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        # Kirsch-Mitzenmacher: k positions from two hashes
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class MemoryBlocklistStore:
+    """Process-local store. Only correct with a single worker process."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at, now):
+        with self._lock:
+            self._entries[jti] = (expires_at, now)
+
+    def contains(self, jti, now):
+        entry = self._entries.get(jti)
+        return entry is not None and entry[0] > now
+
+    def revoked_since(self, cursor, now):
+        """(live JTIs revoked at or after `cursor`, cursor for the next call)."""
+        with self._lock:
+            return [jti for jti, (expires_at, revoked_at) in self._entries.items()
+                    if revoked_at >= cursor and expires_at > now], now
+
+    def active(self, now):
+        return self.revoked_since(datetime.min, now)
+
+    def purge(self, now):
+        with self._lock:
+            expired = [jti for jti, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for jti in expired:
+                del self._entries[jti]
+        return len(expired)
+
+
+class DatabaseBlocklistStore:
+    """Store shared by every worker through the revoked_token table."""
+
+    # A revocation stamped just before a sync read the clock may commit just after
+    # it, so each sync looks back a little. Only commit latency, not clock skew.
+    COMMIT_OVERLAP = timedelta(seconds=5)
+
+    def _clock(self):
+        return db.session.query(func.now()).scalar()
+
+    def add(self, jti, expires_at, now):
+        if db.session.get(RevokedToken, jti) is None:
+            # Stamped by the database, the clock every worker's cursor comes from
+            db.session.add(RevokedToken(jti=jti, expires_at=expires_at, revoked_at=func.now()))
+            db.session.commit()
+
+    def contains(self, jti, now):
+        return (
+            db.session.query(RevokedToken.jti)
+            .filter(RevokedToken.jti == jti, RevokedToken.expires_at > now)
+            .first()
+        ) is not None
+
+    def revoked_since(self, cursor, now):
+        """(live JTIs revoked at or after `cursor` by the database clock, cursor for the next call)."""
+        clock = self._clock()
+        rows = (
+            db.session.query(RevokedToken.jti)
+            .filter(RevokedToken.revoked_at >= cursor - self.COMMIT_OVERLAP, RevokedToken.expires_at > now)
+            .all()
+        )
+        return [row.jti for row in rows], clock
+
+    def active(self, now):
+        clock = self._clock()
+        return [row.jti for row in db.session.query(RevokedToken.jti).filter(RevokedToken.expires_at > now)], clock
+
+    def purge(self, now):
+        deleted = RevokedToken.query.filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+
+class TokenBlocklist:
+
+    def __init__(self, store, capacity=100000, error_rate=0.001, sync_seconds=1.0,
+                 rebuild_seconds=3600.0, purge_seconds=300.0, default_ttl=timedelta(days=1)):
+        self.store = store
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.purge_seconds = purge_seconds
+        self.default_ttl = default_ttl
+
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._cursor = None  # Where the next sync resumes, in the store's own terms
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self._next_purge = 0.0
+
+    def _rebuild(self, now):
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        jtis, cursor = self.store.active(now)
+        for jti in jtis:
+            bloom.add(jti)
+        self._bloom = bloom
+        self._cursor = cursor
+        self._next_rebuild = time.monotonic() + self.rebuild_seconds
+
+    def _sync(self, now):
+        jtis, self._cursor = self.store.revoked_since(self._cursor, now)
+        for jti in jtis:
+            self._bloom.add(jti)
+
+    def _refresh(self, now):
+        clock = time.monotonic()
+        if self._bloom is not None and clock < self._next_sync:
+            return
+        with self._lock:
+            if self._bloom is None or clock >= self._next_rebuild:
+                self._rebuild(now)
+            elif clock >= self._next_sync:
+                self._sync(now)
+            self._next_sync = clock + self.sync_seconds
+
+    def is_revoked(self, jti):
+        now = datetime.utcnow()
+        self._refresh(now)
+        if jti not in self._bloom:
+            return False
+        # Possible hit (or a false positive): ask the shared store
+        return self.store.contains(jti, now)
+
+    def revoke(self, jti, expires_at=None):
+        """Revoke a token until its own expiry (the JWT `exp`)."""
+        now = datetime.utcnow()
+        self.store.add(jti, expires_at or now + self.default_ttl, now)
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_seconds
+            self.store.purge(now)
+
+    def purge(self):
+        """Drop expired entries from the store. Returns how many were removed."""
+        return self.store.purge(datetime.utcnow())
+
+
+STORES = {
+    'database': DatabaseBlocklistStore,
+    'memory': MemoryBlocklistStore,
+}
+
+
+def init_blocklist(app):
+    backend = app.config['JWT_BLOCKLIST_BACKEND']
+    if backend not in STORES:
+        raise ValueError(f"Unknown JWT_BLOCKLIST_BACKEND {backend!r}, expected one of {', '.join(STORES)}")
+
+    app.extensions['token_blocklist'] = TokenBlocklist(
+        STORES[backend](),
+        capacity=app.config['JWT_BLOCKLIST_BLOOM_CAPACITY'],
+        error_rate=app.config['JWT_BLOCKLIST_BLOOM_ERROR_RATE'],
+        sync_seconds=app.config['JWT_BLOCKLIST_SYNC_SECONDS'],
+        rebuild_seconds=app.config['JWT_BLOCKLIST_REBUILD_SECONDS'],
+    )
+
+
+def get_blocklist():
+    return current_app.extensions['token_blocklist']
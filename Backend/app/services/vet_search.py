@@ -0,0 +1,143 @@
+import re
+import unicodedata
+
+from sqlalchemy import case, delete, func, insert, literal, select, union_all
+
+from app import db
+from app.models import Veterinarian, VeterinarianStats, VetSearchTerm
+
+# Vet search runs on an inverted index (vet_search_term) instead of ILIKE '%q%',
+# which no B-tree index can serve. Every token of a vet's name, clinic and
+# specializations is one row keyed by the token, so both an exact token and a
+# prefix (autocomplete) are range seeks on the primary key. The rows of a vet
+# are rewritten whenever the vet is registered or edited.
+
+FIELD_WEIGHTS = {
+    'name': 3,
+    'specialization': 2,
+    'clinic': 1,
+}
+EXACT_BONUS = 2  # A whole-token match counts double a prefix match
+MAX_TERM_LENGTH = 50
+MAX_QUERY_TOKENS = 5
+MIN_PREFIX_LENGTH = 2  # A single letter only matches whole tokens, not every name starting with it
+STOPWORDS = {'dr', 'and', 'the', 'of'}  # On nearly every vet, they would only slow the match down
+
+_token_split = re.compile(r'[^a-z0-9]+')
+
+
+def tokenize(text):
+    """Lower-cased ASCII tokens of a string, accents folded, in order of appearance."""
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    return [
+        token[:MAX_TERM_LENGTH] for token in _token_split.split(folded)
+        if token and token not in STOPWORDS
+    ]
+
+
+def _terms(vet):
+    # {(term, field): weight}, a token appearing in several specializations is indexed once
+    terms = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(vet, field)):
+            terms[(token, field)] = weight
+    return terms
+
+
+def _rows(vet):
+    return [
+        {'term': term, 'veterinarian_id': vet.id, 'field': field, 'weight': weight}
+        for (term, field), weight in _terms(vet).items()
+    ]
+
+
+def index_vet(vet):
+    """(Re)index one vet in the caller's transaction. The caller commits."""
+    db.session.flush()  # Assigns vet.id for a new registration
+    db.session.execute(delete(VetSearchTerm).where(VetSearchTerm.veterinarian_id == vet.id))
+    rows = _rows(vet)
+    if rows:
+        db.session.execute(insert(VetSearchTerm), rows)
+
+
+def rebuild_search_index(batch_size=1000):
+    """Rebuild the whole index from the veterinarian table. Returns the number of vets indexed."""
+    indexed = 0
+    last_id = 0
+    columns = [Veterinarian.id, *(getattr(Veterinarian, field) for field in FIELD_WEIGHTS)]
+    try:
+        db.session.execute(delete(VetSearchTerm))
+        while True:
+            # Each page is read in full before writing, MySQL drivers cannot insert while a result is streaming
+            vets = db.session.execute(
+                select(*columns).where(Veterinarian.id > last_id).order_by(Veterinarian.id).limit(batch_size)
+            ).all()
+            if not vets:
+                break
+            rows = [row for vet in vets for row in _rows(vet)]
+            if rows:
+                db.session.execute(insert(VetSearchTerm), rows)
+            indexed += len(vets)
+            last_id = vets[-1].id
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return indexed
+
+
+def _prefix_range(token):
+    # Terms are [a-z0-9] only and at most MAX_TERM_LENGTH long, so every term starting
+    # with `token` sorts in [token, token + 'zzz...'] under any collation
+    return token, token.ljust(MAX_TERM_LENGTH, 'z')
+
+
+def _clause(position, token, field=None):
+    if len(token) >= MIN_PREFIX_LENGTH:
+        lower, upper = _prefix_range(token)
+    else:
+        lower = upper = token
+    score = func.max(VetSearchTerm.weight * case((VetSearchTerm.term == token, EXACT_BONUS), else_=1))
+    statement = (
+        select(VetSearchTerm.veterinarian_id, literal(position).label('clause'), score.label('score'))
+        .where(VetSearchTerm.term >= lower, VetSearchTerm.term <= upper)
+        .group_by(VetSearchTerm.veterinarian_id)
+    )
+    if field is not None:
+        statement = statement.where(VetSearchTerm.field == field)
+    return statement
+
+
+def search(query='', specialization='', limit=20):
+    """Rank vets whose tokens start with every token of `query` (and of `specialization`).
+
+    Returns a list of (vet, stats, score), best match first. Each token is one
+    index range seek; ties go to the vet with more reviews.
+    """
+    clauses = [(token, None) for token in tokenize(query)[:MAX_QUERY_TOKENS]]
+    clauses += [(token, 'specialization') for token in tokenize(specialization)[:MAX_QUERY_TOKENS]]
+    if not clauses:
+        return []
+
+    matches = union_all(*[_clause(i, token, field) for i, (token, field) in enumerate(clauses)]).subquery()
+    ranked = (
+        select(matches.c.veterinarian_id, func.sum(matches.c.score).label('score'))
+        .group_by(matches.c.veterinarian_id)
+        .having(func.count() == len(clauses))  # Every token matched
+        .subquery()
+    )
+
+    return (
+        db.session.query(Veterinarian, VeterinarianStats, ranked.c.score)
+        .join(ranked, ranked.c.veterinarian_id == Veterinarian.id)
+        .outerjoin(VeterinarianStats, VeterinarianStats.veterinarian_id == Veterinarian.id)
+        .order_by(
+            ranked.c.score.desc(),
+            func.coalesce(VeterinarianStats.review_count, 0).desc(),
+            Veterinarian.id
+        )
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,91 @@
+import math
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Review, VeterinarianStats
+from app.services.response_cache import invalidate_on_commit
+
+STAR_COLUMNS = {stars: f'rating_{stars}_count' for stars in range(1, 6)}
+
+
+def parse_rating(value):
+    """Validate a star rating from a request body, returning an int from 1 to 5 or None."""
+    if value is None or value == '':
+        return None
+    rating = float(value)
+    if not math.isfinite(rating):
+        raise ValueError('Rating must be a number')
+    rating = round(rating)
+    if not 1 <= rating <= 5:
+        raise ValueError('Rating must be between 1 and 5')
+    return rating
+
+
+def record_review(veterinarian_id, rating=None):
+    """Add one review to the vet's aggregates as part of the caller's transaction.
+
+    The counters are bumped with a single UPDATE ... SET x = x + 1 so concurrent
+    reviews never lose an increment. The caller commits.
+    """
+    invalidate_on_commit(f'vet:{veterinarian_id}')
+
+    increments = {'review_count': VeterinarianStats.review_count + 1}
+    if rating is not None:
+        increments['rating_count'] = VeterinarianStats.rating_count + 1
+        increments['rating_sum'] = VeterinarianStats.rating_sum + rating
+        column = STAR_COLUMNS[rating]
+        increments[column] = getattr(VeterinarianStats, column) + 1
+
+    updated = (
+        VeterinarianStats.query
+        .filter_by(veterinarian_id=veterinarian_id)
+        .update(increments, synchronize_session=False)
+    )
+    if updated:
+        return
+
+    # First review for this vet
+    stats = VeterinarianStats(
+        veterinarian_id=veterinarian_id,
+        review_count=1,
+        rating_count=1 if rating is not None else 0,
+        rating_sum=rating or 0,
+        **{column: 1 if stars == rating else 0 for stars, column in STAR_COLUMNS.items()}
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(stats)
+    except IntegrityError:
+        # Another request created the row in the meantime
+        VeterinarianStats.query.filter_by(veterinarian_id=veterinarian_id).update(
+            increments, synchronize_session=False
+        )
+
+
+def get_vet_stats(veterinarian_id):
+    return db.session.get(VeterinarianStats, veterinarian_id)
+
+
+def rebuild_vet_stats():
+    """Recompute every vet's aggregates from the review table. Returns the number of vets."""
+    aggregates = select(
+        Review.veterinarian_id,
+        func.count(Review.id),
+        func.count(Review.rating),
+        func.coalesce(func.sum(Review.rating), 0),
+        *[func.sum(case((Review.rating == stars, 1), else_=0)) for stars in STAR_COLUMNS]
+    ).group_by(Review.veterinarian_id)
+
+    columns = ['veterinarian_id', 'review_count', 'rating_count', 'rating_sum', *STAR_COLUMNS.values()]
+
+    try:
+        VeterinarianStats.query.delete(synchronize_session=False)
+        db.session.execute(insert(VeterinarianStats).from_select(columns, aggregates))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return db.session.query(func.count(VeterinarianStats.veterinarian_id)).scalar()
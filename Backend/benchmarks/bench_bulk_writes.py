@@ -0,0 +1,100 @@
+"""Throughput of the bulk write endpoints against the one-item-per-request ones.
+
+Seeds a throwaway SQLite database with an owner, a vet and appointments, then
+registers --items animals and sets --items appointment statuses, first with one
+request per item (/register_animal, /update_appointment_status) and then with
+one bulk request (/register_animals, /update_appointment_statuses). Reports
+the wall time and items per second for each.
+
+    cd Backend
+    python -m benchmarks.bench_bulk_writes --items 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Animal, AnimalOwner, Appointment, Veterinarian  # noqa: E402
+
+STATUSES = ['Upcoming', 'Completed', 'Missed']
+
+
+def seed(items):
+    owner = AnimalOwner(name='Bench Owner', email='owner@example.com', phone='0700000000', location='Nairobi', password='')
+    vet = Veterinarian(name='Dr. Bench', email='vet@example.com', password='', license_number='L1',
+                       national_id='N1', clinic='Clinic', specialization='cattle')
+    db.session.add_all([owner, vet])
+    db.session.flush()
+    animal = Animal(owner_id=owner.id, name='Daisy', breed='Friesian', gender='Female', color='Black',
+                    species='Cow', date_of_birth=date(2020, 1, 1))
+    db.session.add(animal)
+    db.session.flush()
+    db.session.execute(insert(Appointment), [{
+        'owner_id': owner.id, 'animal_id': animal.id, 'veterinarian_id': vet.id,
+        'date': date.today() + timedelta(days=n % 30), 'time': f"{9 + n % 8}:00",
+        'appointment_type': 'Herd check', 'status': 'Pending',
+    } for n in range(2 * items)])
+    db.session.commit()
+    return owner.id
+
+
+def animal(owner_id, n):
+    return {'owner_id': owner_id, 'name': f"Cow {n}", 'breed': 'Friesian', 'species': 'Cow',
+            'gender': 'Female', 'color': 'Black', 'date_of_birth': '2022-03-01'}
+
+
+def timed(label, items, call):
+    started = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<44}{elapsed:>10.2f}{items / elapsed:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    app.config['BULK_MAX_ITEMS'] = max(app.config['BULK_MAX_ITEMS'], args.items)
+    client = app.test_client()
+    items = args.items
+
+    def check(response):
+        assert response.status_code < 300, response.get_data(as_text=True)
+
+    try:
+        with app.app_context():
+            owner_id = seed(items)
+
+        print(f"{'':<44}{'seconds':>10}{'items/s':>14}")
+        timed('/register_animal x items', items, lambda: [
+            check(client.post('/register_animal', json=animal(owner_id, n))) for n in range(items)
+        ])
+        timed('/register_animals, one call', items, lambda: check(
+            client.post('/register_animals', json={'animals': [animal(owner_id, n) for n in range(items)]})
+        ))
+        timed('/update_appointment_status x items', items, lambda: [
+            check(client.post('/update_appointment_status', json={'appointment_id': n + 1, 'status': STATUSES[n % 3]}))
+            for n in range(items)
+        ])
+        timed('/update_appointment_statuses, one call', items, lambda: check(
+            client.post('/update_appointment_statuses', json={'appointments': [
+                {'appointment_id': items + n + 1, 'status': STATUSES[n % 3]} for n in range(items)
+            ]})
+        ))
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
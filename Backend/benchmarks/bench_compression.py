@@ -0,0 +1,102 @@
+"""Bytes on the wire and CPU per request for the main list endpoints, per encoding.
+
+Seeds a throwaway SQLite database with vets, reviews and appointments, then
+fetches each list endpoint with Accept-Encoding identity, gzip and br (when
+the Brotli package is installed) and reports the body size and the process
+CPU time per request.
+
+    cd Backend
+    python -m benchmarks.bench_compression --vets 500 --requests 50
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+os.environ.setdefault('RESPONSE_CACHE_BACKEND', 'null')  # Measure the real endpoint every time
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Animal, AnimalOwner, Appointment, Review, Veterinarian  # noqa: E402
+from app.services.compression import brotli  # noqa: E402
+from app.services.vet_search import rebuild_search_index  # noqa: E402
+
+ENDPOINTS = [
+    '/veterinarians',
+    '/get_veterinarians',
+    '/api/vets/search?query=nairobi&limit=200',
+    '/get_reviews?vet_id=1',
+    '/get_vet_appointments?veterinarian_id=1',
+    '/get_appointments?animal_id=1',
+]
+
+
+def seed(vets):
+    owner = AnimalOwner(name='Bench Owner', email='owner@example.com', phone='0700000000', location='Nairobi', password='')
+    db.session.add(owner)
+    db.session.flush()
+    animal = Animal(owner_id=owner.id, name='Simba', breed='Mixed', gender='Male', color='Brown',
+                    species='Dog', date_of_birth=date(2020, 1, 1))
+    db.session.add(animal)
+    db.session.execute(insert(Veterinarian), [{
+        'name': f"Dr. Vet {n}", 'email': f"vet{n}@example.com", 'password': '',
+        'license_number': f"L{n}", 'national_id': f"N{n}",
+        'clinic': f"Clinic {n}, Ngong Road, Nairobi", 'specialization': 'dogs, cats, poultry',
+    } for n in range(vets)])
+    db.session.flush()
+    db.session.execute(insert(Review), [{
+        'veterinarian_id': 1, 'owner_id': owner.id,
+        'review_text': f"Visit {n}: very attentive with our dog, explained the treatment clearly.",
+    } for n in range(vets)])
+    db.session.execute(insert(Appointment), [{
+        'owner_id': owner.id, 'animal_id': animal.id, 'veterinarian_id': 1,
+        'date': date.today() + timedelta(days=n % 60), 'time': f"{9 + n % 8}:00",
+        'appointment_type': 'Checkup', 'status': 'Pending',
+    } for n in range(vets)])
+    db.session.commit()
+    rebuild_search_index()
+
+
+def measure(client, url, encoding, requests):
+    headers = {'Accept-Encoding': encoding}
+    size = len(client.get(url, headers=headers).data)
+
+    started = time.process_time()
+    for _ in range(requests):
+        client.get(url, headers=headers)
+    return size, (time.process_time() - started) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vets', type=int, default=500, help='Vets, and reviews and appointments for one vet')
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+
+    try:
+        with app.app_context():
+            seed(args.vets)
+
+        print(f"{'endpoint':<42}" + ''.join(f"{encoding + ' bytes':>14}{'cpu ms':>9}" for encoding in encodings))
+        for url in ENDPOINTS:
+            row = f"{url:<42}"
+            for encoding in encodings:
+                size, cpu_ms = measure(client, url, encoding, args.requests)
+                row += f"{size:>14}{cpu_ms:>9.2f}"
+            print(row)
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
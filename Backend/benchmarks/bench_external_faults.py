@@ -0,0 +1,161 @@
+"""Fault injection: a slow Cloudinary against the rest of the API.
+
+Runs the app with the fake external clients, makes every Cloudinary call take
+--latency seconds, and serves an open-loop mix of /upload_image (new content,
+so it reaches Cloudinary) and /get_animals on --threads request threads, like
+one threaded gunicorn worker. Reports, with and without the guards around
+external calls:
+
+  * /get_animals latency, which should not care that Cloudinary is slow
+  * how the uploads ended (200, or 503 once the circuit opens)
+
+then a fan-out of guarded calls through the asyncio interface.
+
+    cd Backend
+    python -m benchmarks.bench_external_faults --latency 2 --rate 50 --seconds 5
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+os.environ['FIREBASE_CLIENT'] = 'fake'
+os.environ['CLOUDINARY_CLIENT'] = 'fake'
+os.environ['IMAGE_STORAGE'] = 'cloudinary'
+
+from PIL import Image  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Animal, AnimalOwner  # noqa: E402
+from app.services.external import init_external_clients  # noqa: E402
+
+# Guards switched off: no timeout worth the name, no limit, a circuit that never opens
+UNGUARDED = {
+    'CLOUDINARY_TIMEOUT_SECONDS': 3600,
+    'CLOUDINARY_MAX_CONCURRENCY': 1000,
+    'EXTERNAL_BREAKER_FAILURES': 10 ** 9,
+}
+
+
+def seed():
+    owner = AnimalOwner(name='Bench Owner', email='owner@example.com', phone='0700000000', location='Nairobi', password='')
+    db.session.add(owner)
+    db.session.flush()
+    db.session.add_all([
+        Animal(owner_id=owner.id, name=f'Animal {n}', breed='Mixed', gender='Male', color='Brown',
+               species='Dog', date_of_birth=date(2020, 1, 1))
+        for n in range(20)
+    ])
+    db.session.commit()
+    return owner.id
+
+
+def png(n):
+    """A small image that is new content for every n."""
+    output = io.BytesIO()
+    Image.new('RGB', (64, 64), (n % 256, n // 256 % 256, n // 65536 % 256)).save(output, 'PNG')
+    return output.getvalue()
+
+
+def run_mix(app, owner_id, args, first_image):
+    """Submit requests at a fixed rate, every --upload-every'th one an upload. Returns results."""
+    client = app.test_client()
+    results = []
+    lock = threading.Lock()
+
+    def request(kind, n, arrived):
+        if kind == 'upload':
+            response = client.post('/upload_image', data={'image': (io.BytesIO(png(n)), 'photo.png')},
+                                   content_type='multipart/form-data')
+        else:
+            response = client.get(f'/get_animals?owner_id={owner_id}')
+        with lock:
+            results.append((kind, response.status_code, time.perf_counter() - arrived))
+
+    total = int(args.rate * args.seconds)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as server:
+        for n in range(total):
+            # Open loop: arrivals keep coming whether or not the server keeps up
+            time.sleep(max(0.0, started + n / args.rate - time.perf_counter()))
+            kind = 'upload' if n % args.upload_every == 0 else 'list'
+            server.submit(request, kind, first_image + n, time.perf_counter())
+    return results, time.perf_counter() - started
+
+
+def report(label, results, elapsed):
+    lists = sorted(latency for kind, status, latency in results if kind == 'list')
+    uploads = Counter(status for kind, status, latency in results if kind == 'upload')
+    p99 = lists[min(len(lists) - 1, int(len(lists) * 0.99))]
+    print(f"{label}")
+    print(f"  {'/get_animals p50':<42}{statistics.median(lists) * 1000:>10.1f} ms")
+    print(f"  {'/get_animals p99':<42}{p99 * 1000:>10.1f} ms")
+    print(f"  {'uploads by status':<42}{dict(sorted(uploads.items()))}")
+    print(f"  {'all requests answered after':<42}{elapsed:>10.2f} s")
+
+
+def fan_out(app, calls, latency):
+    cloudinary = app.extensions['cloudinary']
+    cloudinary.client.set_latency(latency)
+
+    async def upload_all():
+        return await asyncio.gather(*[
+            cloudinary.aio.upload(io.BytesIO(png(10 ** 6 + n)), public_id=f'fan-out/{n}') for n in range(calls)
+        ])
+
+    started = time.perf_counter()
+    asyncio.run(upload_all())
+    elapsed = time.perf_counter() - started
+    print(f"asyncio fan-out, {calls} uploads of {latency * 1000:.0f} ms each")
+    print(f"  {'gathered in':<42}{elapsed * 1000:>10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=2.0, help='Seconds added to every Cloudinary call')
+    parser.add_argument('--rate', type=float, default=50, help='Requests per second')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--threads', type=int, default=8, help='Request threads of the worker')
+    parser.add_argument('--upload-every', type=int, default=10, help='One upload per this many requests')
+    parser.add_argument('--timeout', type=float, default=0.5, help='CLOUDINARY_TIMEOUT_SECONDS when guarded')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config.update(CLOUDINARY_TIMEOUT_SECONDS=args.timeout, EXTERNAL_BREAKER_RESET_SECONDS=1.0)
+    guarded_config = dict(app.config)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            owner_id = seed()
+
+        first_image = 0
+        for label, overrides in (('unguarded', UNGUARDED), ('guarded', {})):
+            app.config.update(guarded_config, **overrides)
+            init_external_clients(app)
+            app.extensions['cloudinary'].client.set_latency(args.latency)
+            results, elapsed = run_mix(app, owner_id, args, first_image)
+            first_image += len(results)
+            report(f"{label}, Cloudinary +{args.latency:g} s, timeout {app.config['CLOUDINARY_TIMEOUT_SECONDS']:g} s",
+                   results, elapsed)
+            if label == 'guarded':
+                print(f"  {'cloudinary':<42}{app.extensions['cloudinary'].stats()}")
+
+        app.config.update(guarded_config)
+        init_external_clients(app)
+        fan_out(app, app.config['CLOUDINARY_MAX_CONCURRENCY'], 0.2)
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Image upload ingest: resizing, thumbnails and deduplication by content hash.
+
+Generates a camera-sized JPEG with an EXIF orientation tag and posts it to
+/upload_image against the local image storage. Reports:
+
+  * the first upload (decode, turn upright, full-size copy and thumbnails)
+  * the same bytes uploaded again, answered from the content hash
+  * bytes of the original against the stored copies
+
+    cd Backend
+    python -m benchmarks.bench_image_ingest --width 4000 --height 3000
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+_storage_dir = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+os.environ['IMAGE_STORAGE'] = 'local'
+os.environ['IMAGE_STORAGE_PATH'] = _storage_dir
+
+from PIL import Image  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+
+
+def camera_jpeg(width, height, seed):
+    """A noisy JPEG, stored sideways with orientation 6 like a phone in portrait."""
+    image = Image.effect_noise((width, height), 40 + seed).convert('RGB')
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise to display
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=92, exif=exif)
+    return output.getvalue()
+
+
+def upload(client, data):
+    response = client.post('/upload_image', data={'image': (io.BytesIO(data), 'photo.jpg')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def stored_bytes(url, base_url):
+    return os.path.getsize(os.path.join(_storage_dir, *url[len(base_url) + 1:].split('/')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+
+    try:
+        photos = [camera_jpeg(args.width, args.height, seed) for seed in range(args.repeat)]
+
+        started = time.perf_counter()
+        results = [upload(client, photo) for photo in photos]
+        first = (time.perf_counter() - started) / args.repeat
+        assert not any(result['deduplicated'] for result in results)
+
+        started = time.perf_counter()
+        repeats = [upload(client, photo) for photo in photos]
+        again = (time.perf_counter() - started) / args.repeat
+        assert all(result['deduplicated'] for result in repeats)
+
+        print(f"{'first upload':<44}{first * 1000:>10.2f} ms")
+        print(f"{'same bytes again':<44}{again * 1000:>10.2f} ms")
+
+        result = results[0]
+        # Stored sideways, served upright
+        assert (result['width'] > result['height']) == (args.height > args.width), result
+        base_url = app.config['IMAGE_BASE_URL']
+        print(f"{'original':<44}{len(photos[0]) / 1024:>10.1f} KB  {args.width}x{args.height}")
+        print(f"{'full':<44}{stored_bytes(result['image_url'], base_url) / 1024:>10.1f} KB  "
+              f"{result['width']}x{result['height']}")
+        for name, url in result['thumbnails'].items():
+            print(f"{name:<44}{stored_bytes(url, base_url) / 1024:>10.1f} KB")
+    finally:
+        os.unlink(_db_file.name)
+        shutil.rmtree(_storage_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Time spent turning a large appointment list into a JSON response.
+
+Builds the same list of appointment dicts two ways and serialises it through
+two providers: Flask's default provider with every date and datetime formatted
+in the route (the old style), and the app's provider with the raw values left
+for it to format. Reports milliseconds per response and the body size.
+
+    cd Backend
+    python -m benchmarks.bench_json --rows 10000 --repeat 20
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+
+
+def rows(count):
+    created = datetime(2025, 5, 1, 8, 30, 15, 123456)
+    return [{
+        'id': n,
+        'animal_id': 1,
+        'veterinarian_id': n % 50,
+        'date': date(2025, 6, 1) + timedelta(days=n % 90),
+        'time': f"{9 + n % 8}:00",
+        'appointment_type': 'Checkup',
+        'status': 'Pending',
+        'notes': 'Bring vaccination card',
+        'created_at': created + timedelta(minutes=n),
+    } for n in range(count)]
+
+
+def preformatted(appointments):
+    return [dict(
+        appointment,
+        date=appointment['date'].strftime("%Y-%m-%d"),
+        created_at=appointment['created_at'].strftime("%Y-%m-%d %H:%M:%S"),
+    ) for appointment in appointments]
+
+
+def measure(app, provider, build, appointments, repeat):
+    with app.test_request_context():
+        size = len(provider.response(build(appointments)).get_data())
+        started = time.perf_counter()
+        for _ in range(repeat):
+            provider.response(build(appointments)).get_data()
+    return size, (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+        appointments = rows(args.rows)
+        cases = [
+            ('default + strftime in route', DefaultJSONProvider(app), preformatted),
+            (f"{type(app.json).__name__} + raw values", app.json, list),
+        ]
+
+        print(f"{'provider':<36}{'bytes':>12}{'ms/response':>14}")
+        for label, provider, build in cases:
+            size, ms = measure(app, provider, build, appointments, args.repeat)
+            print(f"{label:<36}{size:>12}{ms:>14.2f}")
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
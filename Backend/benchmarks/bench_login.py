@@ -0,0 +1,83 @@
+"""Login throughput at a range of bcrypt costs.
+
+Runs /login against a throwaway SQLite database with several request threads,
+once per cost setting, and reports logins per second and latency.
+
+    cd Backend
+    python -m benchmarks.bench_login --rounds 10 11 12 13 --threads 8 --logins 64
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+
+from app import create_app, db  # noqa: E402
+from app.models import AnimalOwner  # noqa: E402
+from app.services.accounts import add_account  # noqa: E402
+from app.services.passwords import hash_password, shutdown  # noqa: E402
+
+
+def run(app, rounds, threads, logins):
+    app.config['PASSWORD_HASH_ROUNDS'] = rounds
+    with app.app_context():
+        owner = AnimalOwner.query.filter_by(email='bench@example.com').first()
+        owner.password = hash_password('bench-password')
+        db.session.commit()
+
+    client = app.test_client()
+
+    def login(_):
+        started = time.perf_counter()
+        response = client.post('/login', json={'email': 'bench@example.com', 'password': 'bench-password'})
+        assert response.status_code == 200, response.status_code
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"rounds={rounds:<3} logins/s={logins / elapsed:8.1f}  "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms  "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=None, help='PASSWORD_HASH_WORKERS, 0 hashes inline')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    if args.workers is not None:
+        app.config['PASSWORD_HASH_WORKERS'] = args.workers
+
+    with app.app_context():
+        owner = AnimalOwner(name='Bench', email='bench@example.com', phone='0700000000', location='Nairobi', password='')
+        db.session.add(owner)
+        add_account(owner, 'animal_owner')
+        db.session.commit()
+
+    print(f"threads={args.threads} logins={args.logins} hash workers={app.config['PASSWORD_HASH_WORKERS']}")
+    try:
+        for rounds in args.rounds:
+            run(app, rounds, args.threads, args.logins)
+    finally:
+        shutdown()
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
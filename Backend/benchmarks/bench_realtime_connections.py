@@ -0,0 +1,80 @@
+"""Memory held per open /api/events connection.
+
+Opens N event streams against a throwaway SQLite database, each parked
+waiting for events the way an idle client is, and reports the Python heap
+growth per connection with tracemalloc. Then publishes one event per account
+and times how long the poller takes to deliver it to every stream.
+
+    cd Backend
+    python -m benchmarks.bench_realtime_connections --connections 1000 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+os.environ.setdefault('REALTIME_POLL_SECONDS', '0.05')
+
+from app import create_app, db  # noqa: E402
+from app.services.realtime import event_stream, get_broker, publish  # noqa: E402
+
+
+def run(app, connections, accounts):
+    with app.app_context():
+        broker = get_broker()
+        broker.unsubscribe(broker.subscribe(0))  # Starts the poller outside the measurement
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+
+        streams = []
+        for n in range(connections):
+            subscriber = broker.subscribe(n % accounts + 1)
+            stream = event_stream(broker, subscriber, [], heartbeat_seconds=60)
+            next(stream)  # Sends the retry hint, the stream is now live
+            streams.append((subscriber, stream))
+
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        grown = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+        for account_id in range(1, accounts + 1):
+            publish(account_id, 'notification', {'title': 'bench'})
+        db.session.commit()
+
+        started = time.perf_counter()
+        while not all(subscriber.wakeup.is_set() for subscriber, _ in streams):
+            time.sleep(0.005)
+        fanout = time.perf_counter() - started
+
+        for _, stream in streams:
+            stream.close()
+
+    print(
+        f"connections={connections:<6} bytes/connection={grown / connections:8.0f}  "
+        f"open={broker.connection_count():<3} fan-out={fanout * 1000:7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--accounts', type=int, default=100)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+    try:
+        for connections in args.connections:
+            run(app, connections, args.accounts)
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Free-slot queries and conflicting bookings for a vet with a long history.
+
+Seeds a throwaway SQLite database with one vet working 08:00-17:00 every day
+and --history past appointments, plus a few upcoming ones, then claims their
+slots with rebuild_slot_claims(). Reports:
+
+  * free slots over --days days from the claims index (free_slots), against a
+    scan of all the vet's appointments with a linear overlap check per slot
+  * a conflicting and a free /book_appointment request
+
+    cd Backend
+    python -m benchmarks.bench_slots --history 50000 --days 14
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Animal, AnimalOwner, Appointment, Veterinarian, VetWorkingHours  # noqa: E402
+from app.services import slots  # noqa: E402
+
+OPEN, CLOSE, LENGTH = 8 * 60, 17 * 60, 30
+SLOTS_PER_DAY = (CLOSE - OPEN) // LENGTH
+
+
+def seed(history):
+    owner = AnimalOwner(name='Bench Owner', email='owner@example.com', phone='0700000000', location='Nairobi', password='')
+    vet = Veterinarian(name='Dr. Bench', email='vet@example.com', password='', license_number='L1',
+                       national_id='N1', clinic='Clinic', specialization='dogs', slot_minutes=LENGTH)
+    db.session.add_all([owner, vet])
+    db.session.flush()
+    animal = Animal(owner_id=owner.id, name='Simba', breed='Mixed', gender='Male', color='Brown',
+                    species='Dog', date_of_birth=date(2020, 1, 1))
+    db.session.add(animal)
+    db.session.add_all([
+        VetWorkingHours(veterinarian_id=vet.id, weekday=weekday, start_minute=OPEN, end_minute=CLOSE)
+        for weekday in range(7)
+    ])
+    db.session.flush()
+
+    today = slots.local_now().date()
+    # Past days fully booked, then every other slot for the coming week
+    past = [(today - timedelta(days=1 + n // SLOTS_PER_DAY), n % SLOTS_PER_DAY) for n in range(history)]
+    upcoming = [(today + timedelta(days=1 + n // SLOTS_PER_DAY), n % SLOTS_PER_DAY)
+                for n in range(0, 7 * SLOTS_PER_DAY, 2)]
+    db.session.execute(insert(Appointment), [{
+        'owner_id': owner.id, 'animal_id': animal.id, 'veterinarian_id': vet.id,
+        'date': day, 'time': slots.format_minute(OPEN + slot * LENGTH), 'duration_minutes': LENGTH,
+        'appointment_type': 'Checkup', 'status': 'Completed',
+    } for day, slot in past + upcoming])
+    db.session.commit()
+    return vet.id, owner.id, animal.id, today
+
+
+def scan_free_slots(vet, first_day, days):
+    """The straightforward version: every appointment of the vet, every slot checked against each."""
+    booked = {}
+    for appointment in Appointment.query.filter_by(veterinarian_id=vet.id):
+        start = slots.parse_time(appointment.time)
+        booked.setdefault(appointment.date, []).append((start, start + (appointment.duration_minutes or LENGTH)))
+
+    result = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        starts = [
+            start for start in range(OPEN, CLOSE - LENGTH + 1, LENGTH)
+            if not any(start < end and other < start + LENGTH for other, end in booked.get(day, []))
+        ]
+        result.append((day, starts))
+    return result
+
+
+def timed(label, repeat, call):
+    call()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    print(f"{label:<44}{(time.perf_counter() - started) / repeat * 1000:>10.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history', type=int, default=50000, help='Past appointments of the vet')
+    parser.add_argument('--days', type=int, default=14)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+
+    try:
+        with app.app_context():
+            vet_id, owner_id, animal_id, today = seed(args.history)
+            started = time.perf_counter()
+            claimed, skipped = slots.rebuild_slot_claims()
+            print(f"rebuild_slot_claims: {claimed} claimed, {skipped} skipped in {time.perf_counter() - started:.2f} s")
+
+            vet = db.session.get(Veterinarian, vet_id)
+            tomorrow = today + timedelta(days=1)
+            indexed = timed(f"free_slots, {args.days} days", args.repeat,
+                            lambda: slots.free_slots(vet, tomorrow, args.days))
+            scanned = timed(f"scan of {args.history} appointments", max(1, args.repeat // 10),
+                            lambda: scan_free_slots(vet, tomorrow, args.days))
+            assert indexed == scanned
+
+        booking = {'owner_id': owner_id, 'animal_id': animal_id, 'veterinarian_id': vet_id,
+                   'appointment_type': 'Checkup'}
+
+        def book(day, slot, expected_status):
+            response = client.post('/book_appointment', json=dict(
+                booking, date=day.isoformat(), time=slots.format_minute(OPEN + slot * LENGTH)))
+            assert response.status_code == expected_status, response.get_data(as_text=True)
+
+        timed('/book_appointment, conflicting', args.repeat, lambda: book(tomorrow, 0, 409))
+        # Days after the booked week are empty
+        free = iter((tomorrow + timedelta(days=7 + n // SLOTS_PER_DAY), n % SLOTS_PER_DAY) for n in range(args.repeat + 1))
+        timed('/book_appointment, free slot', args.repeat, lambda: book(*next(free), 201))
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Cold start: importing the app, create_app() and the first request.
+
+Each run is a fresh interpreter, like a newly forked or restarted worker,
+against a throwaway SQLite database whose schema is created once up front.
+Reports the median of --runs for each phase. Track it per release with
+--json, which prints one line to append to a results file.
+
+    cd Backend
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter, prints the phase timings in seconds as JSON
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get(sys.argv[1])
+assert response.status_code == 200, response.status_code
+answered = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first request': answered - created,
+    'total': answered - started,
+}))
+"""
+
+
+def run_once(path):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, path], cwd=BACKEND, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/veterinarians', help='The first request')
+    parser.add_argument('--json', action='store_true', help='Print the medians as one JSON line')
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    try:
+        app = create_app()
+        with app.app_context():
+            db.create_all()
+
+        runs = [run_once(args.path) for _ in range(args.runs)]
+        medians = {phase: statistics.median(run[phase] for run in runs) for phase in runs[0]}
+
+        if args.json:
+            print(json.dumps({phase: round(seconds * 1000, 2) for phase, seconds in medians.items()}))
+            return
+        for phase, seconds in medians.items():
+            print(f"{phase:<44}{seconds * 1000:>10.2f} ms")
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Vet search: the search index against the old ILIKE scan.
+
+Fills a throwaway SQLite database with synthetic vets, builds the search index
+and times both paths for a set of search-box inputs, one keystroke at a time.
+
+    cd Backend
+    python -m benchmarks.bench_vet_search --vets 100000 --repeat 5
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{_db_file.name}')
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Veterinarian  # noqa: E402
+from app.services.vet_search import rebuild_search_index, search  # noqa: E402
+
+FIRST_NAMES = ['Amina', 'Brian', 'Cynthia', 'David', 'Esther', 'Faith', 'George', 'Hellen', 'Ian', 'Joy',
+               'Kevin', 'Lucy', 'Mercy', 'Njeri', 'Otieno', 'Peter', 'Rose', 'Samuel', 'Wanjiku', 'Zawadi']
+LAST_NAMES = ['Achieng', 'Barasa', 'Chege', 'Kamau', 'Kariuki', 'Mutua', 'Njoroge', 'Odhiambo', 'Omondi',
+              'Otieno', 'Wafula', 'Wambui', 'Were']
+TOWNS = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Nyeri', 'Machakos', 'Kitale', 'Meru']
+SPECIALIZATIONS = ['dogs', 'cats', 'poultry', 'dairy cattle', 'goats', 'exotic pets', 'equine', 'surgery',
+                   'dentistry', 'dermatology', 'pigs', 'sheep']
+
+QUERIES = ['kamau', 'wanjiku nairobi', 'dairy', 'mutua surgery', 'zawadi were']
+
+
+def seed(count):
+    rng = random.Random(42)
+    rows = []
+    for n in range(count):
+        rows.append({
+            'name': f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'email': f"vet{n}@example.com",
+            'password': '',
+            'license_number': f"L{n}",
+            'national_id': f"N{n}",
+            'clinic': f"{rng.choice(TOWNS)} {rng.choice(['Animal', 'Vet', 'Pet'])} Clinic",
+            'specialization': ', '.join(rng.sample(SPECIALIZATIONS, rng.randint(1, 3))),
+        })
+        if len(rows) == 10000:
+            db.session.execute(insert(Veterinarian), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Veterinarian), rows)
+    db.session.commit()
+
+
+def ilike_search(query):
+    # The query /api/vets/search ran before the index
+    return Veterinarian.query.filter(Veterinarian.name.ilike(f'%{query}%')).all()
+
+
+def keystrokes(query):
+    return [query[:n] for n in range(1, len(query) + 1) if not query[n - 1].isspace()]
+
+
+def timed(func, inputs, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for text in inputs:
+            started = time.perf_counter()
+            func(text)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vets', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    try:
+        with app.app_context():
+            started = time.perf_counter()
+            seed(args.vets)
+            print(f"seeded {args.vets} vets in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            rebuild_search_index()
+            print(f"built search index in {time.perf_counter() - started:.1f}s")
+
+            for query in QUERIES:
+                inputs = keystrokes(query)
+                ilike_p50, ilike_p95 = timed(ilike_search, inputs, args.repeat)
+                index_p50, index_p95 = timed(lambda text: search(text, limit=20), inputs, args.repeat)
+                print(
+                    f"{query!r:<20} ilike p50={ilike_p50:7.2f}ms p95={ilike_p95:7.2f}ms   "
+                    f"index p50={index_p50:7.2f}ms p95={index_p95:7.2f}ms"
+                )
+    finally:
+        os.unlink(_db_file.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Added help desk comment_count, likes table and feed indexes
+
+Revision ID: 0a6c3e8f5d27
+Revises: f29d5b7e1a64
+Create Date: 2025-05-07 16:18:03.552940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a6c3e8f5d27'
+down_revision = 'f29d5b7e1a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('help_desk_like',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('user_type', sa.String(length=20), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['help_desk_post.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('post_id', 'user_type', 'user_id', name='uq_help_desk_like_post_user')
+    )
+    with op.batch_alter_table('help_desk_post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_help_desk_post_timestamp', ['timestamp', 'id'], unique=False)
+        batch_op.create_index('ix_help_desk_post_animal_type_timestamp', ['animal_type', 'timestamp', 'id'], unique=False)
+
+    with op.batch_alter_table('help_desk_comment', schema=None) as batch_op:
+        batch_op.create_index('ix_help_desk_comment_post_id', ['post_id', 'id'], unique=False)
+
+    # Backfill the counts for posts that already have comments
+    op.execute(
+        "UPDATE help_desk_post SET comment_count = "
+        "(SELECT COUNT(*) FROM help_desk_comment WHERE help_desk_comment.post_id = help_desk_post.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('help_desk_comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_help_desk_comment_post_id')
+
+    with op.batch_alter_table('help_desk_post', schema=None) as batch_op:
+        batch_op.drop_index('ix_help_desk_post_animal_type_timestamp')
+        batch_op.drop_index('ix_help_desk_post_timestamp')
+        batch_op.drop_column('comment_count')
+
+    op.drop_table('help_desk_like')
@@ -0,0 +1,37 @@
+"""Added vet_search_term index for vet search
+
+Revision ID: 1b8e4f2c7a93
+Revises: 0a6c3e8f5d27
+Create Date: 2025-05-08 11:26:47.190385
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b8e4f2c7a93'
+down_revision = '0a6c3e8f5d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populate afterwards with `flask rebuild-search-index`
+    op.create_table('vet_search_term',
+    sa.Column('term', sa.String(length=50), nullable=False),
+    sa.Column('veterinarian_id', sa.Integer(), nullable=False),
+    sa.Column('field', sa.String(length=20), nullable=False),
+    sa.Column('weight', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['veterinarian_id'], ['veterinarian.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('term', 'veterinarian_id', 'field')
+    )
+    with op.batch_alter_table('vet_search_term', schema=None) as batch_op:
+        batch_op.create_index('ix_vet_search_term_veterinarian_id', ['veterinarian_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('vet_search_term', schema=None) as batch_op:
+        batch_op.drop_index('ix_vet_search_term_veterinarian_id')
+
+    op.drop_table('vet_search_term')
@@ -0,0 +1,34 @@
+"""Added clinic location columns to veterinarian
+
+Revision ID: 2c5f9a1d6e38
+Revises: 1b8e4f2c7a93
+Create Date: 2025-05-08 17:03:12.664719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c5f9a1d6e38'
+down_revision = '1b8e4f2c7a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('veterinarian', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('clinic_name', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('location_updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_veterinarian_location_updated_at'), ['location_updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('veterinarian', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_veterinarian_location_updated_at'))
+        batch_op.drop_column('location_updated_at')
+        batch_op.drop_column('longitude')
+        batch_op.drop_column('latitude')
+        batch_op.drop_column('clinic_name')
@@ -0,0 +1,35 @@
+"""Added updated_at to appointment and favorite_veterinarian
+
+Revision ID: 3d7a0e5b9c14
+Revises: 2c5f9a1d6e38
+Create Date: 2025-05-09 10:37:25.418306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d7a0e5b9c14'
+down_revision = '2c5f9a1d6e38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('favorite_veterinarian', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE appointment SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    op.execute("UPDATE favorite_veterinarian SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    with op.batch_alter_table('favorite_veterinarian', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,59 @@
+"""Added composite indexes for hot query paths and unique favorites
+
+Revision ID: 4c1d7e2a9f03
+Revises: 9b62e1405ef8
+Create Date: 2025-04-14 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1d7e2a9f03'
+down_revision = '9b62e1405ef8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicate bookmarks (keeping the oldest) so the unique constraint can be created
+    op.execute(
+        "DELETE FROM favorite_veterinarian WHERE id NOT IN ("
+        "SELECT id FROM (SELECT MIN(id) AS id FROM favorite_veterinarian "
+        "GROUP BY owner_id, veterinarian_id) AS keep_rows)"
+    )
+
+    with op.batch_alter_table('favorite_veterinarian', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_favorite_owner_vet', ['owner_id', 'veterinarian_id'])
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_vet_date_time', ['veterinarian_id', 'date', 'time'], unique=False)
+        batch_op.create_index('ix_appointment_animal_date', ['animal_id', 'date'], unique=False)
+
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.create_index('ix_review_vet_created_at', ['veterinarian_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_read_timestamp', ['user_id', 'is_read', 'timestamp'], unique=False)
+
+    with op.batch_alter_table('user_activity', schema=None) as batch_op:
+        batch_op.create_index('ix_user_activity_user_type_timestamp', ['user_id', 'activity_type', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_activity', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_activity_user_type_timestamp')
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_user_read_timestamp')
+
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_index('ix_review_vet_created_at')
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_animal_date')
+        batch_op.drop_index('ix_appointment_vet_date_time')
+
+    with op.batch_alter_table('favorite_veterinarian', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_favorite_owner_vet', type_='unique')
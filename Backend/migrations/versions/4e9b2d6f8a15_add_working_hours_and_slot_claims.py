@@ -0,0 +1,65 @@
+"""Added vet working hours and appointment slot claims
+
+Revision ID: 4e9b2d6f8a15
+Revises: 3d7a0e5b9c14
+Create Date: 2025-05-10 09:14:52.630917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e9b2d6f8a15'
+down_revision = '3d7a0e5b9c14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('veterinarian', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('slot_minutes', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('duration_minutes', sa.Integer(), nullable=True))
+
+    op.create_table('vet_working_hours',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('veterinarian_id', sa.Integer(), nullable=False),
+    sa.Column('weekday', sa.Integer(), nullable=False),
+    sa.Column('start_minute', sa.Integer(), nullable=False),
+    sa.Column('end_minute', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['veterinarian_id'], ['veterinarian.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('vet_working_hours', schema=None) as batch_op:
+        batch_op.create_index('ix_vet_working_hours_vet_weekday', ['veterinarian_id', 'weekday'], unique=False)
+
+    # Claim the slots of existing bookings afterwards with `flask rebuild-slot-claims`
+    op.create_table('appointment_slot_claim',
+    sa.Column('veterinarian_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('minute', sa.Integer(), nullable=False),
+    sa.Column('appointment_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['appointment_id'], ['appointment.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['veterinarian_id'], ['veterinarian.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('veterinarian_id', 'date', 'minute')
+    )
+    with op.batch_alter_table('appointment_slot_claim', schema=None) as batch_op:
+        batch_op.create_index('ix_appointment_slot_claim_appointment_id', ['appointment_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('appointment_slot_claim', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointment_slot_claim_appointment_id')
+
+    op.drop_table('appointment_slot_claim')
+    with op.batch_alter_table('vet_working_hours', schema=None) as batch_op:
+        batch_op.drop_index('ix_vet_working_hours_vet_weekday')
+
+    op.drop_table('vet_working_hours')
+    with op.batch_alter_table('appointment', schema=None) as batch_op:
+        batch_op.drop_column('duration_minutes')
+
+    with op.batch_alter_table('veterinarian', schema=None) as batch_op:
+        batch_op.drop_column('slot_minutes')
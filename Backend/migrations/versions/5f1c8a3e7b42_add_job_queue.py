@@ -0,0 +1,67 @@
+"""Added job queue and dead letter tables
+
+Revision ID: 5f1c8a3e7b42
+Revises: 4e9b2d6f8a15
+Create Date: 2025-05-10 16:02:18.274051
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f1c8a3e7b42'
+down_revision = '4e9b2d6f8a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=200), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_until', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index('ix_job_status_run_at', ['status', 'run_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_job_finished_at'), ['finished_at'], unique=False)
+
+    op.create_table('dead_letter_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task', sa.String(length=100), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=200), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('failed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('dead_letter_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_dead_letter_job_task'), ['task'], unique=False)
+        batch_op.create_index(batch_op.f('ix_dead_letter_job_failed_at'), ['failed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('dead_letter_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_dead_letter_job_failed_at'))
+        batch_op.drop_index(batch_op.f('ix_dead_letter_job_task'))
+
+    op.drop_table('dead_letter_job')
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_finished_at'))
+        batch_op.drop_index('ix_job_status_run_at')
+
+    op.drop_table('job')
@@ -0,0 +1,40 @@
+"""Added image asset table for ingested uploads
+
+Revision ID: 6a2d9e4c1f83
+Revises: 5f1c8a3e7b42
+Create Date: 2025-05-12 10:41:07.518326
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a2d9e4c1f83'
+down_revision = '5f1c8a3e7b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_asset',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('variants', sa.Text(), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('height', sa.Integer(), nullable=False),
+    sa.Column('upload_bytes', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_hash')
+    )
+    with op.batch_alter_table('image_asset', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_image_asset_url'), ['url'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('image_asset', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_image_asset_url'))
+
+    op.drop_table('image_asset')
@@ -0,0 +1,38 @@
+"""Made notification and user activity timestamps NOT NULL
+
+Keyset pages on (timestamp, id) never reach rows with a NULL timestamp, so
+existing NULLs get the migration time and new rows must carry one.
+
+Revision ID: 7b3e5f9a2c60
+Revises: 6a2d9e4c1f83
+Create Date: 2025-05-14 09:12:44.602913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e5f9a2c60'
+down_revision = '6a2d9e4c1f83'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE notification SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    op.execute("UPDATE user_activity SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+    with op.batch_alter_table('user_activity', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_activity', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,49 @@
+"""Added review rating and veterinarian_stats aggregates
+
+Revision ID: 7e5a0c3b8d21
+Revises: 4c1d7e2a9f03
+Create Date: 2025-04-16 15:40:07.902115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e5a0c3b8d21'
+down_revision = '4c1d7e2a9f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating', sa.SmallInteger(), nullable=True))
+
+    op.create_table('veterinarian_stats',
+    sa.Column('veterinarian_id', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('rating_count', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Integer(), nullable=False),
+    sa.Column('rating_1_count', sa.Integer(), nullable=False),
+    sa.Column('rating_2_count', sa.Integer(), nullable=False),
+    sa.Column('rating_3_count', sa.Integer(), nullable=False),
+    sa.Column('rating_4_count', sa.Integer(), nullable=False),
+    sa.Column('rating_5_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['veterinarian_id'], ['veterinarian.id'], ),
+    sa.PrimaryKeyConstraint('veterinarian_id')
+    )
+
+    # Existing reviews have no rating yet, so only the review counts carry over
+    op.execute(
+        "INSERT INTO veterinarian_stats (veterinarian_id, review_count, rating_count, rating_sum, "
+        "rating_1_count, rating_2_count, rating_3_count, rating_4_count, rating_5_count) "
+        "SELECT veterinarian_id, COUNT(*), 0, 0, 0, 0, 0, 0, 0 FROM review GROUP BY veterinarian_id"
+    )
+
+
+def downgrade():
+    op.drop_table('veterinarian_stats')
+
+    with op.batch_alter_table('review', schema=None) as batch_op:
+        batch_op.drop_column('rating')
@@ -0,0 +1,31 @@
+"""Added updated_at to veterinarian
+
+Favorites and appointment lists show vet fields, so their ETags include the
+newest updated_at of the vets they join.
+
+Revision ID: 8c4a1f6d2e95
+Revises: 7b3e5f9a2c60
+Create Date: 2025-05-14 15:41:08.227519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4a1f6d2e95'
+down_revision = '7b3e5f9a2c60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('veterinarian', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE veterinarian SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    with op.batch_alter_table('veterinarian', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
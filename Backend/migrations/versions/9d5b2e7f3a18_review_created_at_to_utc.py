@@ -0,0 +1,47 @@
+"""Converted review.created_at from Nairobi wall-clock time to UTC
+
+Reviews used to be stamped with datetime.now(Africa/Nairobi), stored without
+its offset; every other timestamp, and new reviews, are naive UTC. Existing
+rows are shifted to UTC so they render at the right time and sort with new
+ones on ix_review_vet_created_at. Run it together with the deploy that
+switched the default: reviews written by the new code are already UTC.
+
+Revision ID: 9d5b2e7f3a18
+Revises: 8c4a1f6d2e95
+Create Date: 2025-05-15 08:26:51.730114
+
+"""
+from alembic import op
+import pytz
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d5b2e7f3a18'
+down_revision = '8c4a1f6d2e95'
+branch_labels = None
+depends_on = None
+
+LOCAL_TZ = pytz.timezone('Africa/Nairobi')
+
+review = sa.table('review', sa.column('id', sa.Integer), sa.column('created_at', sa.DateTime))
+
+
+def _convert(convert):
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(review.c.id, review.c.created_at).where(review.c.created_at.isnot(None))
+    ).fetchall()
+    if rows:
+        bind.execute(
+            review.update().where(review.c.id == sa.bindparam('b_id')).values(created_at=sa.bindparam('b_created_at')),
+            [{'b_id': review_id, 'b_created_at': convert(created_at)} for review_id, created_at in rows]
+        )
+
+
+def upgrade():
+    _convert(lambda value: LOCAL_TZ.localize(value).astimezone(pytz.utc).replace(tzinfo=None))
+
+
+def downgrade():
+    _convert(lambda value: pytz.utc.localize(value).astimezone(LOCAL_TZ).replace(tzinfo=None))
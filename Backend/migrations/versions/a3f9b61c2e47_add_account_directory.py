@@ -0,0 +1,56 @@
+"""Added account directory over animal owners and veterinarians
+
+Revision ID: a3f9b61c2e47
+Revises: 7e5a0c3b8d21
+Create Date: 2025-04-22 11:03:52.446871
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f9b61c2e47'
+down_revision = '7e5a0c3b8d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('account',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('role', 'user_id', name='uq_account_role_user')
+    )
+
+    # Backfill existing users. Logins used to check animal owners first, so an
+    # email present in both tables keeps resolving to the animal owner.
+    op.execute(
+        "INSERT INTO account (email, role, user_id) "
+        "SELECT email, 'animal_owner', id FROM animal_owner ORDER BY id"
+    )
+    op.execute(
+        "INSERT INTO account (email, role, user_id) "
+        "SELECT email, 'veterinarian', id FROM veterinarian "
+        "WHERE email NOT IN (SELECT email FROM animal_owner) ORDER BY id"
+    )
+
+    # Those vets cannot log in until they get an email of their own:
+    # `flask account-conflicts` lists them, `flask resolve-account-conflict` moves one
+    conflicts = op.get_bind().execute(sa.text(
+        "SELECT id, email FROM veterinarian WHERE email IN (SELECT email FROM animal_owner) ORDER BY id"
+    )).fetchall()
+    for vet_id, email in conflicts:
+        logger.warning("veterinarian %s has no account: %s belongs to an animal owner", vet_id, email)
+
+
+def downgrade():
+    op.drop_table('account')
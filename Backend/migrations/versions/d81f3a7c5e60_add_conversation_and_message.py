@@ -0,0 +1,67 @@
+"""Added conversation and message tables for persistent chat
+
+Revision ID: d81f3a7c5e60
+Revises: c6e2d4f81b95
+Create Date: 2025-05-02 10:47:33.560982
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f3a7c5e60'
+down_revision = 'c6e2d4f81b95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversation',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('participant_a_id', sa.Integer(), nullable=False),
+    sa.Column('participant_b_id', sa.Integer(), nullable=False),
+    sa.Column('last_message', sa.Text(), nullable=True),
+    sa.Column('last_message_time', sa.DateTime(), nullable=True),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('last_sender_id', sa.Integer(), nullable=True),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('unread_count_a', sa.Integer(), nullable=False),
+    sa.Column('unread_count_b', sa.Integer(), nullable=False),
+    sa.Column('last_read_id_a', sa.Integer(), nullable=False),
+    sa.Column('last_read_id_b', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['participant_a_id'], ['account.id'], ),
+    sa.ForeignKeyConstraint(['participant_b_id'], ['account.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('participant_a_id', 'participant_b_id', name='uq_conversation_participants')
+    )
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.create_index('ix_conversation_a_last_message_time', ['participant_a_id', 'last_message_time'], unique=False)
+        batch_op.create_index('ix_conversation_b_last_message_time', ['participant_b_id', 'last_message_time'], unique=False)
+
+    op.create_table('message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('image_url', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversation.id'], ),
+    sa.ForeignKeyConstraint(['sender_id'], ['account.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.create_index('ix_message_conversation_id', ['conversation_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('message', schema=None) as batch_op:
+        batch_op.drop_index('ix_message_conversation_id')
+
+    op.drop_table('message')
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversation_b_last_message_time')
+        batch_op.drop_index('ix_conversation_a_last_message_time')
+
+    op.drop_table('conversation')
@@ -0,0 +1,38 @@
+"""Added realtime_event outbox for server push
+
+Revision ID: e4b7c9a2d318
+Revises: d81f3a7c5e60
+Create Date: 2025-05-06 14:05:19.274410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c9a2d318'
+down_revision = 'd81f3a7c5e60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('realtime_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('account_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', sa.String(length=30), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('realtime_event', schema=None) as batch_op:
+        batch_op.create_index('ix_realtime_event_account_id', ['account_id', 'id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_realtime_event_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('realtime_event', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_realtime_event_created_at'))
+        batch_op.drop_index('ix_realtime_event_account_id')
+
+    op.drop_table('realtime_event')
@@ -0,0 +1,37 @@
+"""Added notification_counter for unread badge counts
+
+Revision ID: f29d5b7e1a64
+Revises: e4b7c9a2d318
+Create Date: 2025-05-07 09:42:51.803126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f29d5b7e1a64'
+down_revision = 'e4b7c9a2d318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_counter',
+    sa.Column('user_type', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_type', 'user_id')
+    )
+
+    # Seed the counters from the notifications already stored
+    op.execute(
+        "INSERT INTO notification_counter (user_type, user_id, unread_count) "
+        "SELECT user_type, user_id, COUNT(id) FROM notification "
+        "WHERE is_read = false OR is_read IS NULL GROUP BY user_type, user_id"
+    )
+    op.execute("UPDATE notification SET is_read = false WHERE is_read IS NULL")
+
+
+def downgrade():
+    op.drop_table('notification_counter')
@@ -0,0 +1,83 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+# Settings are read when config.py is imported, so they go in before the app
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['FIREBASE_CLIENT'] = 'fake'
+os.environ['CLOUDINARY_CLIENT'] = 'fake'
+os.environ['IMAGE_STORAGE'] = 'local'
+os.environ['IMAGE_STORAGE_PATH'] = tempfile.mkdtemp(prefix='vetconnect-test-uploads-')
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ['PASSWORD_HASH_ROUNDS'] = '4'
+os.environ['JWT_BLOCKLIST_BACKEND'] = 'memory'
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import Animal, AnimalOwner, Veterinarian  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Context manager collecting the SQL statements run inside it."""
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return counting
+
+
+def make_owner(n=1, **fields):
+    owner = AnimalOwner(**dict({
+        'name': f'Owner {n}', 'email': f'owner{n}@example.com', 'phone': f'07000{n:05d}',
+        'location': 'Nairobi', 'password': '',
+    }, **fields))
+    db.session.add(owner)
+    db.session.flush()
+    return owner
+
+
+def make_vet(n=1, **fields):
+    vet = Veterinarian(**dict({
+        'name': f'Dr. Vet {n}', 'email': f'vet{n}@example.com', 'password': '', 'license_number': f'L{n}',
+        'national_id': f'N{n}', 'clinic': 'Clinic', 'specialization': 'dogs',
+    }, **fields))
+    db.session.add(vet)
+    db.session.flush()
+    return vet
+
+
+def make_animal(owner, n=1, **fields):
+    animal = Animal(**dict({
+        'owner_id': owner.id, 'name': f'Animal {n}', 'breed': 'Mixed', 'gender': 'Male', 'color': 'Brown',
+        'species': 'Dog', 'date_of_birth': date(2020, 1, 1),
+    }, **fields))
+    db.session.add(animal)
+    db.session.flush()
+    return animal
@@ -0,0 +1,36 @@
+from app import db
+from app.models import Account
+from app.services.accounts import resolve_by_email, users_without_account
+
+from conftest import make_owner, make_vet
+
+VET = {
+    'name': 'Dr. Vet', 'email': 'shared@example.com', 'password': 'secret', 'license_number': 'L9',
+    'national_id': 'N9', 'clinic': 'Clinic', 'specialization': 'dogs',
+}
+OWNER = {'name': 'Owner', 'email': 'shared@example.com', 'password': 'secret', 'phone': '0711111111', 'location': 'Nairobi'}
+
+
+def test_registering_an_email_of_the_other_role_is_a_conflict(client):
+    assert client.post('/register/animal_owner', json=OWNER).status_code == 201
+    response = client.post('/register/veterinarian', json=VET)
+    assert response.status_code == 409
+    assert response.get_json()['message'] == 'Email already registered'
+
+
+def test_a_user_left_without_account_can_be_moved_to_a_free_email(app):
+    owner = make_owner(email='shared@example.com')
+    db.session.add(Account(email=owner.email, role='animal_owner', user_id=owner.id))
+    vet = make_vet(email='shared@example.com')  # As the directory backfill left it
+    db.session.commit()
+    assert [(role, user.id) for role, user, holder in users_without_account()] == [('veterinarian', vet.id)]
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['resolve-account-conflict', 'veterinarian', str(vet.id), 'shared@example.com'])
+    assert result.exit_code != 0 and 'already registered' in result.output
+
+    result = runner.invoke(args=['resolve-account-conflict', 'veterinarian', str(vet.id), 'vet@example.com'])
+    assert result.exit_code == 0, result.output
+    account, user = resolve_by_email('vet@example.com')
+    assert (account.role, user.id) == ('veterinarian', vet.id)
+    assert users_without_account() == []
@@ -0,0 +1,96 @@
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import Animal, Appointment, Notification
+
+from conftest import make_animal, make_owner, make_vet
+
+
+@pytest.fixture(params=[True, False], ids=['returning', 'no-returning'])
+def returning(request, app, monkeypatch):
+    """Run once as is and once with INSERT ... RETURNING unavailable, as on MySQL."""
+    if not request.param:
+        dialect = db.engine.dialect
+        for flag in ('insert_returning', 'insert_executemany_returning',
+                     'insert_executemany_returning_sort_by_parameter_order', 'use_insertmanyvalues'):
+            monkeypatch.setattr(dialect, flag, False)
+    return request.param
+
+
+def animal_item(owner_id, n):
+    return {
+        'owner_id': owner_id, 'name': f'Calf {n}', 'breed': 'Boran', 'species': 'Cow', 'gender': 'Female',
+        'color': 'White', 'date_of_birth': '2024-01-01',
+    }
+
+
+def test_register_animals_returns_ids_in_item_order(client, returning):
+    owner = make_owner()
+    db.session.commit()
+
+    items = [animal_item(owner.id, n) for n in range(3)]
+    items.insert(1, animal_item(owner.id + 1, 99))  # Unknown owner
+    response = client.post('/register_animals', json={'animals': items})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [True, False, True, True]
+    names = {animal.id: animal.name for animal in Animal.query}
+    assert [names[results[i]['animal_id']] for i in (0, 2, 3)] == ['Calf 0', 'Calf 1', 'Calf 2']
+
+
+def test_status_updates_notify_each_owner(client, returning):
+    vet = make_vet()
+    appointment_ids = []
+    for n in range(1, 4):
+        owner = make_owner(n)
+        appointment = Appointment(
+            owner_id=owner.id, animal_id=make_animal(owner, n).id, veterinarian_id=vet.id,
+            date=date(2025, 6, 2), time=f'{8 + n:02d}:00', appointment_type='Checkup',
+        )
+        db.session.add(appointment)
+        db.session.flush()
+        appointment_ids.append(appointment.id)
+    db.session.commit()
+
+    response = client.post('/update_appointment_statuses', json={'appointments': [
+        {'appointment_id': appointment_id, 'status': 'Upcoming'} for appointment_id in appointment_ids
+    ]})
+
+    assert response.status_code == 200
+    assert response.get_json()['succeeded'] == 3
+    notified = {(n.user_id, n.related_id) for n in Notification.query}
+    assert notified == {
+        (appointment.owner_id, str(appointment.id)) for appointment in Appointment.query
+    }
+
+
+@pytest.mark.parametrize('change, error', [
+    ({'breed': ''}, 'Missing required fields'),
+    ({'date_of_birth': '01/02/2024'}, 'Invalid date format. Use YYYY-MM-DD.'),
+])
+def test_single_and_bulk_registration_reject_the_same_items(client, change, error):
+    owner = make_owner()
+    db.session.commit()
+    item = dict(animal_item(owner.id, 1), **change)
+
+    single = client.post('/register_animal', json=item)
+    assert single.status_code == 400 and single.get_json()['message'] == error
+    [result] = client.post('/register_animals', json={'animals': [item]}).get_json()['results']
+    assert result == {'index': 0, 'success': False, 'error': error}
+
+
+def test_single_and_bulk_registration_store_the_same_values(client):
+    owner = make_owner()
+    db.session.commit()
+
+    single_id = client.post('/register_animal', json=animal_item(owner.id, 1)).get_json()['animal_id']
+    [result] = client.post('/register_animals', json={'animals': [animal_item(owner.id, 1)]}).get_json()['results']
+    db.session.expire_all()
+
+    columns = ['owner_id', 'name', 'breed', 'species', 'gender', 'color', 'date_of_birth', 'image_url']
+    single, batched = db.session.get(Animal, single_id), db.session.get(Animal, result['animal_id'])
+    assert [getattr(single, column) for column in columns] == [getattr(batched, column) for column in columns]
+    assert single.date_of_birth == date(2024, 1, 1)
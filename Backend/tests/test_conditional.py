@@ -0,0 +1,39 @@
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import Appointment, FavoriteVeterinarian
+
+from conftest import make_animal, make_owner, make_vet
+
+
+@pytest.fixture
+def listing(app):
+    owner = make_owner()
+    animal = make_animal(owner)
+    vet = make_vet()
+    db.session.add(FavoriteVeterinarian(owner_id=owner.id, veterinarian_id=vet.id))
+    db.session.add(Appointment(
+        owner_id=owner.id, animal_id=animal.id, veterinarian_id=vet.id, date=date(2025, 6, 2),
+        time='09:00', appointment_type='Checkup',
+    ))
+    db.session.commit()
+    return owner, animal, vet
+
+
+@pytest.mark.parametrize('url', ['/get_favorites?owner_id={owner}', '/get_appointments?animal_id={animal}'])
+def test_etag_changes_when_a_joined_vet_changes(client, listing, url):
+    owner, animal, vet = listing
+    url = url.format(owner=owner.id, animal=animal.id)
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    vet.name = 'Dr. Renamed'
+    db.session.commit()
+
+    second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert 'Dr. Renamed' in second.get_data(as_text=True)
@@ -0,0 +1,190 @@
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from app.services import images
+from app.services.external import (
+    CircuitBreaker, CloudinaryClient, ExternalServiceError, FakeCloudinaryClient, GuardedClient,
+    PermanentServiceError, ServiceTimeout, ServiceUnavailable
+)
+
+
+def test_cloudinary_without_credentials_refuses_to_upload():
+    client = CloudinaryClient()
+    with pytest.raises(PermanentServiceError, match='not configured'):
+        client.upload(io.BytesIO(b'image'), public_id='images/test')
+
+
+class Recorder:
+    """A service whose calls take `latency` seconds and record how many ran at once."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def work(self, value=None):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.running -= 1
+        return value
+
+
+def guarded(client, timeout=1.0, max_concurrency=4, failure_threshold=2, reset_seconds=0.1, queue_seconds=0.0):
+    return GuardedClient('test', client, timeout=timeout, max_concurrency=max_concurrency,
+                         breaker=CircuitBreaker(failure_threshold, reset_seconds), queue_seconds=queue_seconds)
+
+
+def test_breaker_opens_half_opens_and_closes():
+    fake = FakeCloudinaryClient()
+    service = guarded(fake)
+
+    fake.fail_next(2)
+    for _ in range(2):
+        with pytest.raises(ExternalServiceError):
+            service.upload(b'image')
+    assert service.breaker.state == 'open'
+
+    # Rejected without reaching the service
+    calls = len(fake.calls)
+    with pytest.raises(ServiceUnavailable) as rejected:
+        service.upload(b'image')
+    assert 0 < rejected.value.retry_after <= 0.1
+    assert len(fake.calls) == calls
+
+    # A failed trial call opens the circuit again
+    time.sleep(0.12)
+    assert service.breaker.state == 'half_open'
+    fake.fail_next(1)
+    with pytest.raises(ExternalServiceError):
+        service.upload(b'image')
+    assert service.breaker.state == 'open'
+
+    # A successful one closes it
+    time.sleep(0.12)
+    assert service.upload(b'image', public_id='ok')['public_id'] == 'ok'
+    assert service.breaker.state == 'closed'
+    assert service.stats()['failures'] == 3 and service.stats()['rejected'] == 1
+
+
+def test_half_open_lets_one_trial_call_through():
+    recorder = Recorder(latency=0.2)
+    service = guarded(recorder)
+    service.breaker.record_failure()
+    service.breaker.record_failure()
+    time.sleep(0.12)
+
+    trial = threading.Thread(target=service.work)
+    trial.start()
+    time.sleep(0.05)
+    with pytest.raises(ServiceUnavailable, match='repeated failures'):
+        service.work()
+    trial.join()
+    assert service.breaker.state == 'closed'
+
+
+def test_timeout_raises_and_counts_towards_the_breaker():
+    fake = FakeCloudinaryClient()
+    service = guarded(fake, timeout=0.05, failure_threshold=1)
+    fake.set_latency(0.3)
+
+    started = time.monotonic()
+    with pytest.raises(ServiceTimeout):
+        service.upload(b'image')
+    assert time.monotonic() - started < 0.25
+    assert service.stats()['timeouts'] == 1
+    assert service.breaker.state == 'open'
+    # The overrunning call keeps its slot until it really returns
+    assert service.in_flight == 1
+    time.sleep(0.35)
+    assert service.in_flight == 0
+
+
+def test_permanent_errors_leave_the_circuit_closed():
+    class Rejecting:
+        def work(self):
+            raise PermanentServiceError('bad request')
+
+    service = guarded(Rejecting(), failure_threshold=1)
+    with pytest.raises(PermanentServiceError):
+        service.work()
+    assert service.breaker.state == 'closed'
+
+
+def test_semaphore_bounds_calls_in_flight():
+    recorder = Recorder(latency=0.1)
+    service = guarded(recorder, max_concurrency=2, queue_seconds=2.0)
+
+    with ThreadPoolExecutor(6) as callers:
+        results = list(callers.map(service.work, range(6)))
+
+    assert results == list(range(6))
+    assert recorder.peak == 2
+    assert service.stats()['rejected'] == 0
+
+
+def test_calls_beyond_the_limit_are_rejected_without_waiting():
+    recorder = Recorder(latency=0.3)
+    service = guarded(recorder, max_concurrency=2)
+
+    callers = [threading.Thread(target=service.work) for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    with pytest.raises(ServiceUnavailable, match='busy'):
+        service.work()
+    assert time.monotonic() - started < 0.05
+    for caller in callers:
+        caller.join()
+
+    assert recorder.peak == 2
+    assert service.stats()['rejected'] == 1
+    assert service.breaker.state == 'closed'  # Being busy is not a failure of the service
+
+
+def test_async_calls_run_concurrently_within_the_limit():
+    recorder = Recorder(latency=0.1)
+    service = guarded(recorder, max_concurrency=3)
+
+    async def fan_out(count):
+        return await asyncio.gather(*[service.aio.work(n) for n in range(count)], return_exceptions=True)
+
+    started = time.monotonic()
+    results = asyncio.run(fan_out(4))
+    assert time.monotonic() - started < 0.25
+    assert results[:3] == [0, 1, 2]
+    assert isinstance(results[3], ServiceUnavailable)
+    assert recorder.peak == 3
+
+
+def test_async_call_times_out():
+    service = guarded(Recorder(latency=0.3), timeout=0.05)
+    with pytest.raises(ServiceTimeout):
+        asyncio.run(service.aio.work())
+
+
+def test_open_circuit_answers_503_with_retry_after(app, client):
+    app.extensions['image_storage'] = images.CloudinaryImageStorage()
+    breaker = app.extensions['cloudinary'].breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    output = io.BytesIO()
+    Image.new('RGB', (16, 16)).save(output, 'PNG')
+    output.seek(0)
+    response = client.post('/upload_image', data={'image': (output, 'photo.png')}, content_type='multipart/form-data')
+
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
@@ -0,0 +1,71 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from firebase_admin import auth
+
+from app.services.external import FirebaseAuthClient
+
+PASSWORD_HASH = '$2b$04$' + 'a' * 53
+
+
+@pytest.fixture
+def firebase(monkeypatch):
+    """The real client against a stubbed Admin SDK: {'user': UserRecord or None, 'calls': [...]}."""
+    state = {'user': None, 'calls': []}
+
+    def get_user_by_email(email):
+        if state['user'] is None:
+            raise auth.UserNotFoundError('No user record found')
+        return state['user']
+
+    monkeypatch.setattr(auth, 'get_user_by_email', get_user_by_email)
+    monkeypatch.setattr(auth, 'update_user', lambda uid, **fields: state['calls'].append(('update_user', uid, fields)))
+    monkeypatch.setattr(auth, 'import_users', lambda users, hash_alg: (
+        state['calls'].append(('import_users', users)) or SimpleNamespace(failure_count=0)
+    ))
+    client = FirebaseAuthClient()
+    monkeypatch.setattr(client, '_auth', lambda: auth)
+    return client, state
+
+
+def existing_user():
+    return auth.UserRecord({
+        'localId': 'uid-1', 'email': 'owner1@example.com', 'displayName': 'Old Name', 'emailVerified': True,
+        'customAttributes': json.dumps({'role': 'owner'}), 'createdAt': '1700000000000',
+        'providerUserInfo': [
+            {'providerId': 'google.com', 'rawId': 'google-1', 'email': 'owner1@example.com'},
+            {'providerId': 'password', 'rawId': 'owner1@example.com'},
+        ],
+    })
+
+
+def test_new_user_is_imported_with_the_hash(firebase):
+    client, state = firebase
+    uid = client.sync_user('owner1@example.com', 'Owner 1', PASSWORD_HASH)
+
+    [(name, [record])] = state['calls']
+    assert name == 'import_users'
+    assert record.uid == uid and record.email == 'owner1@example.com'
+
+
+def test_existing_user_is_updated_not_replaced(firebase):
+    client, state = firebase
+    state['user'] = existing_user()
+
+    assert client.sync_user('owner1@example.com', 'Owner 1', PASSWORD_HASH) == 'uid-1'
+    assert state['calls'] == [('update_user', 'uid-1', {'display_name': 'Owner 1'})]
+
+
+def test_password_reset_keeps_the_rest_of_the_user(firebase):
+    client, state = firebase
+    state['user'] = existing_user()
+
+    assert client.sync_user('owner1@example.com', 'Owner 1', PASSWORD_HASH, set_password=True) == 'uid-1'
+    [(name, [record])] = state['calls']
+    assert name == 'import_users'
+    payload = record.to_dict()
+    assert payload['localId'] == 'uid-1' and payload['emailVerified'] is True
+    assert json.loads(payload['customAttributes']) == {'role': 'owner'}
+    assert [provider['providerId'] for provider in payload['providerUserInfo']] == ['google.com']
+    assert payload['createdAt'] == 1700000000000
@@ -0,0 +1,30 @@
+import io
+
+import pytest
+from PIL import Image, ImageFile
+
+from app.services import images
+
+
+def png(width, height):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 40, 40)).save(output, 'PNG')
+    output.seek(0)
+    return output
+
+
+def test_ingest_stores_thumbnails(app):
+    asset, deduplicated = images.ingest(png(64, 48))
+    assert not deduplicated
+    assert asset.url
+
+
+def test_too_many_pixels_is_rejected_from_the_header(app, monkeypatch):
+    app.config['IMAGE_MAX_PIXELS'] = 100 * 100
+    max_image_pixels = Image.MAX_IMAGE_PIXELS
+    upload = png(101, 100)
+    monkeypatch.setattr(ImageFile.ImageFile, 'load', lambda self: pytest.fail('pixels decoded'))
+
+    with pytest.raises(images.ImageRejected, match='too many pixels'):
+        images.ingest(upload)
+    assert Image.MAX_IMAGE_PIXELS == max_image_pixels
@@ -0,0 +1,15 @@
+from datetime import datetime
+from decimal import Decimal
+
+
+def test_datetimes_carry_the_configured_offset(app):
+    assert app.json.dumps({'at': datetime(2025, 5, 9, 10, 37, 25, 418306)}) == '{"at":"2025-05-09T13:37:25+03:00"}'
+
+
+def test_dumps_honours_standard_kwargs(app):
+    text = app.json.dumps({'b': Decimal('1.10'), 'a': datetime(2025, 5, 9, 10, 0)}, sort_keys=True, indent=2)
+    assert text == '{\n  "a": "2025-05-09T13:00:00+03:00",\n  "b": "1.10"\n}'
+
+
+def test_loads_honours_standard_kwargs(app):
+    assert app.json.loads('{"price": 1.10}', parse_float=Decimal) == {'price': Decimal('1.10')}
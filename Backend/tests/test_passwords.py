@@ -0,0 +1,13 @@
+from app.services import passwords
+
+
+def test_hash_workers_are_spawned_not_forked(app, monkeypatch):
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    monkeypatch.setattr(passwords, '_executor', None)
+    try:
+        stored_hash = passwords.hash_password('secret')
+        assert passwords._executor._mp_context.get_start_method() == 'spawn'
+        assert passwords.verify_password('secret', stored_hash)
+        assert not passwords.verify_password('wrong', stored_hash)
+    finally:
+        passwords._executor.shutdown()
@@ -0,0 +1,78 @@
+import json
+from collections import deque
+
+from flask_jwt_extended import create_access_token
+
+from app import db
+from app.models import RealtimeEvent
+from app.services.realtime import EventBroker, Subscriber
+
+
+def add_event(event_id, account_id=1):
+    db.session.add(RealtimeEvent(id=event_id, account_id=account_id, event_type='message', payload='{}'))
+    db.session.commit()
+
+
+def test_late_commit_below_high_water_mark_is_delivered(app, monkeypatch):
+    broker = EventBroker(app, gap_seconds=60)
+    monkeypatch.setattr(broker, '_ensure_poller', lambda: None)
+    subscriber = broker.subscribe(1)
+
+    add_event(1)
+    add_event(3)  # 2 is still in flight
+    broker.poll_once()
+    add_event(2)
+    broker.poll_once()
+    broker.poll_once()
+
+    events, overflowed = subscriber.drain()
+    assert sorted(event_id for event_id, _, _ in events) == [1, 2, 3]
+    assert not overflowed
+
+
+def test_gap_is_dropped_after_grace_window(app, monkeypatch):
+    broker = EventBroker(app, gap_seconds=0)
+    monkeypatch.setattr(broker, '_ensure_poller', lambda: None)
+    subscriber = broker.subscribe(1)
+
+    add_event(1)
+    add_event(3)
+    broker.poll_once()
+    broker.poll_once()
+    add_event(2)
+    broker.poll_once()
+
+    events, _ = subscriber.drain()
+    assert [event_id for event_id, _, _ in events] == [1, 3]
+
+
+def test_events_account_comes_from_token(client):
+    assert client.get('/api/events?account_id=1').status_code == 401
+
+    token = create_access_token(identity=json.dumps({'user_id': 1, 'user_type': 'owner'}))
+    response = client.get('/api/events', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 403
+
+
+def test_event_pushed_at_the_end_of_a_drain_is_not_stranded():
+    subscriber = Subscriber(1, buffer_size=8)
+
+    class PushAfterLastCheck(deque):
+        # The poller thread pushing right after drain() found the buffer empty
+        pushed = False
+
+        def __bool__(self):
+            empty = len(self) == 0
+            if empty and not self.pushed:
+                self.pushed = True
+                subscriber.push(2, 'message', '{}')
+            return not empty
+
+    subscriber.buffer = PushAfterLastCheck(maxlen=8)
+    subscriber.push(1, 'message', '{}')
+
+    events, _ = subscriber.drain()
+    assert [event_id for event_id, _, _ in events] == [1]
+    # The stream's next wait() returns at once with the late event
+    assert subscriber.wakeup.wait(0)
+    assert subscriber.drain()[0] == [(2, 'message', '{}')]
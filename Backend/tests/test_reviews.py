@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Review
+
+from conftest import make_owner, make_vet
+
+
+def add_reviews(vet, start, count):
+    for n in range(start, start + count):
+        owner = make_owner(n)
+        db.session.add(Review(veterinarian_id=vet.id, owner_id=owner.id, review_text=f'Review {n}', rating=4,
+                              created_at=datetime(2025, 1, 1) + timedelta(minutes=n)))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('path', ['/api/vets/{vet_id}/reviews', '/get_reviews?vet_id={vet_id}'])
+def test_review_listing_query_count_does_not_grow_with_reviews(client, count_queries, path):
+    vet = make_vet()
+    url = path.format(vet_id=vet.id)
+
+    counts = []
+    for start, count in ((1, 1), (2, 40)):
+        add_reviews(vet, start, count)
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        counts.append(len(statements))
+
+    names = {review['user_name'] for review in response.get_json()}
+    assert len(names) == 41 and 'Unknown' not in names
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize('rating', ['inf', '-inf', 'nan', '1e999'])
+def test_non_finite_rating_is_rejected(client, rating):
+    owner, vet = make_owner(), make_vet()
+    db.session.commit()
+
+    response = client.post('/submit_review', json={
+        'veterinarian_id': vet.id, 'owner_id': owner.id, 'review_text': 'Great', 'rating': rating,
+    })
+    assert response.status_code == 400
+    response = client.post(f'/api/vets/{vet.id}/reviews?user_id={owner.id}', json={'reviewText': 'Great', 'rating': rating})
+    assert response.status_code == 400
+    assert Review.query.count() == 0
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+import pytest
+
+from app import db
+from app.models import Appointment, AppointmentSlotClaim
+from app.services import slots
+
+from conftest import make_animal, make_owner, make_vet
+
+
+@pytest.fixture
+def booking(client):
+    owner = make_owner()
+    animal = make_animal(owner)
+    vet = make_vet(slot_minutes=30)
+    db.session.commit()
+    day = (slots.local_now().date() + timedelta(days=1)).isoformat()
+
+    def book(time):
+        response = client.post('/book_appointment', json={
+            'owner_id': owner.id, 'animal_id': animal.id, 'veterinarian_id': vet.id,
+            'date': day, 'time': time, 'appointment_type': 'Checkup',
+        })
+        return response.status_code, response.get_json().get('appointment_id')
+    return book
+
+
+def claims(appointment_id):
+    return AppointmentSlotClaim.query.filter_by(appointment_id=appointment_id).count()
+
+
+def test_missed_appointment_gives_its_time_back(client, booking):
+    status, appointment_id = booking('10:00')
+    assert status == 201 and claims(appointment_id) == 6
+
+    response = client.post('/update_appointment_status', json={'appointment_id': appointment_id, 'status': 'Missed'})
+    assert response.status_code == 200
+    assert claims(appointment_id) == 0
+
+    status, other_id = booking('10:00')
+    assert status == 201
+
+    # The time is taken now, so the missed appointment cannot be put back
+    response = client.post('/update_appointment', json={'appointment_id': appointment_id, 'status': 'Upcoming'})
+    assert response.status_code == 409
+    assert db.session.get(Appointment, appointment_id).status == 'Missed'
+
+    client.post('/update_appointment_status', json={'appointment_id': other_id, 'status': 'Missed'})
+    response = client.post('/update_appointment', json={'appointment_id': appointment_id, 'status': 'Upcoming'})
+    assert response.status_code == 200
+    assert claims(appointment_id) == 6
+
+
+def test_bulk_status_updates_release_and_reclaim(client, booking):
+    _, first_id = booking('10:00')
+    _, second_id = booking('11:00')
+
+    response = client.post('/update_appointment_statuses', json={'appointments': [
+        {'appointment_id': first_id, 'status': 'Missed'},
+        {'appointment_id': second_id, 'status': 'Missed'},
+    ]})
+    assert response.get_json()['succeeded'] == 2
+    assert claims(first_id) == claims(second_id) == 0
+
+    _, third_id = booking('10:00')
+    response = client.post('/update_appointments', json={'appointments': [
+        {'appointment_id': first_id, 'status': 'Upcoming'},
+        {'appointment_id': second_id, 'status': 'Upcoming'},
+    ]})
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [False, True]
+    assert claims(first_id) == 0 and claims(second_id) == 6 and claims(third_id) == 6
+    assert db.session.get(Appointment, first_id).status == 'Missed'
+
+
+def test_rebuild_pages_through_vets(client, booking):
+    _, kept_id = booking('10:00')
+    _, missed_id = booking('11:00')
+    client.post('/update_appointment_status', json={'appointment_id': missed_id, 'status': 'Missed'})
+    for n in range(2, 5):
+        vet = make_vet(n)
+        appointment = Appointment.query.get(kept_id)
+        db.session.add(Appointment(
+            owner_id=appointment.owner_id, animal_id=appointment.animal_id, veterinarian_id=vet.id,
+            date=appointment.date, time='09:00', appointment_type='Checkup', duration_minutes=15,
+        ))
+    db.session.commit()
+
+    assert slots.rebuild_slot_claims(vets_per_page=2) == (4, 0)
+    assert claims(kept_id) == 6 and claims(missed_id) == 0
+    assert AppointmentSlotClaim.query.count() == 6 + 3 * 3
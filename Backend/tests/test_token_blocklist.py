@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+
+from app.services import token_blocklist
+from app.services.token_blocklist import DatabaseBlocklistStore, TokenBlocklist
+
+
+class AheadDatetime(datetime):
+    """The clock of a host running an hour fast."""
+
+    @classmethod
+    def utcnow(cls):
+        return datetime.utcnow() + timedelta(hours=1)
+
+
+def test_sync_sees_revocations_from_a_host_with_a_slower_clock(app, monkeypatch):
+    local = TokenBlocklist(DatabaseBlocklistStore(), sync_seconds=0)
+    fast_host = TokenBlocklist(DatabaseBlocklistStore(), sync_seconds=0)
+
+    monkeypatch.setattr(token_blocklist, 'datetime', AheadDatetime)
+    assert not fast_host.is_revoked('jti-1')  # Builds its filter
+
+    monkeypatch.setattr(token_blocklist, 'datetime', datetime)
+    local.revoke('jti-1')
+
+    monkeypatch.setattr(token_blocklist, 'datetime', AheadDatetime)
+    assert fast_host.is_revoked('jti-1')
+    assert not fast_host.is_revoked('jti-2')
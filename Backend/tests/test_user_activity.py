@@ -0,0 +1,55 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Appointment, Notification, UserActivity
+
+from conftest import make_animal, make_owner, make_vet
+
+
+def seed_activity():
+    owner = make_owner()
+    vet = make_vet()
+    animal = make_animal(owner)
+    db.session.add_all([
+        Appointment(owner_id=owner.id, animal_id=animal.id, veterinarian_id=vet.id, date=date(2025, 1, n),
+                    time='10:00', appointment_type='Checkup')
+        for n in range(1, 6)
+    ])
+    db.session.add_all([
+        Notification(user_id=owner.id, user_type='animal_owner', title=f'Note {n}', body='', type='message',
+                     timestamp=datetime(2025, 1, 1) + timedelta(hours=n))
+        for n in range(3)
+    ])
+    db.session.add_all([
+        UserActivity(user_id=owner.id, user_type='animal_owner', activity_type='animal_registration',
+                     description=f'Registered animal {n}', timestamp=datetime(2025, 1, 1) + timedelta(hours=n))
+        for n in range(4)
+    ])
+    db.session.commit()
+    return owner
+
+
+@pytest.mark.parametrize('limit', [1, 3, 5, 12, 20])
+def test_pages_hold_at_most_limit_and_cover_the_whole_feed(client, limit):
+    owner = seed_activity()
+    everything = client.get(f'/user_activity/{owner.id}').get_json()['activities']
+    assert len(everything) == 12
+
+    seen, cursor = [], None
+    while True:
+        url = f'/user_activity/{owner.id}?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        assert len(body['activities']) <= limit
+        seen.extend(body['activities'])
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == everything
+
+
+def test_an_invalid_cursor_is_rejected(client):
+    owner = seed_activity()
+    assert client.get(f'/user_activity/{owner.id}?cursor=bm9wZQ').status_code == 400
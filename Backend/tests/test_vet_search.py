@@ -0,0 +1,15 @@
+from app import db
+from app.models import VetSearchTerm
+from app.services.vet_search import rebuild_search_index, search
+
+from conftest import make_vet
+
+
+def test_rebuild_pages_through_every_vet(app):
+    for n in range(1, 8):
+        make_vet(n, name=f'Dr. Name{n}', clinic=f'Clinic{n}', specialization='cats')
+    db.session.commit()
+
+    assert rebuild_search_index(batch_size=3) == 7
+    assert db.session.query(VetSearchTerm).count() == 7 * 3
+    assert [vet.name for vet, _, _ in search('name5')] == ['Dr. Name5']
@@ -0,0 +1,20 @@
+from app import db
+
+from conftest import make_vet
+
+
+def test_veterinarians_pages_through_the_next_cursor_header(client):
+    for n in range(1, 6):
+        make_vet(n)
+    db.session.commit()
+
+    names, url = [], '/veterinarians?limit=2'
+    while url:
+        response = client.get(url)
+        body = response.get_json()
+        assert list(body) == ['veterinarians']
+        names += [vet['name'] for vet in body['veterinarians']]
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/veterinarians?limit=2&cursor={cursor}' if cursor else None
+
+    assert names == [f'Dr. Vet {n}' for n in range(1, 6)]